@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Batch Campaign Performance Report Generator
+Generates one report per account from a manifest, running the jobs in a
+bounded process pool so total wall time scales with cores, not accounts.
+
+Manifest formats (paths are relative to the manifest file):
+    JSON  - a list of jobs, or {"jobs": [...]}
+    YAML  - same structure as JSON (requires PyYAML)
+    CSV   - header row: account,campaign,business,output[,rules]
+
+Each job has: account, campaign, business (optional), output and rules
+(optional: a classification rules file for that account's naming).
+
+A worker process that dies (killed for memory, a crash in native code) breaks
+the whole pool, so the jobs it took down with it are run again: those that
+had not started go to a fresh pool, and those that were running are re-run
+one at a time, so only the job that crashes is reported as failed.
+"""
+
+import os
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+import traceback
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from generate_report_from_data import generate_report
+from classification_rules import use_rules
+
+# ============================================================================
+# MANIFEST LOADING
+# ============================================================================
+
+MANIFEST_FIELDS = ['account', 'campaign', 'business', 'output', 'rules']
+
+
+def load_manifest(manifest_path):
+    """Load a JSON, YAML or CSV manifest into a list of job dicts."""
+    ext = os.path.splitext(manifest_path)[1].lower()
+
+    if ext == '.csv':
+        with open(manifest_path, newline='', encoding='utf-8-sig') as f:
+            jobs = [dict(row) for row in csv.DictReader(f)]
+    elif ext in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML manifests require PyYAML (pip install pyyaml)")
+        with open(manifest_path, encoding='utf-8') as f:
+            jobs = yaml.safe_load(f)
+    else:
+        with open(manifest_path, encoding='utf-8') as f:
+            jobs = json.load(f)
+
+    if isinstance(jobs, dict):
+        jobs = jobs.get('jobs', [])
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    resolved = []
+    for i, job in enumerate(jobs, 1):
+        missing = [k for k in ('account', 'campaign', 'output') if not job.get(k)]
+        if missing:
+            raise SystemExit(f"Manifest job {i} is missing: {', '.join(missing)}")
+
+        entry = {k: (str(job[k]).strip() if job.get(k) else None) for k in MANIFEST_FIELDS}
+        for key in ('campaign', 'business', 'output', 'rules'):
+            if entry[key]:
+                entry[key] = os.path.join(base_dir, entry[key])
+        resolved.append(entry)
+
+    return resolved
+
+# ============================================================================
+# JOB EXECUTION
+# ============================================================================
+
+def run_job(job):
+    """Generate a single report. Never raises - failures are returned in the result."""
+    start = time.perf_counter()
+    log = io.StringIO()
+    result = {
+        'account': job['account'],
+        'output': job['output'],
+        'status': 'ok',
+        'error': None,
+    }
+
+    try:
+        output_dir = os.path.dirname(job['output'])
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with contextlib.redirect_stdout(log):
+            use_rules(job.get('rules'))  # Pool processes are reused: reset the rules for every job
+            generate_report(job['campaign'], job['business'], job['output'])
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        log.write(traceback.format_exc())
+
+    result['seconds'] = time.perf_counter() - start
+    result['log'] = log.getvalue()
+    return result
+
+
+_started = None
+
+
+def init_worker(started):
+    """Process pool initializer: keep the shared started-job flags."""
+    global _started
+    _started = started
+
+
+def run_indexed_job(index, job):
+    """run_job, flagging the job as started first (a plain shared-memory write, so
+    the flag survives the worker dying right after it)."""
+    _started[index] = 1
+    return run_job(job)
+
+
+def failed_result(job, error):
+    return {
+        'account': job['account'],
+        'output': job['output'],
+        'status': 'failed',
+        'error': f"{type(error).__name__}: {error}",
+        'seconds': 0.0,
+        'log': '',
+    }
+
+
+def run_pool(jobs, indices, max_workers, results):
+    """Run the jobs at indices in one process pool, storing their results.
+
+    Returns (running, queued): the indices the pool lost because a worker
+    died, split into jobs that had started and jobs that never ran.
+    """
+    started = multiprocessing.Array('b', len(jobs), lock=False)
+    lost = []
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(indices)),
+                             initializer=init_worker, initargs=(started,)) as pool:
+        futures = {pool.submit(run_indexed_job, i, jobs[i]): i for i in indices}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                lost.append(i)
+                continue
+            except Exception as e:
+                result = failed_result(jobs[i], e)
+            results[i] = result
+
+            status = "OK  " if result['status'] == 'ok' else "FAIL"
+            print(f"  [{status}] {result['account']:<30} {result['seconds']:7.2f}s")
+
+    running = [i for i in lost if started[i]]
+    queued = [i for i in lost if not started[i]]
+    return running, queued
+
+
+def run_batch(jobs, max_workers=None):
+    """Run all jobs in a process pool and return their results in manifest order."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(jobs)))
+
+    results = {}
+    pending = list(range(len(jobs)))
+    while pending:
+        running, queued = run_pool(jobs, pending, max_workers, results)
+        if not running and queued == pending:
+            # Workers died before any job started: re-running cannot help
+            for i in queued:
+                results[i] = failed_result(jobs[i], BrokenProcessPool("worker processes failed to start"))
+            break
+        if running or queued:
+            print(f"  Worker process died; re-running {len(running)} interrupted "
+                  f"and {len(queued)} queued jobs")
+        # A job that kills its worker alone, in its own pool, is the one that crashed
+        for i in running:
+            if run_pool(jobs, [i], 1, results) != ([], []):
+                results[i] = failed_result(jobs[i], BrokenProcessPool("worker process died running this job"))
+                print(f"  [FAIL] {jobs[i]['account']:<30} {0.0:7.2f}s")
+        pending = queued
+
+    return [results[i] for i in range(len(jobs))]
+
+
+def print_summary(results, wall_seconds):
+    """Print the per-job timing table and failure details."""
+    ok = [r for r in results if r['status'] == 'ok']
+    failed = [r for r in results if r['status'] != 'ok']
+    job_seconds = sum(r['seconds'] for r in results)
+
+    print("\nBatch summary:")
+    print(f"  Jobs: {len(results)}  Succeeded: {len(ok)}  Failed: {len(failed)}")
+    print(f"  Wall time: {wall_seconds:.2f}s  (sum of job times: {job_seconds:.2f}s)")
+    if wall_seconds > 0:
+        print(f"  Parallel speedup: {job_seconds / wall_seconds:.1f}x")
+
+    for r in ok:
+        print(f"  - {r['account']}: {r['output']}")
+
+    if failed:
+        print("\nFailures:")
+        for r in failed:
+            print(f"  - {r['account']}: {r['error']}")
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate campaign reports for many accounts in parallel.")
+    parser.add_argument('manifest', help="Manifest file (.json, .yaml/.yml or .csv)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="Maximum concurrent reports (default: number of CPUs)")
+    parser.add_argument('--summary-json', help="Write the per-job results to this JSON file")
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    if not jobs:
+        print("Manifest contains no jobs")
+        return 0
+
+    print(f"Generating {len(jobs)} reports with up to {args.jobs or os.cpu_count()} workers...")
+    start = time.perf_counter()
+    results = run_batch(jobs, args.jobs)
+    wall_seconds = time.perf_counter() - start
+
+    print_summary(results, wall_seconds)
+
+    if args.summary_json:
+        with open(args.summary_json, 'w', encoding='utf-8') as f:
+            json.dump({'wall_seconds': wall_seconds, 'jobs': results}, f, indent=2)
+
+    return 1 if any(r['status'] != 'ok' for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Report Benchmark Suite
+Times the load, aggregate and write stages of generate_report_from_data.py
+on deterministic synthetic exports (synthetic_data.py) at 10k, 100k, 1M and
+10M campaign rows, with the pandas or polars engine (--engines).
+
+Each run appends one result per size to a JSON-lines history tagged with the
+git commit, and prints the change against the latest result recorded for a
+different commit, so regressions show up when comparing branches.
+
+    python benchmarks.py --sizes 10k,100k
+    python benchmarks.py --sizes 1m --engines pandas,polars
+    python benchmarks.py --sizes 10k,1m --parity   # polars vs pandas results
+    python benchmarks.py --history              # print recorded results
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+import importlib.util
+import contextlib
+from datetime import datetime
+
+import pandas as pd
+
+from synthetic_data import write_exports, parse_row_count, SEED
+from generate_report_from_data import build_report_graph, sheet_nodes, write_report, REPORT_SHEETS, ENGINES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BENCHMARK_SIZES = [10000, 100000, 1000000, 10000000]
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmarks')
+DATA_DIR = os.path.join(BENCHMARK_DIR, 'data')
+HISTORY_FILE = os.path.join(BENCHMARK_DIR, 'history.jsonl')
+
+BENCHMARK_STAGES = ['load', 'aggregate', 'write']
+
+# Graph values compared between engines by --parity, and the columns each
+# engine must produce for them (the polars loaders keep only the columns the
+# report uses, so extra pandas columns are not compared)
+SUM_COLUMNS = ['Spend', 'Sales', 'Orders', 'Clicks', 'Impressions']
+RATIO_COLUMNS = ['ROAS', 'ACoS', 'CVR', 'CPC', 'CTR']
+LAST_YEAR_COLUMNS = ['LY_Spend', 'LY_Clicks', 'LY_Impressions']
+PARITY_COLUMNS = {
+    'campaign': ['Date', 'Portfolio name', 'Campaign Name', *SUM_COLUMNS, *LAST_YEAR_COLUMNS,
+                 'Portfolio_Type', 'Segment', 'Month', 'Month_Label', 'Week', 'Year'],
+    'business': ['Date', 'Total_Sales', 'Units', 'Sessions', 'Month', 'Month_Label', 'Week'],
+    'daily': ['Date', 'Portfolio_Type', 'Segment', *SUM_COLUMNS, *LAST_YEAR_COLUMNS, 'Week', 'Month_Label'],
+    'monthly': ['Month_Label', *SUM_COLUMNS, *RATIO_COLUMNS, 'Total_Sales', 'Units', 'Sessions',
+                'TACOS', 'Organic_Sales'],
+    'weekly': ['Week', *SUM_COLUMNS, *RATIO_COLUMNS],
+    'by_segment': ['Segment', *SUM_COLUMNS, *RATIO_COLUMNS],
+    'by_portfolio': ['Portfolio_Type', *SUM_COLUMNS, *RATIO_COLUMNS],
+    'segment_month': ['Month_Label', 'Segment', *SUM_COLUMNS, *RATIO_COLUMNS],
+    'portfolio_month': ['Month_Label', 'Portfolio_Type', *SUM_COLUMNS, *RATIO_COLUMNS],
+    'yoy': ['Month_Label', 'Portfolio_Type', 'Segment', 'Spend', 'Clicks', 'Impressions', *LAST_YEAR_COLUMNS,
+            'CPC', 'LY_CPC', 'Spend_YoY', 'Clicks_YoY', 'Impressions_YoY', 'CPC_YoY'],
+}
+PARITY_NODES = list(PARITY_COLUMNS)
+PARITY_RTOL = 1e-9  # Sums may differ in the last bits with a different summation order
+
+# ============================================================================
+# RUNNING
+# ============================================================================
+
+def git_revision():
+    """Short commit hash of the working tree, with '+dirty' if it has local changes."""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('+dirty' if dirty else '')
+
+@contextlib.contextmanager
+def timed(timings, name, rows):
+    """Record wall time, process CPU time (all threads) and rows/sec of a block."""
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    yield
+    wall = time.perf_counter() - wall_start
+    timings[name] = {'wall_seconds': round(wall, 4),
+                     'cpu_seconds': round(time.process_time() - cpu_start, 4),
+                     'rows_per_second': round(rows / wall) if wall > 0 else 0}
+
+def run_benchmark(rows, seed=SEED, compact=False, workers=None, keep_output=False, engine='pandas'):
+    """Generate (or reuse) the exports for `rows` rows and time each stage once."""
+    campaign_path, business_path = write_exports(DATA_DIR, rows, seed)
+    output_path = os.path.join(BENCHMARK_DIR, f"report_{rows}.xlsx")
+    sheets = list(REPORT_SHEETS)
+    # polars builds the pandas campaign frame only for the raw data sheet
+    load_nodes = ['campaign_rows' if engine == 'polars' else 'campaign', 'business']
+
+    timings = {}
+    # The report's own progress lines would drown the benchmark output
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        graph = build_report_graph(campaign_path, business_path, engine=engine)
+        with timed(timings, 'load', rows):
+            graph.compute(load_nodes, max_workers=workers)
+        with timed(timings, 'aggregate', rows):
+            graph.compute(sheet_nodes(sheets), max_workers=workers)
+        with timed(timings, 'write', rows):
+            write_report(graph, sheets, output_path, compact=compact)
+
+    result = {
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'rows': rows,
+        'seed': seed,
+        'compact': compact,
+        'engine': engine,
+        'output_bytes': os.path.getsize(output_path),
+        'total_seconds': round(sum(t['wall_seconds'] for t in timings.values()), 4),
+        'stages': timings,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.node(),
+    }
+    if not keep_output:
+        os.remove(output_path)
+    return result
+
+def parity_mismatches(expected_values, actual_values, engine='polars'):
+    """Compare PARITY_COLUMNS of each node between two graphs' values; return the mismatches."""
+    mismatches = []
+    for node, columns in PARITY_COLUMNS.items():
+        frames = {'pandas': expected_values[node], engine: actual_values[node]}
+        missing = {name: [c for c in columns if c not in df.columns] for name, df in frames.items()}
+        missing = {name: found for name, found in missing.items() if found}
+        if missing:
+            mismatches.append(f"{node}: missing " + '; '.join(f"{', '.join(found)} ({name})"
+                                                              for name, found in missing.items()))
+            continue
+        try:
+            pd.testing.assert_frame_equal(frames[engine][columns].reset_index(drop=True),
+                                          frames['pandas'][columns].reset_index(drop=True),
+                                          check_dtype=False, rtol=PARITY_RTOL)
+        except AssertionError as e:
+            mismatches.append(f"{node}: {e}")
+    return mismatches
+
+def check_parity(rows, seed=SEED, engine='polars', data_dir=DATA_DIR):
+    """Compare the engine's inputs and aggregates with the pandas engine's; return the mismatches."""
+    campaign_path, business_path = write_exports(data_dir, rows, seed)
+    values = {}
+    with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet):
+        for name in ['pandas', engine]:
+            graph = build_report_graph(campaign_path, business_path, engine=name)
+            graph.compute(PARITY_NODES)
+            values[name] = graph.values
+    return parity_mismatches(values['pandas'], values[engine], engine)
+
+# ============================================================================
+# HISTORY
+# ============================================================================
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(result, path=HISTORY_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result) + '\n')
+
+def baseline_for(result, history):
+    """Latest recorded result for the same size and options from a different commit."""
+    matches = [r for r in history
+               if r['rows'] == result['rows'] and r['compact'] == result['compact']
+               and r['seed'] == result['seed'] and r.get('engine', 'pandas') == result['engine']
+               and r['commit'] != result['commit']]
+    return matches[-1] if matches else None
+
+def print_result(result, baseline=None, baseline_label=None):
+    print(f"\n{result['rows']:,} rows @ {result['commit']}, {result['engine']} "
+          f"(output {result['output_bytes'] / 1024:,.0f} KB, total {result['total_seconds']:.2f}s)")
+    header = f"  {'Stage':<10} {'Wall s':>9} {'CPU s':>9} {'Rows/s':>12}"
+    if baseline:
+        header += f" {'vs ' + (baseline_label or baseline['commit']):>16}"
+    print(header)
+    for name in BENCHMARK_STAGES:
+        timing = result['stages'][name]
+        line = f"  {name:<10} {timing['wall_seconds']:9.3f} {timing['cpu_seconds']:9.3f} {timing['rows_per_second']:>12,}"
+        previous = baseline['stages'].get(name) if baseline else None
+        if previous and previous['wall_seconds'] > 0:
+            change = timing['wall_seconds'] / previous['wall_seconds'] - 1
+            line += f" {change:>+15.1%}"
+        print(line)
+
+def print_history(history):
+    print(f"  {'Commit':<16} {'Date':<20} {'Engine':<7} {'Rows':>12} "
+          + ' '.join(f"{s + ' s':>10}" for s in BENCHMARK_STAGES))
+    for r in history:
+        stages = ' '.join(f"{r['stages'][s]['wall_seconds']:10.3f}" for s in BENCHMARK_STAGES)
+        print(f"  {r['commit']:<16} {r['timestamp']:<20} {r.get('engine', 'pandas'):<7} {r['rows']:>12,} {stages}")
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_sizes(value):
+    """argparse type for comma-separated row counts, or 'all'."""
+    if value.strip().lower() == 'all':
+        return list(BENCHMARK_SIZES)
+    return [parse_row_count(part) for part in value.split(',') if part.strip()]
+
+def parse_engines(value):
+    """argparse type for comma-separated engine names."""
+    engines = [part.strip().lower() for part in value.split(',') if part.strip()]
+    unknown = [engine for engine in engines if engine not in ENGINES]
+    if unknown or not engines:
+        raise argparse.ArgumentTypeError(f"unknown engine(s) {', '.join(unknown)} (choose from: {', '.join(ENGINES)})")
+    return engines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark report load/aggregate/write on synthetic exports.")
+    parser.add_argument('--sizes', type=parse_sizes, default=list(BENCHMARK_SIZES),
+                        help="Comma-separated campaign row counts, e.g. 10k,100k (default: 10k,100k,1m,10m)")
+    parser.add_argument('--seed', type=int, default=SEED, help=f"Synthetic data seed (default: {SEED})")
+    parser.add_argument('--compact', action='store_true', help="Benchmark the size-optimized writer")
+    parser.add_argument('--workers', type=int, default=None, help="Threads for loading/aggregating (1 = serial)")
+    parser.add_argument('--engines', type=parse_engines, default=['pandas'],
+                        help="Comma-separated engines to benchmark, e.g. pandas,polars (default: pandas); "
+                             "others are compared with pandas from the same run")
+    parser.add_argument('--parity', action='store_true',
+                        help="Check that polars gives the same inputs and aggregates as pandas, then exit")
+    parser.add_argument('--keep-output', action='store_true', help=f"Keep the generated reports in {BENCHMARK_DIR}")
+    parser.add_argument('--no-save', action='store_true', help="Do not append the results to the history")
+    parser.add_argument('--history', action='store_true', help=f"Print the recorded results ({HISTORY_FILE}) and exit")
+    args = parser.parse_args(argv)
+
+    if (args.parity or 'polars' in args.engines) and importlib.util.find_spec('polars') is None:
+        parser.error("the polars engine requires polars (pip install polars)")
+
+    history = load_history()
+    if args.history:
+        print_history(history)
+        return 0
+
+    if args.parity:
+        failed = False
+        for rows in args.sizes:
+            mismatches = check_parity(rows, args.seed)
+            print(f"{rows:,} rows: polars {'matches pandas' if not mismatches else 'DIFFERS from pandas'}")
+            for mismatch in mismatches:
+                print(f"  {mismatch}")
+            failed = failed or bool(mismatches)
+        return 1 if failed else 0
+
+    for rows in args.sizes:
+        pandas_result = None
+        for engine in args.engines:
+            print(f"Benchmarking {rows:,} rows ({engine})...", flush=True)
+            result = run_benchmark(rows, args.seed, args.compact, args.workers, args.keep_output, engine)
+            if engine == 'pandas':
+                pandas_result = result
+            if pandas_result and engine != 'pandas':
+                print_result(result, pandas_result, 'pandas')
+            else:
+                print_result(result, baseline_for(result, history))
+            if not args.no_save:
+                append_history(result)
+                history.append(result)
+
+    if not args.no_save:
+        print(f"\nResults appended to: {HISTORY_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Classification Rules
+Segment and portfolio classification driven by classification_rules.json
+instead of hard-coded substrings, so each brand's naming conventions can be
+configured without forking the report scripts.
+
+Each kind has an ordered list of rules (a case-insensitive regular
+expression searched anywhere in the name, and the label it assigns) plus
+a default label. The first rule that matches wins. All rules of a kind are
+compiled into one regex whose alternatives are tried in rule order, so a
+name is matched once no matter how many rules there are. Labels are cached
+per distinct name in .classification_cache/, keyed by a hash of the rules,
+so a run only matches names it has never seen with the same rules.
+
+    python classification_rules.py "SP - pat - Comp" "JN Vitamins"
+    python classification_rules.py --rules brand_x.json --campaign campaign.csv
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import threading
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_FILE = os.path.join(SCRIPT_DIR, "classification_rules.json")
+CLASSIFICATION_CACHE_DIR = os.path.join(SCRIPT_DIR, ".classification_cache")
+
+# The report's sheets, pivots and template formulas are laid out for these labels
+LABELS = {
+    'segment': ['Branded', 'Competitor', 'Non-Branded'],
+    'portfolio': ['JN', 'Non-JN'],
+}
+
+# Used when there is no rules file, and for a kind the file leaves out
+DEFAULT_RULES = {
+    'segment': {
+        'rules': [
+            {'pattern': 'branded', 'label': 'Branded'},
+            {'pattern': ' pat |- pat -|_pat_', 'label': 'Competitor'},
+        ],
+        'default': 'Non-Branded',
+    },
+    'portfolio': {
+        'rules': [{'pattern': 'jn', 'label': 'JN'}],
+        'default': 'Non-JN',
+    },
+}
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+# \1 or (?P=name), not preceded by an escaped backslash
+BACKREFERENCE = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?P=)')
+
+def validate_rules(kind, spec, source):
+    """Check one kind's {'rules': [...], 'default': label} and return it normalized."""
+    if not isinstance(spec, dict) or not isinstance(spec.get('rules', []), list):
+        raise ValueError(f"{source}: '{kind}' must be an object with a 'rules' list")
+    labels = LABELS[kind]
+    default = spec.get('default', DEFAULT_RULES[kind]['default'])
+    if default not in labels:
+        raise ValueError(f"{source}: {kind} default '{default}' is not one of {', '.join(labels)}")
+
+    rules = []
+    for number, rule in enumerate(spec.get('rules', []), 1):
+        if not isinstance(rule, dict) or not rule.get('pattern') or 'label' not in rule:
+            raise ValueError(f"{source}: {kind} rule {number} needs a 'pattern' and a 'label'")
+        if rule['label'] not in labels:
+            raise ValueError(f"{source}: {kind} rule {number} label '{rule['label']}' "
+                             f"is not one of {', '.join(labels)}")
+        try:
+            re.compile(rule['pattern'])
+        except re.error as e:
+            raise ValueError(f"{source}: {kind} rule {number} pattern {rule['pattern']!r}: {e}")
+        if BACKREFERENCE.search(rule['pattern']):
+            # Group numbers shift once the rules are joined into one regex
+            raise ValueError(f"{source}: {kind} rule {number} pattern {rule['pattern']!r}: "
+                             f"backreferences are not supported")
+        rules.append({'pattern': rule['pattern'], 'label': rule['label']})
+
+    # A pattern can compile alone and still break the combined regex
+    # (inline flags such as (?i), a group name used by two rules)
+    try:
+        compile_rules(rules)
+    except re.error as e:
+        raise ValueError(f"{source}: {kind} rules do not combine into one pattern: {e}. "
+                         f"Inline flags and named groups are not supported")
+    return {'rules': rules, 'default': default}
+
+def load_rules(path=None):
+    """{kind: rules} from a rules file (default: RULES_FILE if present, else DEFAULT_RULES)."""
+    if path is None and not os.path.exists(RULES_FILE):
+        return dict(DEFAULT_RULES)
+    path = path or RULES_FILE
+    with open(path, encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: expected an object with 'segment' and/or 'portfolio'")
+    unknown = sorted(set(config) - set(LABELS))
+    if unknown:
+        raise ValueError(f"{path}: unknown section(s): {', '.join(unknown)}")
+    return {kind: validate_rules(kind, config.get(kind, DEFAULT_RULES[kind]), path) for kind in LABELS}
+
+def compile_rules(rules):
+    """One regex for an ordered rule list; match().lastgroup names the first rule that applies.
+
+    Each alternative is a lookahead over the whole name followed by an empty
+    group r<N>. Alternatives are tried left to right at position 0, so rule
+    order decides ties, unlike a plain alternation, which reports the
+    leftmost match in the name.
+    """
+    if not rules:
+        return None
+    alternatives = [f"(?=.*?(?:{rule['pattern']}))(?P<r{number}>)" for number, rule in enumerate(rules)]
+    return re.compile('|'.join(alternatives), re.IGNORECASE | re.DOTALL)
+
+def rules_digest(kind, spec):
+    """Short hash identifying one kind's rules (names the cache file)."""
+    text = json.dumps({'kind': kind, **spec}, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+# ============================================================================
+# CLASSIFIER
+# ============================================================================
+
+class Classifier:
+    """Labels names by one kind's rules, with a per-name cache kept on disk."""
+
+    def __init__(self, kind, spec, cache_dir=CLASSIFICATION_CACHE_DIR):
+        self.kind = kind
+        self.default = spec['default']
+        self.rule_labels = [rule['label'] for rule in spec['rules']]
+        self.matcher = compile_rules(spec['rules'])
+        self.digest = rules_digest(kind, spec)
+        self.cache_path = os.path.join(cache_dir, f"{kind}_{self.digest}.json") if cache_dir else None
+        self.cache = self.read_cache()
+        self.lock = threading.Lock()
+
+    def read_cache(self):
+        if not (self.cache_path and os.path.exists(self.cache_path)):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}  # Unreadable cache - rebuild it
+
+    def write_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass  # Read-only install - keep the in-memory cache only
+
+    def match(self, name):
+        """Label of one name by the rules (no cache)."""
+        found = self.matcher.match(name) if self.matcher else None
+        return self.rule_labels[int(found.lastgroup[1:])] if found else self.default
+
+    def labels(self, names):
+        """Labels for a sequence of distinct names (None/NaN count as empty)."""
+        names = ['' if name is None or name != name else str(name) for name in names]  # name != name: NaN
+        with self.lock:
+            new = [name for name in names if name not in self.cache]
+            if new:
+                self.cache.update((name, self.match(name)) for name in new)
+                if self.cache_path:
+                    self.write_cache()
+            return [self.cache[name] for name in names]
+
+    def __call__(self, name):
+        return self.labels([name])[0]
+
+_classifiers = {}
+_rules_path = None
+
+def use_rules(path=None):
+    """Switch to the rules in path (default: RULES_FILE); raises ValueError if they are invalid."""
+    global _rules_path
+    rules = load_rules(path)
+    _classifiers.clear()
+    _classifiers.update({kind: Classifier(kind, spec) for kind, spec in rules.items()})
+    _rules_path = path
+
+def get_classifier(kind):
+    """The 'segment' or 'portfolio' Classifier for the active rules."""
+    if not _classifiers:
+        use_rules(_rules_path)
+    return _classifiers[kind]
+
+def active_digest():
+    """Hash of the active rules of every kind; changes whenever any label could."""
+    return '-'.join(get_classifier(kind).digest for kind in LABELS)
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check classification rules against names or an export.")
+    parser.add_argument('names', nargs='*', help="Campaign or portfolio names to classify")
+    parser.add_argument('--rules', help=f"Rules file (default: {os.path.basename(RULES_FILE)} next to this script)")
+    parser.add_argument('--campaign', metavar='CSV', help="Also count the labels of every name in a campaign export")
+    args = parser.parse_args(argv)
+
+    try:
+        use_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not args.names and not args.campaign:
+        parser.error("give names to classify and/or --campaign")
+
+    segment, portfolio = get_classifier('segment'), get_classifier('portfolio')
+    for name in args.names:
+        print(f"{name}: segment {segment(name)}, portfolio {portfolio(name)}")
+
+    if args.campaign:
+        import pandas as pd
+        df = pd.read_csv(args.campaign, encoding='utf-8-sig', usecols=['Campaign Name', 'Portfolio name'], dtype=str)
+        for kind, column in [('segment', 'Campaign Name'), ('portfolio', 'Portfolio name')]:
+            uniques = df[column].dropna().unique()
+            labels = pd.Series(get_classifier(kind).labels(uniques), index=uniques)
+            counts = labels.value_counts().reindex(LABELS[kind], fill_value=0)
+            print(f"\n{column} ({len(uniques):,} distinct):")
+            for label, count in counts.items():
+                print(f"  {label:<12} {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Formula Value Precomputation
+Evaluates the template's formulas in Python so their results can be written
+as cached values next to each formula. Excel Online and viewers that do not
+recalculate then show correct numbers, and desktop Excel can skip the full
+recalculation on open.
+
+Supports the subset of Excel the template generates: SUMIFS, SUM, IF, MAX,
+COUNTA, TEXT, EOMONTH, cell and range references (same sheet or
+Sheet!A1), defined names, arithmetic, comparisons and & concatenation.
+"""
+
+import re
+import calendar
+from datetime import datetime, date
+
+import numpy as np
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import to_excel, from_excel
+
+# ============================================================================
+# TOKENIZER AND PARSER
+# ============================================================================
+
+TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<string>"(?:[^"]|"")*")
+  | (?P<ref>(?:'(?:[^']|'')+'!|[A-Za-z_][\w\.]*!)?\$?[A-Z]{1,3}\$?\d+(?::\$?[A-Z]{1,3}\$?\d+)?)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+  | (?P<func>[A-Za-z_][\w\.]*(?=\())
+  | (?P<name>[A-Za-z_][\w\.]*)
+  | (?P<op><=|>=|<>|[-+*/^&=<>(),])
+''', re.X)
+
+BINARY_PRECEDENCE = {
+    '=': 1, '<>': 1, '<': 1, '>': 1, '<=': 1, '>=': 1,
+    '&': 2,
+    '+': 3, '-': 3,
+    '*': 4, '/': 4,
+    '^': 5,
+}
+
+
+def tokenize(formula):
+    """Split a formula (without the leading '=') into (kind, text) tokens."""
+    tokens = []
+    pos = 0
+    while pos < len(formula):
+        match = TOKEN_RE.match(formula, pos)
+        if match is None:
+            raise ValueError(f"Unsupported formula syntax at {formula[pos:]!r}")
+        kind = match.lastgroup
+        if kind != 'ws':
+            tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Precedence-climbing parser producing nested tuples."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, text=None):
+        token = self.peek()
+        if text is not None and token[1] != text:
+            raise ValueError(f"Expected {text!r}, found {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.expression(0)
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def expression(self, min_precedence):
+        left = self.unary()
+        while True:
+            kind, text = self.peek()
+            precedence = BINARY_PRECEDENCE.get(text) if kind == 'op' else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.take()
+            right = self.expression(precedence + 1)
+            left = ('binop', text, left, right)
+
+    def unary(self):
+        kind, text = self.peek()
+        if kind == 'op' and text in ('-', '+'):
+            self.take()
+            operand = self.unary()
+            return ('neg', operand) if text == '-' else operand
+        return self.primary()
+
+    def primary(self):
+        kind, text = self.take()
+        if kind == 'number':
+            return ('num', float(text))
+        if kind == 'string':
+            return ('str', text[1:-1].replace('""', '"'))
+        if kind == 'ref':
+            return ('ref', text)
+        if kind == 'name':
+            if text.upper() in ('TRUE', 'FALSE'):
+                return ('bool', text.upper() == 'TRUE')
+            return ('name', text)
+        if kind == 'func':
+            self.take('(')
+            args = []
+            if self.peek()[1] != ')':
+                args.append(self.expression(0))
+                while self.peek()[1] == ',':
+                    self.take()
+                    args.append(self.expression(0))
+            self.take(')')
+            return ('func', text.upper(), args)
+        if text == '(':
+            node = self.expression(0)
+            self.take(')')
+            return node
+        raise ValueError(f"Unexpected token {text!r}")
+
+
+def parse_formula(formula):
+    """Parse a formula string (with or without '=') into an AST."""
+    return Parser(tokenize(formula.lstrip('='))).parse()
+
+# ============================================================================
+# VALUE HELPERS
+# ============================================================================
+
+def to_number(value):
+    """Coerce a scalar the way Excel arithmetic does."""
+    if value is None or value == '':
+        return 0.0
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return float(value)
+
+
+def to_text(value):
+    """Coerce a scalar the way Excel & concatenation does."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def excel_text(value, fmt):
+    """Implement TEXT() for the date formats used by the template."""
+    moment = from_excel(to_number(value))
+    parts = {
+        'YYYY': f'{moment.year:04d}',
+        'YY': f'{moment.year % 100:02d}',
+        'MMMM': moment.strftime('%B'),
+        'MMM': moment.strftime('%b'),
+        'MM': f'{moment.month:02d}',
+        'M': str(moment.month),
+        'DD': f'{moment.day:02d}',
+        'D': str(moment.day),
+    }
+    return re.sub(r'YYYY|YY|MMMM|MMM|MM|M|DD|D', lambda m: parts[m.group(0)], fmt)
+
+
+def eomonth(start, months):
+    """Implement EOMONTH(): serial of the last day of the month offset from start."""
+    moment = from_excel(to_number(start))
+    month_index = moment.year * 12 + (moment.month - 1) + int(to_number(months))
+    year, month = divmod(month_index, 12)
+    last_day = calendar.monthrange(year, month + 1)[1]
+    return float(to_excel(datetime(year, month + 1, last_day)))
+
+
+def wildcard_regex(pattern):
+    """Regex for an Excel wildcard criterion: * and ? are wildcards, ~ escapes the next character."""
+    parts = []
+    for escaped, char in re.findall(r'(~?)(.)', pattern, re.S):
+        if escaped or char not in '*?':
+            parts.append(re.escape(char))
+        else:
+            parts.append('.*' if char == '*' else '.')
+    return re.compile(''.join(parts), re.S)
+
+
+def criterion_mask(values, criterion):
+    """Boolean mask of values matching a SUMIFS criterion."""
+    if not isinstance(criterion, str):
+        target = to_number(criterion)
+        numeric = _numeric_view(values)
+        return numeric == target
+
+    match = re.match(r'^(<=|>=|<>|<|>|=)?(.*)$', criterion, re.S)
+    op, operand = match.group(1) or '=', match.group(2)
+
+    try:
+        target = float(operand)
+    except ValueError:
+        target = None
+
+    if target is not None:
+        numeric = _numeric_view(values)
+        with np.errstate(invalid='ignore'):
+            return {
+                '=': numeric == target, '<>': numeric != target,
+                '<': numeric < target, '>': numeric > target,
+                '<=': numeric <= target, '>=': numeric >= target,
+            }[op]
+
+    text = np.array([str(v).lower() if v is not None else '' for v in values], dtype=object)
+    pattern = operand.lower()
+    if op in ('=', '<>') and ('*' in pattern or '?' in pattern):
+        # Excel wildcards only match non-empty text; blanks and numbers never match
+        regex = wildcard_regex(pattern)
+        matched = np.array([isinstance(v, str) and v != '' and bool(regex.fullmatch(v.lower())) for v in values],
+                           dtype=bool)
+    else:
+        matched = text == pattern
+    return ~matched if op == '<>' else matched
+
+
+def _numeric_view(values):
+    """Float view of an array; non-numeric entries become NaN."""
+    if values.dtype.kind in 'fiub':
+        return values.astype(float)
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        if isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool):
+            out[i] = v
+    return out
+
+# ============================================================================
+# WORKBOOK EVALUATOR
+# ============================================================================
+
+class WorkbookEvaluator:
+    """Evaluate formula cells of an openpyxl workbook.
+
+    names maps defined names to numpy arrays holding the data they cover.
+    data_row_counts maps data sheets (filled outside openpyxl) to their row
+    counts so that COUNTA over those sheets returns the right figure.
+    """
+
+    def __init__(self, wb, names, data_row_counts=None):
+        self.wb = wb
+        self.names = names
+        self.data_row_counts = data_row_counts or {}
+        self.cache = {}
+        self.parsed = {}
+
+    def cell_value(self, sheet, ref):
+        key = (sheet, ref)
+        if key in self.cache:
+            return self.cache[key]
+
+        raw = self.wb[sheet][ref].value
+        if isinstance(raw, str) and raw.startswith('='):
+            if key not in self.parsed:
+                self.parsed[key] = parse_formula(raw)
+            value = self.evaluate(self.parsed[key], sheet)
+        elif isinstance(raw, (datetime, date)):
+            value = float(to_excel(raw))
+        else:
+            value = raw
+
+        self.cache[key] = value
+        return value
+
+    def resolve_ref(self, text, sheet):
+        """Return a scalar for a single-cell reference or an array for a range."""
+        if '!' in text:
+            sheet_part, text = text.rsplit('!', 1)
+            sheet = sheet_part.strip("'").replace("''", "'")
+        text = text.replace('$', '')
+
+        if ':' not in text:
+            return self.cell_value(sheet, text)
+
+        start, end = text.split(':')
+        start_col, start_row = re.match(r'([A-Z]+)(\d+)', start).groups()
+        end_col, end_row = re.match(r'([A-Z]+)(\d+)', end).groups()
+
+        if sheet in self.data_row_counts:
+            # Only COUNTA reads data sheets directly; represent filled rows
+            return np.ones(self.data_row_counts[sheet])
+
+        values = []
+        for col in range(column_index_from_string(start_col), column_index_from_string(end_col) + 1):
+            for row in range(int(start_row), int(end_row) + 1):
+                values.append(self.cell_value(sheet, f'{get_column_letter(col)}{row}'))
+        return np.array(values, dtype=object)
+
+    def evaluate(self, node, sheet):
+        kind = node[0]
+        if kind in ('num', 'str', 'bool'):
+            return node[1]
+        if kind == 'ref':
+            return self.resolve_ref(node[1], sheet)
+        if kind == 'name':
+            return self.names[node[1]]
+        if kind == 'neg':
+            return -to_number(self.evaluate(node[1], sheet))
+        if kind == 'binop':
+            return self.binop(node[1], self.evaluate(node[2], sheet), self.evaluate(node[3], sheet))
+        if kind == 'func':
+            return self.call(node[1], node[2], sheet)
+        raise ValueError(f"Unknown node {kind}")
+
+    def binop(self, op, left, right):
+        if op == '&':
+            return to_text(left) + to_text(right)
+        if op in ('+', '-', '*', '/', '^'):
+            a, b = to_number(left), to_number(right)
+            if op == '+':
+                return a + b
+            if op == '-':
+                return a - b
+            if op == '*':
+                return a * b
+            if op == '/':
+                if b == 0:
+                    raise ZeroDivisionError("#DIV/0!")
+                return a / b
+            return a ** b
+
+        # Comparisons: numbers compare numerically, text case-insensitively
+        if isinstance(left, str) or isinstance(right, str):
+            a, b = to_text(left).lower(), to_text(right).lower()
+        else:
+            a, b = to_number(left), to_number(right)
+        return {
+            '=': a == b, '<>': a != b, '<': a < b,
+            '>': a > b, '<=': a <= b, '>=': a >= b,
+        }[op]
+
+    def call(self, func, args, sheet):
+        if func == 'IF':
+            condition = self.evaluate(args[0], sheet)
+            if to_number(condition) != 0:
+                return self.evaluate(args[1], sheet)
+            return self.evaluate(args[2], sheet) if len(args) > 2 else False
+
+        values = [self.evaluate(arg, sheet) for arg in args]
+
+        if func == 'SUMIFS':
+            sum_values = _numeric_view(np.asarray(values[0]))
+            mask = np.ones(len(sum_values), dtype=bool)
+            for crit_range, criterion in zip(values[1::2], values[2::2]):
+                mask &= criterion_mask(np.asarray(crit_range), criterion)
+            return float(np.nansum(sum_values[mask]))
+        if func == 'SUM':
+            return float(sum(np.nansum(_numeric_view(np.asarray(v, dtype=object).ravel())) if isinstance(v, np.ndarray)
+                             else to_number(v) for v in values))
+        if func == 'MAX':
+            flat = []
+            for v in values:
+                flat.extend(_numeric_view(np.asarray(v, dtype=object).ravel()) if isinstance(v, np.ndarray) else [to_number(v)])
+            flat = [v for v in flat if not np.isnan(v)]
+            return float(max(flat)) if flat else 0.0
+        if func == 'COUNTA':
+            total = 0
+            for v in values:
+                if isinstance(v, np.ndarray):
+                    total += sum(1 for x in v.ravel() if x is not None and x != '')
+                elif v is not None:
+                    total += 1
+            return float(total)
+        if func == 'TEXT':
+            return excel_text(values[0], to_text(values[1]))
+        if func == 'EOMONTH':
+            return eomonth(values[0], values[1])
+        raise ValueError(f"Unsupported function {func}")
+
+
+def compute_cached_values(wb, names, data_row_counts=None, skip_sheets=(), failures=None):
+    """Evaluate every formula cell and return {sheet: {cell_ref: value}}.
+
+    Cells whose formula cannot be evaluated (e.g. division by zero) are left
+    without a cached value and, if failures is a list, appended to it as
+    'Sheet!A1' so the caller can keep Excel's recalculation on open.
+    """
+    evaluator = WorkbookEvaluator(wb, names, data_row_counts)
+    results = {}
+    for ws in wb.worksheets:
+        if ws.title in skip_sheets:
+            continue
+        sheet_values = {}
+        for row in ws.iter_rows():
+            for cell in row:
+                if isinstance(cell.value, str) and cell.value.startswith('='):
+                    try:
+                        value = evaluator.cell_value(ws.title, cell.coordinate)
+                    except (ZeroDivisionError, ValueError, KeyError):
+                        if failures is not None:
+                            failures.append(f"{ws.title}!{cell.coordinate}")
+                        continue
+                    if isinstance(value, (np.floating, np.integer)):
+                        value = float(value)
+                    if isinstance(value, np.bool_):
+                        value = bool(value)
+                    sheet_values[cell.coordinate] = value
+        if sheet_values:
+            results[ws.title] = sheet_values
+    return results
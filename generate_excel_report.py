@@ -5,27 +5,20 @@ Replicates the HTML Campaign Report Generator functionality in Excel
 with data validation dropdowns for toggles and full interactivity.
 """
 
+import io
 import os
-from openpyxl import Workbook
-from openpyxl.styles import (
-    Font, Fill, PatternFill, Border, Side, Alignment, NamedStyle,
-    numbers, Color
-)
-from openpyxl.formatting.rule import (
-    FormulaRule, ColorScaleRule, DataBarRule, CellIsRule
-)
-from openpyxl.chart import (
-    LineChart, PieChart, BarChart, Reference
-)
-from openpyxl.chart.series import DataPoint
-from openpyxl.chart.label import DataLabelList
-from openpyxl.utils import get_column_letter
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from openpyxl.drawing.image import Image
+import hashlib
+import functools
+import argparse
 from datetime import datetime, timedelta
-import string
+import importlib.util
+
+from xlsx_package import patch_workbook, package_sheet_names
+
+# openpyxl (and the numpy it pulls in) takes about 0.25s to import and is only
+# needed when a workbook is actually built, so the builders import it
+# themselves: template runs served from the snapshot cache and argument
+# errors never load it.
 
 
 # ============================================================================
@@ -50,29 +43,39 @@ COLORS = {
     'negative': 'EF4444',
 }
 
-# Border styles
-thin_border = Border(
-    left=Side(style='thin', color=COLORS['border']),
-    right=Side(style='thin', color=COLORS['border']),
-    top=Side(style='thin', color=COLORS['border']),
-    bottom=Side(style='thin', color=COLORS['border'])
-)
 
-medium_border = Border(
-    left=Side(style='medium', color=COLORS['primary']),
-    right=Side(style='medium', color=COLORS['primary']),
-    top=Side(style='medium', color=COLORS['primary']),
-    bottom=Side(style='medium', color=COLORS['primary'])
-)
+@functools.lru_cache(maxsize=None)
+def thin_border():
+    """Thin gray cell border."""
+    from openpyxl.styles import Border, Side
+    return Border(
+        left=Side(style='thin', color=COLORS['border']),
+        right=Side(style='thin', color=COLORS['border']),
+        top=Side(style='thin', color=COLORS['border']),
+        bottom=Side(style='thin', color=COLORS['border'])
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def medium_border():
+    """Medium primary-colored cell border."""
+    from openpyxl.styles import Border, Side
+    return Border(
+        left=Side(style='medium', color=COLORS['primary']),
+        right=Side(style='medium', color=COLORS['primary']),
+        top=Side(style='medium', color=COLORS['primary']),
+        bottom=Side(style='medium', color=COLORS['primary'])
+    )
 
 
 def create_header_style(color='primary'):
     """Create a header style with specified color."""
+    from openpyxl.styles import Font, PatternFill, Alignment
     return {
         'font': Font(bold=True, color='FFFFFF', size=11),
         'fill': PatternFill(start_color=COLORS[color], end_color=COLORS[color], fill_type='solid'),
         'alignment': Alignment(horizontal='center', vertical='center'),
-        'border': thin_border
+        'border': thin_border()
     }
 
 
@@ -87,8 +90,9 @@ def apply_header_style(cell, color='primary'):
 
 def apply_metric_card_style(cell, is_value=False):
     """Apply metric card styling."""
+    from openpyxl.styles import Font, Alignment
     cell.alignment = Alignment(horizontal='center', vertical='center')
-    cell.border = thin_border
+    cell.border = thin_border()
     if is_value:
         cell.font = Font(bold=True, size=16, color=COLORS['text'])
     else:
@@ -112,6 +116,8 @@ def apply_decimal_format(cell, decimals=2):
 
 def apply_change_format(ws, cell_ref, value_ref=None):
     """Apply conditional formatting for positive/negative changes."""
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.formatting.rule import CellIsRule
     # Green for positive
     ws.conditional_formatting.add(
         cell_ref,
@@ -128,12 +134,198 @@ def apply_change_format(ws, cell_ref, value_ref=None):
     )
 
 
+# Blocks left empty for manual entry when no precomputed grid rows are given
+PLACEHOLDER_ROWS = 12
+
+
+def write_grid_block(ws, first_row, ncols, rows=None, formats=None, change_cols=(),
+                     placeholder_rows=PLACEHOLDER_ROWS, center=True):
+    """Write a bordered grid block starting at first_row and return its last row.
+
+    rows is a list of row value lists precomputed from the data; the block
+    grows to fit them. Without rows the block is placeholder_rows empty rows.
+    formats maps 1-based columns to number formats; change_cols get the
+    positive/negative conditional formatting.
+    """
+    from openpyxl.styles import Alignment
+    from openpyxl.utils import get_column_letter
+    formats = formats or {}
+    count = placeholder_rows if rows is None else len(rows)
+    last_row = first_row + count - 1
+
+    for offset in range(count):
+        values = rows[offset] if rows is not None else ()
+        for col in range(1, ncols + 1):
+            cell = ws.cell(row=first_row + offset, column=col)
+            if col <= len(values) and values[col - 1] is not None:
+                cell.value = values[col - 1]
+            cell.border = thin_border()
+            if center:
+                cell.alignment = Alignment(horizontal='center')
+            if col in formats:
+                cell.number_format = formats[col]
+
+    if count:
+        for col in change_cols:
+            letter = get_column_letter(col)
+            apply_change_format(ws, f'{letter}{first_row}:{letter}{last_row}')
+
+    return last_row
+
+
+# ============================================================================
+# DATA SHEET LAYOUT
+# ============================================================================
+
+# Expected export headers - matching actual Krell campaign report
+CAMPAIGN_HEADERS = [
+    "Date", "Portfolio name", "Program Type", "Campaign Name", "Retailer",
+    "Country", "Status", "Currency", "Budget Amount", "Targeting Type",
+    "Bidding strategy", "Impressions", "Last Year Impressions", "Clicks",
+    "Last Year Clicks", "Click-Thru Rate (CTR)", "Spend", "Last Year Spend",
+    "Cost Per Click (CPC)", "Last Year Cost Per Click (CPC)", "7 Day Total Orders (#)",
+    "Total Advertising Cost of Sales (ACOS) ", "Total Return on Advertising Spend (ROAS)",
+    "7 Day Total Sales "
+]
+
+# Calculated columns Y-AB
+CAMPAIGN_CALC_HEADERS = ["Portfolio Type", "Segment", "Week", "Month"]
+
+# Expected export headers - matching actual Krell business report
+BUSINESS_HEADERS = [
+    "Date", "Ordered Product Sales", "Ordered Product Sales - B2B",
+    "Units Ordered", "Units Ordered - B2B", "Total Order Items",
+    "Total Order Items - B2B", "Average Sales per Order Item",
+    "Average Sales per Order Item - B2B", "Average Units per Order Item",
+    "Average Units per Order Item - B2B", "Average Selling Price",
+    "Average Selling Price - B2B", "Sessions - Total", "Sessions - Total - B2B",
+    "Order Item Session Percentage", "Order Item Session Percentage - B2B",
+    "Average Offer Count"
+]
+
+# Calculated columns S-T
+BUSINESS_CALC_HEADERS = ["Week", "Month"]
+
+# Number formats for hydrated data rows (columns not listed stay General)
+CAMPAIGN_COLUMN_FORMATS = {
+    'A': 'YYYY-MM-DD',
+    'L': '#,##0',
+    'N': '#,##0',
+    'Q': '$#,##0.00',
+    'U': '#,##0',
+    'X': '$#,##0.00',
+}
+
+BUSINESS_COLUMN_FORMATS = {
+    'A': 'YYYY-MM-DD',
+    'B': '$#,##0.00',
+    'D': '#,##0',
+    'N': '#,##0',
+}
+
+
+def add_format_prototype_row(ws, formats, row=None):
+    """Style the first data row so a streaming writer can copy its style ids."""
+    if row is None:
+        row = DATA_START_ROW
+    for col_letter, fmt in formats.items():
+        ws[f'{col_letter}{row}'].number_format = fmt
+
+
+# ============================================================================
+# DATA RANGE NAMES
+# ============================================================================
+
+# Formulas reference the pasted data through defined names bounded by the
+# row counts in Settings (B19/B20) instead of whole columns like 'Campaign Data'!Q:Q,
+# so recalculation cost scales with the rows actually present.
+DATA_START_ROW = 5
+
+CAMPAIGN_RANGES = {
+    'Ad_Date': 'A',
+    'Ad_Impressions': 'L',
+    'Ad_Clicks': 'N',
+    'Ad_Spend': 'Q',
+    'Ad_Orders': 'U',
+    'Ad_Sales': 'X',
+    'Ad_Portfolio_Type': 'Y',
+    'Ad_Segment': 'Z',
+    'Ad_Week': 'AA',
+    'Ad_Month': 'AB',
+}
+
+BUSINESS_RANGES = {
+    'Biz_Date': 'A',
+    'Biz_Total_Sales': 'B',
+    'Biz_Units': 'D',
+    'Biz_Sessions': 'N',
+    'Biz_Week': 'S',
+    'Biz_Month': 'T',
+}
+
+# Hidden "Agg" sheet: daily sums by portfolio type and segment, written by
+# generate_report_from_data.py. When the template is built with use_agg=True
+# the Ad_* names point here instead of at the raw campaign rows, so every
+# SUMIFS scans a few thousand rows instead of the full export.
+AGG_HEADERS = [
+    "Date", "Portfolio Type", "Segment", "Week", "Month",
+    "Spend", "Sales", "Orders", "Clicks", "Impressions",
+]
+
+AGG_RANGES = {
+    'Ad_Date': 'A',
+    'Ad_Portfolio_Type': 'B',
+    'Ad_Segment': 'C',
+    'Ad_Week': 'D',
+    'Ad_Month': 'E',
+    'Ad_Spend': 'F',
+    'Ad_Sales': 'G',
+    'Ad_Orders': 'H',
+    'Ad_Clicks': 'I',
+    'Ad_Impressions': 'J',
+}
+
+ROW_COUNT_CELLS = {
+    'Campaign Data': '$B$19',
+    'Business Data': '$B$20',
+    'Agg': '$B$21',
+}
+
+
+def bounded_range(sheet_name, col_letter):
+    """Return a reference from the first data row down to the last filled row."""
+    count_cell = ROW_COUNT_CELLS[sheet_name]
+    return (f"'{sheet_name}'!${col_letter}${DATA_START_ROW}:"
+            f"INDEX('{sheet_name}'!${col_letter}:${col_letter},"
+            f"MAX({DATA_START_ROW},Settings!{count_cell}+{DATA_START_ROW - 1}))")
+
+
+def data_range_sources(use_agg=False):
+    """Return (sheet name, {range name: column letter}) pairs backing the data names."""
+    campaign_source = ("Agg", AGG_RANGES) if use_agg else ("Campaign Data", CAMPAIGN_RANGES)
+    return [campaign_source, ("Business Data", BUSINESS_RANGES)]
+
+
+def add_data_range_names(wb, use_agg=False):
+    """Define the bounded data range names used by every report formula."""
+    from openpyxl.workbook.defined_name import DefinedName
+    for sheet_name, ranges in data_range_sources(use_agg):
+        for name, col_letter in ranges.items():
+            wb.defined_names[name] = DefinedName(name, attr_text=bounded_range(sheet_name, col_letter))
+
+
+def date_window(date_range):
+    """SUMIFS criteria limiting a date range to the Settings start/end dates."""
+    return f'{date_range},">="&Settings!B6,{date_range},"<="&Settings!B7'
+
+
 # ============================================================================
 # WORKSHEET CREATION FUNCTIONS
 # ============================================================================
 
 def create_instructions_sheet(wb):
     """Create the Instructions sheet."""
+    from openpyxl.styles import Font
     ws = wb.create_sheet("Instructions", 0)
 
     # Title
@@ -269,9 +461,23 @@ def create_instructions_sheet(wb):
     ws.column_dimensions['C'].width = 40
 
 
-def create_settings_sheet(wb):
+def settings_dynamic_values(now=None):
+    """Return the Settings cells that depend on the generation time."""
+    if now is None:
+        now = datetime.now()
+    return {
+        'B6': now - timedelta(days=90),
+        'B7': now,
+        'B17': now,
+    }
+
+
+def create_settings_sheet(wb, now=None, use_agg=False):
     """Create the Settings sheet with dropdown values and configuration."""
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.worksheet.datavalidation import DataValidation
     ws = wb.create_sheet("Settings")
+    dynamic = settings_dynamic_values(now)
 
     # Title
     ws['A1'] = "Report Settings & Configuration"
@@ -293,12 +499,12 @@ def create_settings_sheet(wb):
     ws['B5'].fill = PatternFill(start_color='E3F2FD', end_color='E3F2FD', fill_type='solid')
 
     ws['A6'] = "Start Date:"
-    ws['B6'] = datetime.now() - timedelta(days=90)
+    ws['B6'] = dynamic['B6']
     ws['B6'].number_format = 'YYYY-MM-DD'
     ws['B6'].fill = PatternFill(start_color='E3F2FD', end_color='E3F2FD', fill_type='solid')
 
     ws['A7'] = "End Date:"
-    ws['B7'] = datetime.now()
+    ws['B7'] = dynamic['B7']
     ws['B7'].number_format = 'YYYY-MM-DD'
     ws['B7'].fill = PatternFill(start_color='E3F2FD', end_color='E3F2FD', fill_type='solid')
 
@@ -347,12 +553,23 @@ def create_settings_sheet(wb):
     ws['A16'].font = Font(bold=True, size=12, color=COLORS['primary'])
 
     ws['A17'] = "Report Generated:"
-    ws['B17'] = datetime.now()
+    ws['B17'] = dynamic['B17']
     ws['B17'].number_format = 'YYYY-MM-DD HH:MM'
 
     ws['A18'] = "Date Range Days:"
     ws['B18'] = '=B7-B6'
 
+    # Filled row counts bounding the data range names (see add_data_range_names)
+    ws['A19'] = "Campaign Data Rows:"
+    ws['B19'] = f"=COUNTA('Campaign Data'!$A${DATA_START_ROW}:$A$1048576)"
+
+    ws['A20'] = "Business Data Rows:"
+    ws['B20'] = f"=COUNTA('Business Data'!$A${DATA_START_ROW}:$A$1048576)"
+
+    if use_agg:
+        ws['A21'] = "Agg Rows:"
+        ws['B21'] = f"=COUNTA(Agg!$A${DATA_START_ROW}:$A$1048576)"
+
     # Set column widths
     ws.column_dimensions['A'].width = 20
     ws.column_dimensions['B'].width = 15
@@ -362,6 +579,8 @@ def create_settings_sheet(wb):
 
 def create_campaign_data_sheet(wb):
     """Create the Campaign Data input sheet with sample headers."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Campaign Data")
 
     # Instructions at top
@@ -373,31 +592,13 @@ def create_campaign_data_sheet(wb):
     ws['A2'].font = Font(italic=True, color=COLORS['muted'])
 
     # Expected headers (row 4) - matching actual Krell campaign report
-    headers = [
-        "Date", "Portfolio name", "Program Type", "Campaign Name", "Retailer",
-        "Country", "Status", "Currency", "Budget Amount", "Targeting Type",
-        "Bidding strategy", "Impressions", "Last Year Impressions", "Clicks",
-        "Last Year Clicks", "Click-Thru Rate (CTR)", "Spend", "Last Year Spend",
-        "Cost Per Click (CPC)", "Last Year Cost Per Click (CPC)", "7 Day Total Orders (#)",
-        "Total Advertising Cost of Sales (ACOS) ", "Total Return on Advertising Spend (ROAS)",
-        "7 Day Total Sales "
-    ]
-
-    for col, header in enumerate(headers, 1):
+    for col, header in enumerate(CAMPAIGN_HEADERS, 1):
         cell = ws.cell(row=4, column=col, value=header)
         apply_header_style(cell)
 
     # Add calculated column headers (formulas will be added by user after pasting data)
-    calc_headers = [
-        ("Y4", "Portfolio Type"),
-        ("Z4", "Segment"),
-        ("AA4", "Week"),
-        ("AB4", "Month"),
-    ]
-
-    for cell_ref, header in calc_headers:
-        cell = ws[cell_ref]
-        cell.value = header
+    for col, header in enumerate(CAMPAIGN_CALC_HEADERS, len(CAMPAIGN_HEADERS) + 1):
+        cell = ws.cell(row=4, column=col, value=header)
         apply_header_style(cell)
 
     # Note: Calculated columns Y-AB should be added manually after data paste
@@ -414,6 +615,8 @@ def create_campaign_data_sheet(wb):
 
 def create_business_data_sheet(wb):
     """Create the Business Data input sheet with sample headers."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Business Data")
 
     # Instructions at top
@@ -425,30 +628,13 @@ def create_business_data_sheet(wb):
     ws['A2'].font = Font(italic=True, color=COLORS['muted'])
 
     # Expected headers (row 4) - matching actual Krell business report
-    headers = [
-        "Date", "Ordered Product Sales", "Ordered Product Sales - B2B",
-        "Units Ordered", "Units Ordered - B2B", "Total Order Items",
-        "Total Order Items - B2B", "Average Sales per Order Item",
-        "Average Sales per Order Item - B2B", "Average Units per Order Item",
-        "Average Units per Order Item - B2B", "Average Selling Price",
-        "Average Selling Price - B2B", "Sessions - Total", "Sessions - Total - B2B",
-        "Order Item Session Percentage", "Order Item Session Percentage - B2B",
-        "Average Offer Count"
-    ]
-
-    for col, header in enumerate(headers, 1):
+    for col, header in enumerate(BUSINESS_HEADERS, 1):
         cell = ws.cell(row=4, column=col, value=header)
         apply_header_style(cell, 'competitor')
 
     # Add calculated column headers (formulas will be added by user after pasting data)
-    calc_headers = [
-        ("S4", "Week"),
-        ("T4", "Month"),
-    ]
-
-    for cell_ref, header in calc_headers:
-        cell = ws[cell_ref]
-        cell.value = header
+    for col, header in enumerate(BUSINESS_CALC_HEADERS, len(BUSINESS_HEADERS) + 1):
+        cell = ws.cell(row=4, column=col, value=header)
         apply_header_style(cell, 'competitor')
 
     # Note: Calculated columns S-T should be added manually after data paste
@@ -463,8 +649,32 @@ def create_business_data_sheet(wb):
         ws.column_dimensions[get_column_letter(i)].width = width
 
 
+def create_agg_sheet(wb):
+    """Create the hidden Agg sheet holding daily sums by portfolio type and segment."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    ws = wb.create_sheet("Agg")
+    ws.sheet_state = 'hidden'
+
+    ws['A1'] = "DAILY TOTALS BY PORTFOLIO TYPE AND SEGMENT (GENERATED - DO NOT EDIT)"
+    ws['A1'].font = Font(bold=True, size=12, color=COLORS['primary'])
+
+    ws['A2'] = "Written by generate_report_from_data.py; all report formulas read from this table"
+    ws['A2'].font = Font(italic=True, color=COLORS['muted'])
+
+    for col, header in enumerate(AGG_HEADERS, 1):
+        cell = ws.cell(row=4, column=col, value=header)
+        apply_header_style(cell)
+
+    ws.column_dimensions['A'].width = 12
+    for i in range(2, len(AGG_HEADERS) + 1):
+        ws.column_dimensions[get_column_letter(i)].width = 14
+
+
 def create_dashboard_sheet(wb):
     """Create the main Dashboard with KPIs and controls."""
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Dashboard", 1)
 
     # Title
@@ -510,7 +720,7 @@ def create_dashboard_sheet(wb):
     ws.merge_cells('A8:D8')
 
     # Formula to calculate Ad Sales based on portfolio selection
-    ws['A9'] = '=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,IF(Settings!B4="Overall","*",IF(Settings!B4="JN","JN","Non-JN")))'
+    ws['A9'] = f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Portfolio_Type,IF(Settings!B4="Overall","*",IF(Settings!B4="JN","JN","Non-JN")))'
     ws['A9'].number_format = '$#,##0'
     ws['A9'].font = Font(bold=True, size=36, color='FFFFFF')
     ws['A9'].fill = PatternFill(start_color=COLORS['secondary'], end_color=COLORS['secondary'], fill_type='solid')
@@ -520,13 +730,13 @@ def create_dashboard_sheet(wb):
     # 4 KPI Cards
     kpi_start_row = 11
     kpis = [
-        ("AD SPEND", "G", "$#,##0"),
-        ("AD SALES", "H", "$#,##0"),
+        ("AD SPEND", "Ad_Spend", "$#,##0"),
+        ("AD SALES", "Ad_Sales", "$#,##0"),
         ("ROAS", None, "0.00"),  # Calculated
         ("TACOS", None, "0.0%"),  # Calculated
     ]
 
-    for col, (label, col_letter, fmt) in enumerate(kpis, 0):
+    for col, (label, range_name, fmt) in enumerate(kpis, 0):
         start_col = col * 2 + 1
 
         # Label
@@ -537,17 +747,18 @@ def create_dashboard_sheet(wb):
 
         # Value
         value_cell = ws.cell(row=kpi_start_row+1, column=start_col)
-        if col_letter:
-            value_cell.value = f'=SUMIFS(\'Campaign Data\'!{col_letter}:{col_letter},\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7)'
+        if range_name:
+            value_cell.value = f'=SUMIFS({range_name},{date_window("Ad_Date")})'
         elif label == "ROAS":
-            value_cell.value = '=IF(A12>0,B12/A12,0)'
+            value_cell.value = '=IF(A12>0,C12/A12,0)'
         elif label == "TACOS":
-            value_cell.value = '=IF(SUMIFS(\'Business Data\'!B:B,\'Business Data\'!A:A,">="&Settings!B6,\'Business Data\'!A:A,"<="&Settings!B7)>0,A12/SUMIFS(\'Business Data\'!B:B,\'Business Data\'!A:A,">="&Settings!B6,\'Business Data\'!A:A,"<="&Settings!B7),0)'
+            total_sales = f'SUMIFS(Biz_Total_Sales,{date_window("Biz_Date")})'
+            value_cell.value = f'=IF({total_sales}>0,A12/{total_sales},0)'
 
         value_cell.number_format = fmt
         value_cell.font = Font(bold=True, size=24, color=COLORS['text'])
         value_cell.alignment = Alignment(horizontal='center')
-        value_cell.border = thin_border
+        value_cell.border = thin_border()
         ws.merge_cells(start_row=kpi_start_row+1, start_column=start_col, end_row=kpi_start_row+1, end_column=start_col+1)
 
     # Organic Delta Section
@@ -564,9 +775,9 @@ def create_dashboard_sheet(wb):
         cell.alignment = Alignment(horizontal='center')
 
     # Formulas for breakdown
-    ws['A16'] = '=SUMIFS(\'Business Data\'!B:B,\'Business Data\'!A:A,">="&Settings!B6,\'Business Data\'!A:A,"<="&Settings!B7)'
+    ws['A16'] = f'=SUMIFS(Biz_Total_Sales,{date_window("Biz_Date")})'
     ws['A16'].number_format = '$#,##0'
-    ws['B16'] = '=B12'  # Reference to Ad Sales KPI
+    ws['B16'] = '=C12'  # Reference to Ad Sales KPI
     ws['B16'].number_format = '$#,##0'
     ws['C16'] = '=IF(A16>0,B16/A16,0)'
     ws['C16'].number_format = '0.0%'
@@ -578,7 +789,7 @@ def create_dashboard_sheet(wb):
     for col in range(1, 6):
         ws.cell(row=16, column=col).font = Font(bold=True, size=14)
         ws.cell(row=16, column=col).alignment = Alignment(horizontal='center')
-        ws.cell(row=16, column=col).border = thin_border
+        ws.cell(row=16, column=col).border = thin_border()
 
     # Segment Performance Summary
     ws['A18'] = "SEGMENT PERFORMANCE (Current Period)"
@@ -596,12 +807,12 @@ def create_dashboard_sheet(wb):
 
         # Spend formula
         spend_cell = ws.cell(row=row, column=2)
-        spend_cell.value = f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}")'
+        spend_cell.value = f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Segment,"{segment}")'
         spend_cell.number_format = '$#,##0'
 
         # Sales formula
         sales_cell = ws.cell(row=row, column=3)
-        sales_cell.value = f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}")'
+        sales_cell.value = f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Segment,"{segment}")'
         sales_cell.number_format = '$#,##0'
 
         # ROAS formula
@@ -628,7 +839,7 @@ def create_dashboard_sheet(wb):
     for row in range(27, 33):
         for col in range(1, 8):
             cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
+            cell.border = thin_border()
             if col >= 5:
                 apply_change_format(ws, cell.coordinate)
 
@@ -645,6 +856,8 @@ def create_dashboard_sheet(wb):
 
 def create_executive_summary_sheet(wb):
     """Create the Executive Summary sheet matching Page 1 of HTML report."""
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Executive Summary")
 
     # Title
@@ -671,7 +884,7 @@ def create_executive_summary_sheet(wb):
     ws.merge_cells('A5:D5')
 
     # Current month ad sales
-    ws['A6'] = '=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!AB:AB,TEXT(EOMONTH(Settings!B7,-1)+1,"MMM YYYY"))'
+    ws['A6'] = '=SUMIFS(Ad_Sales,Ad_Month,TEXT(EOMONTH(Settings!B7,-1)+1,"MMM YYYY"))'
     ws['A6'].number_format = '$#,##0'
     ws['A6'].font = Font(bold=True, size=32, color='FFFFFF')
     ws['A6'].fill = PatternFill(start_color=COLORS['secondary'], end_color=COLORS['secondary'], fill_type='solid')
@@ -686,17 +899,17 @@ def create_executive_summary_sheet(wb):
     ws.merge_cells('A7:D7')
 
     # Previous month value for comparison (hidden or in column E)
-    ws['E6'] = '=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!AB:AB,TEXT(EOMONTH(Settings!B7,-2)+1,"MMM YYYY"))'
+    ws['E6'] = '=SUMIFS(Ad_Sales,Ad_Month,TEXT(EOMONTH(Settings!B7,-2)+1,"MMM YYYY"))'
     ws['E6'].number_format = '$#,##0'
     ws.column_dimensions['E'].hidden = True
 
     # 4 KPI Cards Row
     kpi_row = 9
     kpis = [
-        ("AD SPEND", "=SUMIFS('Campaign Data'!Q:Q,'Campaign Data'!R:R,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))", "$#,##0"),
-        ("AD SALES", "=SUMIFS('Campaign Data'!X:X,'Campaign Data'!R:R,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))", "$#,##0"),
+        ("AD SPEND", "=SUMIFS(Ad_Spend,Ad_Month,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))", "$#,##0"),
+        ("AD SALES", "=SUMIFS(Ad_Sales,Ad_Month,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))", "$#,##0"),
         ("ROAS", "=IF(A10>0,C10/A10,0)", "0.00\"x\""),
-        ("TACOS", "=IF(SUMIFS('Business Data'!B:B,'Business Data'!I:I,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))>0,A10/SUMIFS('Business Data'!B:B,'Business Data'!I:I,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\")),0)", "0.0%"),
+        ("TACOS", "=IF(SUMIFS(Biz_Total_Sales,Biz_Month,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\"))>0,A10/SUMIFS(Biz_Total_Sales,Biz_Month,TEXT(EOMONTH(Settings!B7,-1)+1,\"MMM YYYY\")),0)", "0.0%"),
     ]
 
     for col, (label, formula, fmt) in enumerate(kpis):
@@ -715,7 +928,7 @@ def create_executive_summary_sheet(wb):
         value_cell.number_format = fmt
         value_cell.font = Font(bold=True, size=20)
         value_cell.alignment = Alignment(horizontal='center')
-        value_cell.border = thin_border
+        value_cell.border = thin_border()
 
     # Organic Delta Section
     ws['A13'] = "SALES BREAKDOWN (Monthly)"
@@ -731,7 +944,7 @@ def create_executive_summary_sheet(wb):
         cell.alignment = Alignment(horizontal='center')
 
     # Values row
-    ws['A15'] = '=SUMIFS(\'Business Data\'!B:B,\'Business Data\'!I:I,TEXT(EOMONTH(Settings!B7,-1)+1,"MMM YYYY"))'
+    ws['A15'] = '=SUMIFS(Biz_Total_Sales,Biz_Month,TEXT(EOMONTH(Settings!B7,-1)+1,"MMM YYYY"))'
     ws['A15'].number_format = '$#,##0'
     ws['B15'] = '=C10'  # Reference Ad Sales KPI
     ws['B15'].number_format = '$#,##0'
@@ -745,7 +958,7 @@ def create_executive_summary_sheet(wb):
     for col in range(1, 6):
         ws.cell(row=15, column=col).font = Font(bold=True, size=14)
         ws.cell(row=15, column=col).alignment = Alignment(horizontal='center')
-        ws.cell(row=15, column=col).border = thin_border
+        ws.cell(row=15, column=col).border = thin_border()
 
     # Key Insights Section
     ws['A18'] = "KEY INSIGHTS"
@@ -788,7 +1001,7 @@ def create_executive_summary_sheet(wb):
         for col in range(2, 8):
             cell = ws.cell(row=row, column=col)
             cell.number_format = fmt
-            cell.border = thin_border
+            cell.border = thin_border()
             cell.alignment = Alignment(horizontal='center')
 
     # Set column widths
@@ -798,6 +1011,8 @@ def create_executive_summary_sheet(wb):
 
 def create_segment_performance_sheet(wb):
     """Create the Segment Performance sheet matching Page 2 of HTML report."""
+    from openpyxl.styles import Font, PatternFill
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Segment Performance")
 
     # Title
@@ -831,7 +1046,7 @@ def create_segment_performance_sheet(wb):
         name_cell.font = Font(bold=True, color='FFFFFF')
 
         # Spend
-        ws.cell(row=row, column=2, value=f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}")')
+        ws.cell(row=row, column=2, value=f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Segment,"{segment}")')
         ws.cell(row=row, column=2).number_format = '$#,##0'
 
         # Spend %
@@ -839,7 +1054,7 @@ def create_segment_performance_sheet(wb):
         ws.cell(row=row, column=3).number_format = '0.0%'
 
         # Sales
-        ws.cell(row=row, column=4, value=f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}")')
+        ws.cell(row=row, column=4, value=f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Segment,"{segment}")')
         ws.cell(row=row, column=4).number_format = '$#,##0'
 
         # Sales %
@@ -859,7 +1074,7 @@ def create_segment_performance_sheet(wb):
         ws.cell(row=row, column=9).number_format = '0.0%'
 
         for col in range(1, 10):
-            ws.cell(row=row, column=col).border = thin_border
+            ws.cell(row=row, column=col).border = thin_border()
 
     # Total row
     ws.cell(row=9, column=1, value="TOTAL").font = Font(bold=True)
@@ -871,7 +1086,7 @@ def create_segment_performance_sheet(wb):
     ws.cell(row=9, column=7, value="=IF(D9>0,B9/D9,0)").number_format = '0.0%'
 
     for col in range(1, 10):
-        ws.cell(row=9, column=col).border = thin_border
+        ws.cell(row=9, column=col).border = thin_border()
         ws.cell(row=9, column=col).font = Font(bold=True)
 
     # Segment by Portfolio breakdown
@@ -887,27 +1102,27 @@ def create_segment_performance_sheet(wb):
         ws.cell(row=row, column=1, value=segment).font = Font(bold=True)
 
         # JN metrics
-        ws.cell(row=row, column=2, value=f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}",\'Campaign Data\'!Y:Y,"JN")')
+        ws.cell(row=row, column=2, value=f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Segment,"{segment}",Ad_Portfolio_Type,"JN")')
         ws.cell(row=row, column=2).number_format = '$#,##0'
 
-        ws.cell(row=row, column=3, value=f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}",\'Campaign Data\'!Y:Y,"JN")')
+        ws.cell(row=row, column=3, value=f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Segment,"{segment}",Ad_Portfolio_Type,"JN")')
         ws.cell(row=row, column=3).number_format = '$#,##0'
 
         ws.cell(row=row, column=4, value=f'=IF(B{row}>0,C{row}/B{row},0)')
         ws.cell(row=row, column=4).number_format = '0.00'
 
         # Non-JN metrics
-        ws.cell(row=row, column=5, value=f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}",\'Campaign Data\'!Y:Y,"Non-JN")')
+        ws.cell(row=row, column=5, value=f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Segment,"{segment}",Ad_Portfolio_Type,"Non-JN")')
         ws.cell(row=row, column=5).number_format = '$#,##0'
 
-        ws.cell(row=row, column=6, value=f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Z:Z,"{segment}",\'Campaign Data\'!Y:Y,"Non-JN")')
+        ws.cell(row=row, column=6, value=f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Segment,"{segment}",Ad_Portfolio_Type,"Non-JN")')
         ws.cell(row=row, column=6).number_format = '$#,##0'
 
         ws.cell(row=row, column=7, value=f'=IF(E{row}>0,F{row}/E{row},0)')
         ws.cell(row=row, column=7).number_format = '0.00'
 
         for col in range(1, 8):
-            ws.cell(row=row, column=col).border = thin_border
+            ws.cell(row=row, column=col).border = thin_border()
 
     # Set column widths
     widths = [14, 14, 12, 14, 12, 10, 10, 12, 12]
@@ -915,8 +1130,11 @@ def create_segment_performance_sheet(wb):
         ws.column_dimensions[get_column_letter(i)].width = width
 
 
-def create_performance_trends_sheet(wb):
+def create_performance_trends_sheet(wb, grids=None):
     """Create the Performance Trends sheet matching Page 3 of HTML report."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    grids = grids or {}
     ws = wb.create_sheet("Performance Trends")
 
     # Title
@@ -940,59 +1158,43 @@ def create_performance_trends_sheet(wb):
         cell = ws.cell(row=5, column=col, value=header)
         apply_header_style(cell)
 
-    # Add placeholder rows for weekly data
-    for row in range(6, 18):
-        for col in range(1, 9):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center')
-
-            if col in [2, 3]:
-                cell.number_format = '$#,##0'
-            elif col == 4:
-                cell.number_format = '0.00'
-            elif col >= 5:
-                cell.number_format = '0.0%'
-
-    # Apply conditional formatting to change columns
-    for col in ['F', 'G', 'H']:
-        apply_change_format(ws, f'{col}6:{col}17')
+    last_row = write_grid_block(
+        ws, 6, 8, grids.get('trends_weekly'),
+        formats={2: '$#,##0', 3: '$#,##0', 4: '0.00', 5: '0.0%', 6: '0.0%', 7: '0.0%', 8: '0.0%'},
+        change_cols=(6, 7, 8))
 
     # Monthly Trend Table
-    ws['A20'] = "MONTHLY PERFORMANCE"
-    ws['A20'].font = Font(bold=True, size=12, color=COLORS['primary'])
+    title_row = last_row + 3
+    ws.cell(row=title_row, column=1, value="MONTHLY PERFORMANCE").font = Font(bold=True, size=12, color=COLORS['primary'])
 
     monthly_headers = ["Month", "Spend", "Sales", "ROAS", "ACoS", "Orders", "Clicks", "CVR", "MoM Spend", "MoM Sales"]
     for col, header in enumerate(monthly_headers, 1):
-        cell = ws.cell(row=21, column=col, value=header)
+        cell = ws.cell(row=title_row + 1, column=col, value=header)
         apply_header_style(cell)
 
-    # Add placeholder rows for monthly data
-    for row in range(22, 34):
-        for col in range(1, 11):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center')
-
-    # Apply conditional formatting to change columns
-    for col in ['I', 'J']:
-        apply_change_format(ws, f'{col}22:{col}33')
+    last_row = write_grid_block(
+        ws, title_row + 2, 10, grids.get('trends_monthly'),
+        formats={2: '$#,##0', 3: '$#,##0', 4: '0.00', 5: '0.0%', 6: '#,##0', 7: '#,##0',
+                 8: '0.00%', 9: '0.0%', 10: '0.0%'},
+        change_cols=(9, 10))
 
     # Segment Trend Section
-    ws['A36'] = "SEGMENT TRENDS BY MONTH"
-    ws['A36'].font = Font(bold=True, size=12, color=COLORS['primary'])
+    title_row = last_row + 3
+    ws.cell(row=title_row, column=1, value="SEGMENT TRENDS BY MONTH").font = Font(bold=True, size=12, color=COLORS['primary'])
 
-    # Branded trends
-    ws['A38'] = "Branded"
-    ws['A38'].font = Font(bold=True, color=COLORS['branded'])
-
-    # Competitor trends
-    ws['A48'] = "Competitor"
-    ws['A48'].font = Font(bold=True, color=COLORS['competitor'])
+    segment_headers = ["Month", "Spend", "Sales", "ROAS", "ACoS", "MoM Sales"]
+    label_row = title_row + 2
+    for segment, color_key in [("Branded", 'branded'), ("Competitor", 'competitor'), ("Non-Branded", 'non_branded')]:
+        ws.cell(row=label_row, column=1, value=segment).font = Font(bold=True, color=COLORS[color_key])
+        for col, header in enumerate(segment_headers, 1):
+            cell = ws.cell(row=label_row + 1, column=col, value=header)
+            apply_header_style(cell, color_key)
 
-    # Non-Branded trends
-    ws['A58'] = "Non-Branded"
-    ws['A58'].font = Font(bold=True, color=COLORS['non_branded'])
+        last_row = write_grid_block(
+            ws, label_row + 2, 6, grids.get(f'trends_{segment}'),
+            formats={2: '$#,##0', 3: '$#,##0', 4: '0.00', 5: '0.0%', 6: '0.0%'},
+            change_cols=(6,), placeholder_rows=7)
+        label_row = last_row + 2
 
     # Set column widths
     widths = [14, 14, 14, 10, 10, 12, 12, 10, 12, 12, 12, 12]
@@ -1000,8 +1202,11 @@ def create_performance_trends_sheet(wb):
         ws.column_dimensions[get_column_letter(i)].width = width
 
 
-def create_monthly_analysis_sheet(wb):
+def create_monthly_analysis_sheet(wb, grids=None):
     """Create detailed Month-over-Month analysis sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    grids = grids or {}
     ws = wb.create_sheet("Monthly Analysis")
 
     ws['A1'] = "MONTH-OVER-MONTH ANALYSIS"
@@ -1014,31 +1219,22 @@ def create_monthly_analysis_sheet(wb):
         cell = ws.cell(row=3, column=col, value=header)
         apply_header_style(cell)
 
-    # Placeholder rows
-    for row in range(4, 16):
-        for col in range(1, 11):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center')
-
-            if col in [2, 3, 5, 6]:
-                cell.number_format = '$#,##0'
-            elif col in [4, 7, 10]:
-                cell.number_format = '0.0%'
-            elif col in [8, 9]:
-                cell.number_format = '0.00'
-
-    # Apply conditional formatting
-    for col in ['C', 'D', 'F', 'G', 'I']:
-        apply_change_format(ws, f'{col}4:{col}15')
+    write_grid_block(
+        ws, 4, 10, grids.get('monthly_analysis'),
+        formats={2: '$#,##0', 3: '$#,##0', 5: '$#,##0', 6: '$#,##0',
+                 4: '0.0%', 7: '0.0%', 10: '0.0%', 8: '0.00', 9: '0.00'},
+        change_cols=(3, 4, 6, 7, 9))
 
     # Set column widths
     for i in range(1, 11):
         ws.column_dimensions[get_column_letter(i)].width = 14
 
 
-def create_weekly_analysis_sheet(wb):
+def create_weekly_analysis_sheet(wb, grids=None):
     """Create detailed Week-over-Week analysis sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    grids = grids or {}
     ws = wb.create_sheet("Weekly Analysis")
 
     ws['A1'] = "WEEK-OVER-WEEK ANALYSIS"
@@ -1051,16 +1247,11 @@ def create_weekly_analysis_sheet(wb):
         cell = ws.cell(row=3, column=col, value=header)
         apply_header_style(cell)
 
-    # Placeholder rows
-    for row in range(4, 20):
-        for col in range(1, 12):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center')
-
-    # Apply conditional formatting
-    for col in ['D', 'E', 'G', 'H']:
-        apply_change_format(ws, f'{col}4:{col}19')
+    write_grid_block(
+        ws, 4, 11, grids.get('weekly_analysis'),
+        formats={3: '$#,##0', 4: '$#,##0', 5: '0.0%', 6: '$#,##0', 7: '$#,##0',
+                 8: '0.0%', 9: '0.00', 10: '0.0%', 11: '#,##0'},
+        change_cols=(4, 5, 7, 8), placeholder_rows=16)
 
     # Set column widths
     widths = [12, 22, 14, 14, 10, 14, 14, 10, 10, 10, 10, 10]
@@ -1068,8 +1259,11 @@ def create_weekly_analysis_sheet(wb):
         ws.column_dimensions[get_column_letter(i)].width = width
 
 
-def create_organic_vs_paid_sheet(wb):
+def create_organic_vs_paid_sheet(wb, grids=None):
     """Create Organic vs Paid analysis sheet."""
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
+    grids = grids or {}
     ws = wb.create_sheet("Organic vs Paid")
 
     ws['A1'] = "ORGANIC VS PAID ANALYSIS"
@@ -1089,9 +1283,9 @@ def create_organic_vs_paid_sheet(wb):
         apply_header_style(cell, 'branded')
 
     # Formulas
-    ws['A6'] = '=SUMIFS(\'Business Data\'!B:B,\'Business Data\'!A:A,">="&Settings!B6,\'Business Data\'!A:A,"<="&Settings!B7)'
+    ws['A6'] = f'=SUMIFS(Biz_Total_Sales,{date_window("Biz_Date")})'
     ws['A6'].number_format = '$#,##0'
-    ws['B6'] = '=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7)'
+    ws['B6'] = f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")})'
     ws['B6'].number_format = '$#,##0'
     ws['C6'] = '=MAX(0,A6-B6)'
     ws['C6'].number_format = '$#,##0'
@@ -1099,12 +1293,12 @@ def create_organic_vs_paid_sheet(wb):
     ws['D6'].number_format = '0.0%'
     ws['E6'] = '=IF(A6>0,C6/A6,0)'
     ws['E6'].number_format = '0.0%'
-    ws['F6'] = '=IF(A6>0,SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7)/A6,0)'
+    ws['F6'] = f'=IF(A6>0,SUMIFS(Ad_Spend,{date_window("Ad_Date")})/A6,0)'
     ws['F6'].number_format = '0.0%'
 
     for col in range(1, 7):
         ws.cell(row=6, column=col).font = Font(bold=True, size=14)
-        ws.cell(row=6, column=col).border = thin_border
+        ws.cell(row=6, column=col).border = thin_border()
         ws.cell(row=6, column=col).alignment = Alignment(horizontal='center')
 
     # Monthly breakdown
@@ -1116,21 +1310,10 @@ def create_organic_vs_paid_sheet(wb):
         cell = ws.cell(row=10, column=col, value=header)
         apply_header_style(cell, 'competitor')
 
-    # Placeholder rows
-    for row in range(11, 23):
-        for col in range(1, 9):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center')
-
-            if col in [2, 3, 4]:
-                cell.number_format = '$#,##0'
-            elif col >= 5:
-                cell.number_format = '0.0%'
-
-    # Apply conditional formatting
-    for col in ['F', 'G']:
-        apply_change_format(ws, f'{col}11:{col}22')
+    write_grid_block(
+        ws, 11, 8, grids.get('organic_monthly'),
+        formats={2: '$#,##0', 3: '$#,##0', 4: '$#,##0', 5: '0.0%', 6: '0.0%', 7: '0.0%', 8: '0.0%'},
+        change_cols=(6, 7))
 
     # Set column widths
     for i in range(1, 9):
@@ -1139,6 +1322,8 @@ def create_organic_vs_paid_sheet(wb):
 
 def create_portfolio_sheets(wb):
     """Create JN and Non-JN portfolio detail sheets."""
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
     portfolios = [
         ("JN Portfolio", "JN", 'jn'),
         ("Non-JN Portfolio", "Non-JN", 'non_jn'),
@@ -1161,24 +1346,24 @@ def create_portfolio_sheets(wb):
             apply_header_style(cell, color_key)
 
         # Formulas
-        ws['A5'] = f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}")'
+        ws['A5'] = f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}")'
         ws['A5'].number_format = '$#,##0'
-        ws['B5'] = f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}")'
+        ws['B5'] = f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}")'
         ws['B5'].number_format = '$#,##0'
         ws['C5'] = '=IF(A5>0,B5/A5,0)'
         ws['C5'].number_format = '0.00'
         ws['D5'] = '=IF(B5>0,A5/B5,0)'
         ws['D5'].number_format = '0.0%'
-        ws['E5'] = f'=SUMIFS(\'Campaign Data\'!U:U,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}")'
+        ws['E5'] = f'=SUMIFS(Ad_Orders,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}")'
         ws['E5'].number_format = '#,##0'
-        ws['F5'] = f'=SUMIFS(\'Campaign Data\'!N:N,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}")'
+        ws['F5'] = f'=SUMIFS(Ad_Clicks,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}")'
         ws['F5'].number_format = '#,##0'
         ws['G5'] = '=IF(F5>0,E5/F5,0)'
         ws['G5'].number_format = '0.00%'
 
         for col in range(1, 8):
             ws.cell(row=5, column=col).font = Font(bold=True, size=14)
-            ws.cell(row=5, column=col).border = thin_border
+            ws.cell(row=5, column=col).border = thin_border()
             ws.cell(row=5, column=col).alignment = Alignment(horizontal='center')
 
         # Segment breakdown
@@ -1194,10 +1379,10 @@ def create_portfolio_sheets(wb):
         for row, segment in enumerate(segments, 10):
             ws.cell(row=row, column=1, value=segment).font = Font(bold=True)
 
-            ws.cell(row=row, column=2, value=f'=SUMIFS(\'Campaign Data\'!Q:Q,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}",\'Campaign Data\'!Z:Z,"{segment}")')
+            ws.cell(row=row, column=2, value=f'=SUMIFS(Ad_Spend,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}",Ad_Segment,"{segment}")')
             ws.cell(row=row, column=2).number_format = '$#,##0'
 
-            ws.cell(row=row, column=3, value=f'=SUMIFS(\'Campaign Data\'!X:X,\'Campaign Data\'!A:A,">="&Settings!B6,\'Campaign Data\'!A:A,"<="&Settings!B7,\'Campaign Data\'!Y:Y,"{portfolio_filter}",\'Campaign Data\'!Z:Z,"{segment}")')
+            ws.cell(row=row, column=3, value=f'=SUMIFS(Ad_Sales,{date_window("Ad_Date")},Ad_Portfolio_Type,"{portfolio_filter}",Ad_Segment,"{segment}")')
             ws.cell(row=row, column=3).number_format = '$#,##0'
 
             ws.cell(row=row, column=4, value=f'=IF(B{row}>0,C{row}/B{row},0)')
@@ -1207,127 +1392,67 @@ def create_portfolio_sheets(wb):
             ws.cell(row=row, column=5).number_format = '0.0%'
 
             for col in range(1, 6):
-                ws.cell(row=row, column=col).border = thin_border
+                ws.cell(row=row, column=col).border = thin_border()
 
         # Set column widths
         for i in range(1, 8):
             ws.column_dimensions[get_column_letter(i)].width = 14
 
 
-def create_pivot_sheets(wb):
+def create_pivot_sheets(wb, grids=None):
     """Create pivot-style analysis sheets."""
-    # Pivot - Monthly by Portfolio
-    ws = wb.create_sheet("Pivot - Portfolio")
-
-    ws['A1'] = "SPEND BY MONTH & PORTFOLIO TYPE"
-    ws['A1'].font = Font(bold=True, size=14, color=COLORS['primary'])
-
-    headers = ["Month", "JN", "Non-JN", "Total"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=3, column=col, value=header)
-        apply_header_style(cell, 'jn' if header == 'JN' else 'non_jn' if header == 'Non-JN' else 'primary')
-
-    # Placeholder rows
-    for row in range(4, 16):
-        for col in range(1, 5):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '$#,##0'
-
-    # AD SALES section
-    ws['A18'] = "AD SALES BY MONTH & PORTFOLIO TYPE"
-    ws['A18'].font = Font(bold=True, size=14, color=COLORS['jn'])
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=20, column=col, value=header)
-        apply_header_style(cell, 'jn' if header == 'JN' else 'non_jn' if header == 'Non-JN' else 'primary')
-
-    for row in range(21, 33):
-        for col in range(1, 5):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '$#,##0'
-
-    # ROAS section
-    ws['A35'] = "ROAS BY MONTH & PORTFOLIO TYPE"
-    ws['A35'].font = Font(bold=True, size=14, color=COLORS['branded'])
-
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=37, column=col, value=header)
-        apply_header_style(cell, 'branded')
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    grids = grids or {}
+    pivots = [
+        ("Pivot - Portfolio", 'portfolio', "PORTFOLIO TYPE", ["JN", "Non-JN"]),
+        ("Pivot - Segment", 'segment', "SEGMENT", ["Branded", "Competitor", "Non-Branded"]),
+    ]
+    header_colors = {"JN": 'jn', "Non-JN": 'non_jn', "Branded": 'branded',
+                     "Competitor": 'competitor', "Non-Branded": 'non_branded'}
+    sections = [
+        ('spend', "SPEND", 'primary', '$#,##0'),
+        ('sales', "AD SALES", 'jn', '$#,##0'),
+        ('roas', "ROAS", 'branded', '0.00'),
+    ]
 
-    for row in range(38, 50):
-        for col in range(1, 5):
-            cell = ws.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '0.00'
+    for sheet_name, key, dimension, members in pivots:
+        ws = wb.create_sheet(sheet_name)
+        headers = ["Month"] + members + ["Total"]
+        ncols = len(headers)
 
-    for i in range(1, 5):
-        ws.column_dimensions[get_column_letter(i)].width = 15
+        title_row = 1
+        for metric, title, title_color, number_format in sections:
+            ws.cell(row=title_row, column=1, value=f"{title} BY MONTH & {dimension}").font = Font(bold=True, size=14, color=COLORS[title_color])
 
-    # Pivot - Monthly by Segment
-    ws2 = wb.create_sheet("Pivot - Segment")
-
-    ws2['A1'] = "SPEND BY MONTH & SEGMENT"
-    ws2['A1'].font = Font(bold=True, size=14, color=COLORS['primary'])
-
-    seg_headers = ["Month", "Branded", "Competitor", "Non-Branded", "Total"]
-    for col, header in enumerate(seg_headers, 1):
-        cell = ws2.cell(row=3, column=col, value=header)
-        color = 'branded' if header == 'Branded' else 'competitor' if header == 'Competitor' else 'non_branded' if header == 'Non-Branded' else 'primary'
-        apply_header_style(cell, color)
-
-    for row in range(4, 16):
-        for col in range(1, 6):
-            cell = ws2.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '$#,##0'
-
-    # AD SALES by Segment
-    ws2['A18'] = "AD SALES BY MONTH & SEGMENT"
-    ws2['A18'].font = Font(bold=True, size=14, color=COLORS['jn'])
-
-    for col, header in enumerate(seg_headers, 1):
-        cell = ws2.cell(row=20, column=col, value=header)
-        color = 'branded' if header == 'Branded' else 'competitor' if header == 'Competitor' else 'non_branded' if header == 'Non-Branded' else 'primary'
-        apply_header_style(cell, color)
-
-    for row in range(21, 33):
-        for col in range(1, 6):
-            cell = ws2.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '$#,##0'
-
-    # ROAS by Segment
-    ws2['A35'] = "ROAS BY MONTH & SEGMENT"
-    ws2['A35'].font = Font(bold=True, size=14, color=COLORS['branded'])
-
-    for col, header in enumerate(seg_headers, 1):
-        cell = ws2.cell(row=37, column=col, value=header)
-        apply_header_style(cell, 'branded')
+            for col, header in enumerate(headers, 1):
+                cell = ws.cell(row=title_row + 2, column=col, value=header)
+                # ROAS headers share one color; the others color by member
+                apply_header_style(cell, 'branded' if metric == 'roas' else header_colors.get(header, 'primary'))
 
-    for row in range(38, 50):
-        for col in range(1, 6):
-            cell = ws2.cell(row=row, column=col)
-            cell.border = thin_border
-            if col > 1:
-                cell.number_format = '0.00'
+            last_row = write_grid_block(
+                ws, title_row + 3, ncols, grids.get(f'{key}_{metric}'),
+                formats={col: number_format for col in range(2, ncols + 1)}, center=False)
+            title_row = last_row + 3
 
-    for i in range(1, 6):
-        ws2.column_dimensions[get_column_letter(i)].width = 15
+        for i in range(1, ncols + 1):
+            ws.column_dimensions[get_column_letter(i)].width = 15
 
 
 # ============================================================================
 # MAIN FUNCTION
 # ============================================================================
 
-def create_campaign_report_workbook():
-    """Create the complete Campaign Performance Report Excel workbook."""
+def create_campaign_report_workbook(now=None, use_agg=False, grids=None):
+    """Create the complete Campaign Performance Report Excel workbook.
+
+    With use_agg=True the workbook gets the hidden Agg sheet and all campaign
+    formulas read from it; generate_report_from_data.populate_agg_sheet fills it.
+    grids holds precomputed rows for the trend, analysis and pivot blocks
+    (see generate_report_from_data.template_grids); without it those blocks
+    are empty placeholders.
+    """
+    from openpyxl import Workbook
     wb = Workbook()
 
     # Remove default sheet
@@ -1336,35 +1461,133 @@ def create_campaign_report_workbook():
 
     # Create all sheets in order
     create_instructions_sheet(wb)
-    create_settings_sheet(wb)
+    create_settings_sheet(wb, now, use_agg)
     create_dashboard_sheet(wb)
     create_executive_summary_sheet(wb)
     create_segment_performance_sheet(wb)
-    create_performance_trends_sheet(wb)
-    create_monthly_analysis_sheet(wb)
-    create_weekly_analysis_sheet(wb)
-    create_organic_vs_paid_sheet(wb)
+    create_performance_trends_sheet(wb, grids)
+    create_monthly_analysis_sheet(wb, grids)
+    create_weekly_analysis_sheet(wb, grids)
+    create_organic_vs_paid_sheet(wb, grids)
     create_portfolio_sheets(wb)
-    create_pivot_sheets(wb)
+    create_pivot_sheets(wb, grids)
     create_campaign_data_sheet(wb)
     create_business_data_sheet(wb)
+    if use_agg:
+        create_agg_sheet(wb)
+    add_data_range_names(wb, use_agg)
 
     return wb
 
 
-def main():
+# ============================================================================
+# TEMPLATE SNAPSHOT CACHE
+# ============================================================================
+
+# The template is identical on every run apart from the Settings cells in
+# settings_dynamic_values(). It is built once with a fixed timestamp, cached
+# as bytes keyed by a hash of this module, and patched per run.
+TEMPLATE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".template_cache")
+SNAPSHOT_TIME = datetime(2000, 1, 1)
+
+_template_snapshots = {}
+
+
+def openpyxl_version_stamp():
+    """Bytes identifying the installed openpyxl version, read without importing it.
+
+    Importing openpyxl (or importlib.metadata) would cost more than serving
+    the cached template, so this reads the package's _constants.py, which
+    holds __version__.
+    """
+    spec = importlib.util.find_spec('openpyxl')
+    try:
+        with open(os.path.join(os.path.dirname(spec.origin), '_constants.py'), 'rb') as f:
+            return f.read()
+    except (OSError, TypeError):
+        import openpyxl
+        return openpyxl.__version__.encode()
+
+
+def template_version_hash():
+    """Hash of this module's source and the openpyxl version."""
+    with open(os.path.abspath(__file__), 'rb') as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(openpyxl_version_stamp())
+    return digest.hexdigest()[:16]
+
+
+def get_template_snapshot(use_cache=True):
+    """Return the static template as xlsx bytes, building it only when needed."""
+    key = template_version_hash()
+    if use_cache and key in _template_snapshots:
+        return _template_snapshots[key]
+
+    cache_path = os.path.join(TEMPLATE_CACHE_DIR, f"template_{key}.xlsx")
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            snapshot = f.read()
+    else:
+        wb = create_campaign_report_workbook(now=SNAPSHOT_TIME)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        snapshot = buffer.getvalue()
+
+        if use_cache:
+            try:
+                os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+                tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(snapshot)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                pass  # Read-only install - keep the in-memory copy only
+
+    _template_snapshots[key] = snapshot
+    return snapshot
+
+
+def build_template_bytes(now=None, use_cache=True):
+    """Return a fresh template as xlsx bytes with the Settings dates set to now."""
+    if now is None:
+        now = datetime.now()
+    snapshot = get_template_snapshot(use_cache)
+    return patch_workbook(snapshot, {"Settings": settings_dynamic_values(now)}, when=now)
+
+
+def main(argv=None):
     """Main entry point."""
+    parser = argparse.ArgumentParser(description="Generate the Campaign Performance Report Excel template.")
+    parser.add_argument('--campaign', help="Campaign report CSV - hydrate the template with this data")
+    parser.add_argument('--business', help="Business report CSV to hydrate alongside the campaign data")
+    parser.add_argument('--output', help="Output path (default: Campaign_Report_Template_v3.xlsx next to this script)")
+    parser.add_argument('--cached-values', action='store_true',
+                        help="With --campaign: store each formula's computed result so the file opens with numbers")
+    parser.add_argument('--verify', action='store_true',
+                        help="With --cached-values: check cached values against totals computed from the raw rows")
+    args = parser.parse_args(argv)
+
+    # Save to file (v3 = Excel Online compatible, no formula text)
+    output_path = args.output or os.path.join(os.path.dirname(__file__), "Campaign_Report_Template_v3.xlsx")
+
+    if args.campaign:
+        if not os.path.isfile(args.campaign):
+            parser.error(f"campaign report not found: {args.campaign}")
+        from generate_report_from_data import hydrate_template
+        hydrate_template(args.campaign, args.business, output_path,
+                         cached_values=args.cached_values or args.verify, verify=args.verify)
+        return
+
     print("Generating Campaign Performance Report Excel Template...")
 
-    wb = create_campaign_report_workbook()
+    template = build_template_bytes()
 
-    # Save to file (v3 = Excel Online compatible, no formula text)
-    output_path = os.path.join(os.path.dirname(__file__), "Campaign_Report_Template_v3.xlsx")
-    wb.save(output_path)
+    with open(output_path, 'wb') as f:
+        f.write(template)
 
     print(f"Excel template saved to: {output_path}")
     print("\nThe workbook contains the following sheets:")
-    for sheet in wb.sheetnames:
+    for sheet in package_sheet_names(template):
         print(f"  - {sheet}")
 
     print("\nInstructions:")
@@ -1373,6 +1596,7 @@ def main():
     print("3. Paste your Business Report CSV data into 'Business Data' sheet (starting row 5)")
     print("4. Adjust date range in 'Settings' sheet")
     print("5. Use Portfolio and Time Period dropdowns to filter views")
+    print("\nOr fill it automatically: python generate_excel_report.py --campaign <campaign.csv> --business <business.csv>")
 
 
 if __name__ == "__main__":
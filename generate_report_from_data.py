@@ -5,25 +5,52 @@ Reads CSV files directly and generates a complete Excel report.
 No manual data pasting required - just run this script.
 """
 
+import io
 import os
-import pandas as pd
-from datetime import datetime, timedelta
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.formatting.rule import CellIsRule
+import sys
+import argparse
+import contextlib
+import importlib.util
+from datetime import datetime
+from generate_excel_report import (
+    create_campaign_report_workbook, thin_border, add_format_prototype_row, data_range_sources, DATA_START_ROW,
+    CAMPAIGN_HEADERS, BUSINESS_HEADERS, CAMPAIGN_COLUMN_FORMATS, BUSINESS_COLUMN_FORMATS,
+)
+from xlsx_package import row_styles, write_package_with_rows, patch_workbook, escape, SharedStringTable
+from report_graph import ReportGraph
+from stage_profiler import StageProfiler, stage, profiled
+from classification_rules import get_classifier, use_rules
 import warnings
 warnings.filterwarnings('ignore')
 
+
+# pandas, numpy and openpyxl take about 0.5s to import together, so the
+# functions that need them import them: argument and missing-input errors are
+# reported before any of them is loaded.
+
 # ============================================================================
-# CONFIGURATION - Update these paths if needed
+# CONFIGURATION - Defaults for the command-line options (see --help)
 # ============================================================================
 
 CAMPAIGN_FILE = "Krelll_-Campaign_Test.csv"
 BUSINESS_FILE = "BusinessReport- Sep2024 to Jan 2026.csv"
 OUTPUT_FILE = "Campaign_Performance_Report.xlsx"
 
+# Size-optimized output: raw data sheets streamed with a shared string table,
+# positional cells, cents-rounded amounts and one style per column.
+# None keeps zlib's default compression level.
+COMPACT_OUTPUT = False
+ZIP_COMPRESSLEVEL = None
+
+# Engine for loading the exports and aggregating the raw rows: 'pandas' or
+# 'polars' (needs polars; see polars_engine.py)
+ENGINE = 'pandas'
+ENGINES = ['pandas', 'polars']
+
+# File format for --export-aggregates: 'parquet' (needs pyarrow or
+# fastparquet), 'csv', or None for parquet when installed and csv otherwise
+AGGREGATE_FORMAT = None
+
 # ============================================================================
 # STYLE DEFINITIONS
 # ============================================================================
@@ -42,30 +69,27 @@ COLORS = {
     'white': 'FFFFFF',
 }
 
-thin_border = Border(
-    left=Side(style='thin', color='D1D5DB'),
-    right=Side(style='thin', color='D1D5DB'),
-    top=Side(style='thin', color='D1D5DB'),
-    bottom=Side(style='thin', color='D1D5DB')
-)
-
 def apply_header_style(cell, color='primary'):
+    from openpyxl.styles import Font, PatternFill, Alignment
     cell.font = Font(bold=True, color='FFFFFF', size=11)
     cell.fill = PatternFill(start_color=COLORS[color], end_color=COLORS[color], fill_type='solid')
     cell.alignment = Alignment(horizontal='center', vertical='center')
-    cell.border = thin_border
+    cell.border = thin_border()
 
 def format_currency(value):
+    import pandas as pd
     if pd.isna(value) or value == 0:
         return "$0"
     return f"${value:,.0f}"
 
 def format_percent(value):
+    import pandas as pd
     if pd.isna(value):
         return "0.0%"
     return f"{value:.1f}%"
 
 def format_decimal(value):
+    import pandas as pd
     if pd.isna(value):
         return "0.00"
     return f"{value:.2f}"
@@ -76,6 +100,7 @@ def format_decimal(value):
 
 def parse_currency(value):
     """Parse currency string to float."""
+    import pandas as pd
     if pd.isna(value):
         return 0.0
     if isinstance(value, (int, float)):
@@ -89,6 +114,7 @@ def parse_currency(value):
 
 def parse_percent(value):
     """Parse percentage string to float."""
+    import pandas as pd
     if pd.isna(value):
         return 0.0
     if isinstance(value, (int, float)):
@@ -100,50 +126,67 @@ def parse_percent(value):
         return 0.0
 
 def classify_portfolio(portfolio_name):
-    """Classify portfolio as JN or Non-JN."""
-    if pd.isna(portfolio_name):
-        return 'Non-JN'
-    return 'JN' if 'jn' in str(portfolio_name).lower() else 'Non-JN'
+    """Classify portfolio as JN or Non-JN (rules in classification_rules.json)."""
+    return get_classifier('portfolio')(portfolio_name)
 
 def classify_segment(campaign_name):
-    """Classify campaign segment."""
-    if pd.isna(campaign_name):
-        return 'Non-Branded'
-    name_lower = str(campaign_name).lower()
-    if 'branded' in name_lower:
-        return 'Branded'
-    elif ' pat ' in name_lower or '- pat -' in name_lower or '_pat_' in name_lower:
-        return 'Competitor'
-    else:
-        return 'Non-Branded'
-
+    """Classify campaign segment (rules in classification_rules.json)."""
+    return get_classifier('segment')(campaign_name)
+
+def classify_series(values, kind):
+    """Labels for a whole column: the rules run once per distinct value (see classification_rules)."""
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    labels = np.asarray(get_classifier(kind).labels(uniques), dtype=object)
+    return pd.Series(labels[codes], index=values.index)
+
+def classify_portfolio_series(portfolio_names):
+    """Vectorized classify_portfolio for a whole column."""
+    return classify_series(portfolio_names, 'portfolio')
+
+def classify_segment_series(campaign_names):
+    """Vectorized classify_segment for a whole column."""
+    return classify_series(campaign_names, 'segment')
+
+@profiled()
 def load_campaign_data(filepath):
     """Load and process campaign data."""
+    import pandas as pd
     print(f"Loading campaign data from {filepath}...")
 
-    df = pd.read_csv(filepath, encoding='utf-8-sig')
+    with stage('campaign: read_csv') as timing:
+        df = pd.read_csv(filepath, encoding='utf-8-sig')
+        timing['rows'] = len(df)
     print(f"  Loaded {len(df):,} rows")
     print(f"  Columns: {list(df.columns)}")
 
     # Parse date - handle "Sep 01, 2024" format
-    df['Date'] = pd.to_datetime(df['Date'], format='mixed', dayfirst=False)
+    with stage('campaign: parse dates', rows=len(df)):
+        df['Date'] = pd.to_datetime(df['Date'], format='mixed', dayfirst=False)
 
     # Parse numeric columns
-    df['Spend'] = df['Spend'].apply(parse_currency)
-    df['Sales'] = df['7 Day Total Sales '].apply(parse_currency)
-    df['Orders'] = df['7 Day Total Orders (#)'].apply(parse_currency)
-    df['Impressions'] = df['Impressions'].apply(parse_currency)
-    df['Clicks'] = df['Clicks'].apply(parse_currency)
+    with stage('campaign: parse currency', rows=len(df)):
+        df['Spend'] = df['Spend'].apply(parse_currency)
+        df['Sales'] = df['7 Day Total Sales '].apply(parse_currency)
+        df['Orders'] = df['7 Day Total Orders (#)'].apply(parse_currency)
+        df['Impressions'] = df['Impressions'].apply(parse_currency)
+        df['Clicks'] = df['Clicks'].apply(parse_currency)
+        for source, column in LAST_YEAR_LOAD_COLUMNS.items():
+            if source in df.columns:
+                df[column] = parse_currency_series(df[source])
 
     # Classify
-    df['Portfolio_Type'] = df['Portfolio name'].apply(classify_portfolio)
-    df['Segment'] = df['Campaign Name'].apply(classify_segment)
+    with stage('campaign: classify', rows=len(df)):
+        df['Portfolio_Type'] = classify_portfolio_series(df['Portfolio name'])
+        df['Segment'] = classify_segment_series(df['Campaign Name'])
 
     # Add time dimensions
-    df['Month'] = df['Date'].dt.to_period('M')
-    df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
-    df['Week'] = df['Date'].dt.strftime('%Y-W%U')
-    df['Year'] = df['Date'].dt.year
+    with stage('campaign: time dimensions', rows=len(df)):
+        df['Month'] = df['Date'].dt.to_period('M')
+        df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
+        df['Week'] = df['Date'].dt.strftime('%Y-W%U')
+        df['Year'] = df['Date'].dt.year
 
     print(f"  Date range: {df['Date'].min()} to {df['Date'].max()}")
     print(f"  Portfolio types: {df['Portfolio_Type'].value_counts().to_dict()}")
@@ -151,30 +194,177 @@ def load_campaign_data(filepath):
 
     return df
 
+@profiled()
 def load_business_data(filepath):
     """Load and process business report data."""
+    import pandas as pd
     print(f"Loading business data from {filepath}...")
 
-    df = pd.read_csv(filepath, encoding='utf-8-sig')
+    with stage('business: read_csv') as timing:
+        df = pd.read_csv(filepath, encoding='utf-8-sig')
+        timing['rows'] = len(df)
     print(f"  Loaded {len(df):,} rows")
 
     # Parse date - handle "9/1/24" format
-    df['Date'] = pd.to_datetime(df['Date'], format='mixed', dayfirst=False)
+    with stage('business: parse dates', rows=len(df)):
+        df['Date'] = pd.to_datetime(df['Date'], format='mixed', dayfirst=False)
 
     # Parse numeric columns
-    df['Total_Sales'] = df['Ordered Product Sales'].apply(parse_currency)
-    df['Units'] = df['Units Ordered'].apply(parse_currency)
-    df['Sessions'] = df['Sessions - Total'].apply(parse_currency)
+    with stage('business: parse currency', rows=len(df)):
+        df['Total_Sales'] = df['Ordered Product Sales'].apply(parse_currency)
+        df['Units'] = df['Units Ordered'].apply(parse_currency)
+        df['Sessions'] = df['Sessions - Total'].apply(parse_currency)
 
     # Add time dimensions
-    df['Month'] = df['Date'].dt.to_period('M')
-    df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
-    df['Week'] = df['Date'].dt.strftime('%Y-W%U')
+    with stage('business: time dimensions', rows=len(df)):
+        df['Month'] = df['Date'].dt.to_period('M')
+        df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
+        df['Week'] = df['Date'].dt.strftime('%Y-W%U')
+
+    print(f"  Date range: {df['Date'].min()} to {df['Date'].max()}")
+
+    return df
+
+# Export columns the report reads; the chunked loader skips the rest
+CAMPAIGN_LOAD_COLUMNS = {
+    'Date': 'Date', 'Portfolio name': 'Portfolio name', 'Campaign Name': 'Campaign Name',
+    'Spend': 'Spend', '7 Day Total Sales ': 'Sales', '7 Day Total Orders (#)': 'Orders',
+    'Impressions': 'Impressions', 'Clicks': 'Clicks',
+}
+# Prior-year columns of the campaign export, parsed when present. Last Year
+# CPC is not read: it is recomputed from the summed spend and clicks.
+LAST_YEAR_LOAD_COLUMNS = {
+    'Last Year Impressions': 'LY_Impressions', 'Last Year Clicks': 'LY_Clicks', 'Last Year Spend': 'LY_Spend',
+}
+LAST_YEAR_COLUMNS = list(LAST_YEAR_LOAD_COLUMNS.values())
+LOAD_CHUNK_ROWS = 250000
+
+def parse_currency_series(values):
+    """Vectorized parse_currency for a whole column."""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float).fillna(0.0)
+    cleaned = values.astype(str).str.replace(r'[$,"]', '', regex=True).str.strip()
+    return pd.to_numeric(cleaned, errors='coerce').astype(float).fillna(0.0).where(values.notna(), 0.0)
+
+def dedupe_strings(values):
+    """Column as an object array whose repeated values share one string object.
+
+    read_csv and strftime create a new string per cell; factorizing first
+    keeps one copy per distinct value (8 bytes per row instead of ~60).
+    """
+    import numpy as np
+    import pandas as pd
+    codes, uniques = pd.factorize(values)
+    uniques = np.append(np.asarray(uniques, dtype=object), None)
+    return uniques[codes]
+
+@profiled()
+def load_campaign_data_chunked(filepath, chunk_rows=LOAD_CHUNK_ROWS):
+    """Load campaign data in chunks, keeping only the columns the report uses.
+
+    Produces the same report columns as load_campaign_data while holding at
+    most one raw chunk in memory; repeated names and labels share one string
+    object, so the result takes roughly 120 bytes per row.
+    """
+    import pandas as pd
+    print(f"Loading campaign data from {filepath} in chunks of {chunk_rows:,} rows...")
+
+    chunks = []
+    header = pd.read_csv(filepath, encoding='utf-8-sig', nrows=0).columns
+    last_year = {source: column for source, column in LAST_YEAR_LOAD_COLUMNS.items() if source in header}
+    reader = pd.read_csv(filepath, encoding='utf-8-sig', usecols=list(CAMPAIGN_LOAD_COLUMNS) + list(last_year),
+                         chunksize=chunk_rows, dtype=str)
+    with stage('campaign: read chunks') as timing:
+        for raw in reader:
+            raw = raw.rename(columns=CAMPAIGN_LOAD_COLUMNS)
+            chunk = pd.DataFrame({
+                'Date': pd.to_datetime(raw['Date'], format='mixed', dayfirst=False),
+                'Portfolio name': dedupe_strings(raw['Portfolio name']),
+                'Campaign Name': dedupe_strings(raw['Campaign Name']),
+            }, index=raw.index)
+            for column in ['Spend', 'Sales', 'Orders', 'Impressions', 'Clicks']:
+                chunk[column] = parse_currency_series(raw[column])
+            for source, column in last_year.items():
+                chunk[column] = parse_currency_series(raw[source])
+            chunks.append(chunk)
+            del raw
+        if not chunks:
+            raise ValueError(f"No campaign rows in {filepath}")
+        df = pd.concat(chunks, ignore_index=True)
+        del chunks
+        timing['rows'] = len(df)
+    print(f"  Loaded {len(df):,} rows")
+
+    with stage('campaign: classify', rows=len(df)):
+        df['Portfolio name'] = dedupe_strings(df['Portfolio name'])
+        df['Campaign Name'] = dedupe_strings(df['Campaign Name'])
+        df['Portfolio_Type'] = dedupe_strings(classify_portfolio_series(df['Portfolio name']))
+        df['Segment'] = dedupe_strings(classify_segment_series(df['Campaign Name']))
+
+    # Time labels are computed once per distinct date
+    with stage('campaign: time dimensions', rows=len(df)):
+        codes, dates = pd.factorize(df['Date'])
+        dates = pd.DatetimeIndex(dates)
+        df['Month'] = df['Date'].dt.to_period('M')
+        df['Month_Label'] = dedupe_strings(dates.strftime('%b %Y').to_numpy(dtype=object)[codes])
+        df['Week'] = dedupe_strings(dates.strftime('%Y-W%U').to_numpy(dtype=object)[codes])
+        df['Year'] = df['Date'].dt.year
 
     print(f"  Date range: {df['Date'].min()} to {df['Date'].max()}")
+    print(f"  Portfolio types: {df['Portfolio_Type'].value_counts().to_dict()}")
+    print(f"  Segments: {df['Segment'].value_counts().to_dict()}")
 
     return df
 
+# ============================================================================
+# EXPORT MERGING
+# ============================================================================
+
+# Rows of overlapping exports that describe the same campaign day
+MERGE_KEY_COLUMNS = ['Date', 'Campaign Name', 'Portfolio name']
+
+def export_paths(paths):
+    """One export path or a list of them, as a list."""
+    return [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+
+def merge_key_hashes(df):
+    """uint64 hash of each row's MERGE_KEY_COLUMNS, computed column-wise in C."""
+    import pandas as pd
+    return pd.util.hash_pandas_object(df[MERGE_KEY_COLUMNS], index=False).to_numpy()
+
+def print_merge_summary(names, rows, replaced):
+    """Report how many rows of each export were replaced by later ones."""
+    print(f"Merged {len(names)} campaign exports: {rows:,} rows, "
+          f"{int(sum(replaced)):,} overlapping rows replaced by later exports")
+    for name, count in zip(names, replaced):
+        if count:
+            print(f"  {name}: {int(count):,} rows replaced")
+
+@profiled()
+def merge_campaign_exports(frames, names=None):
+    """Concatenate loaded campaign exports without double-counting their overlap.
+
+    frames are ordered oldest to newest. When a (Date, Campaign Name,
+    Portfolio name) key appears in several exports, only the rows of the
+    latest export holding it are kept ("latest file wins"); repeated rows
+    within one export are kept, as for a single file. Keys are compared by
+    their 64-bit hash and the latest export per key is found with one
+    grouped max, so there is no Python loop over rows.
+    """
+    import numpy as np
+    import pandas as pd
+    names = names or [f"export {number + 1}" for number in range(len(frames))]
+    df = pd.concat(frames, ignore_index=True)
+    with stage('campaign: merge exports', rows=len(df)):
+        source = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+        latest = pd.Series(source).groupby(merge_key_hashes(df)).transform('max').to_numpy()
+        keep = source == latest
+        replaced = np.bincount(source[~keep], minlength=len(frames))
+        df = df[keep].reset_index(drop=True)
+    print_merge_summary(names, len(df), replaced)
+    return df
+
 # ============================================================================
 # AGGREGATION FUNCTIONS
 # ============================================================================
@@ -200,16 +390,43 @@ def calc_metrics(df):
         'CTR': (clicks / impressions * 100) if impressions > 0 else 0,
     }
 
+METRIC_COLUMNS = ['Spend', 'Sales', 'Orders', 'Clicks', 'Impressions']
+
+def ratio(numerator, denominator):
+    """Element-wise division that yields 0 where the denominator is 0."""
+    import numpy as np
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    out = np.zeros(np.broadcast(numerator, denominator).shape)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out
+
+def summarize(df, keys):
+    """Sum the metric columns by keys and add the calc_metrics ratios.
+
+    Works on raw rows or on any pre-summed frame (such as aggregate_daily),
+    since every ratio is computed from the summed columns.
+    """
+    result = df.groupby(keys, observed=True)[METRIC_COLUMNS].sum().reset_index()
+    result['ROAS'] = ratio(result['Sales'], result['Spend'])
+    result['ACoS'] = ratio(result['Spend'], result['Sales']) * 100
+    result['CVR'] = ratio(result['Orders'], result['Clicks']) * 100
+    result['CPC'] = ratio(result['Spend'], result['Clicks'])
+    result['CTR'] = ratio(result['Clicks'], result['Impressions']) * 100
+    return result
+
+def month_order(df):
+    """Month labels in chronological order."""
+    return list(df.groupby('Month_Label')['Date'].min().sort_values().index)
+
+@profiled()
 def aggregate_by_month(campaign_df, business_df=None):
     """Aggregate data by month."""
-    monthly = campaign_df.groupby('Month_Label').apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
+    monthly = summarize(campaign_df, 'Month_Label')
 
     # Sort by actual date
-    month_order = campaign_df.groupby('Month_Label')['Date'].min().sort_values()
-    monthly['sort_order'] = monthly['Month_Label'].map({m: i for i, m in enumerate(month_order.index)})
-    monthly = monthly.sort_values('sort_order').drop('sort_order', axis=1)
+    order = {m: i for i, m in enumerate(month_order(campaign_df))}
+    monthly = monthly.sort_values('Month_Label', key=lambda labels: labels.map(order)).reset_index(drop=True)
 
     # Add business data if available
     if business_df is not None:
@@ -224,48 +441,474 @@ def aggregate_by_month(campaign_df, business_df=None):
 
     return monthly
 
+@profiled()
 def aggregate_by_week(campaign_df):
     """Aggregate data by week."""
-    weekly = campaign_df.groupby('Week').apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
-    weekly = weekly.sort_values('Week')
-    return weekly
+    return summarize(campaign_df, 'Week').sort_values('Week').reset_index(drop=True)
 
+@profiled()
 def aggregate_by_segment(campaign_df):
     """Aggregate data by segment."""
-    segments = campaign_df.groupby('Segment').apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
-    return segments
+    return summarize(campaign_df, 'Segment')
 
+@profiled()
 def aggregate_by_portfolio(campaign_df):
     """Aggregate data by portfolio type."""
-    portfolios = campaign_df.groupby('Portfolio_Type').apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
-    return portfolios
+    return summarize(campaign_df, 'Portfolio_Type')
 
+@profiled()
 def aggregate_by_portfolio_and_month(campaign_df):
     """Aggregate data by portfolio and month."""
-    result = campaign_df.groupby(['Month_Label', 'Portfolio_Type']).apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
-    return result
+    return summarize(campaign_df, ['Month_Label', 'Portfolio_Type'])
 
+@profiled()
 def aggregate_by_segment_and_month(campaign_df):
     """Aggregate data by segment and month."""
-    result = campaign_df.groupby(['Month_Label', 'Segment']).apply(
-        lambda x: pd.Series(calc_metrics(x))
-    ).reset_index()
-    return result
+    return summarize(campaign_df, ['Month_Label', 'Segment'])
+
+@profiled()
+def aggregate_daily(campaign_df):
+    """Aggregate data by day, portfolio type and segment (feeds the template's Agg sheet).
+
+    The export's Last Year columns, when loaded, are summed in the same pass.
+    """
+    metrics = METRIC_COLUMNS + [column for column in LAST_YEAR_COLUMNS if column in campaign_df.columns]
+    daily = campaign_df.groupby(['Date', 'Portfolio_Type', 'Segment'], observed=True).agg(
+        {column: 'sum' for column in metrics}).reset_index()
+
+    daily['Week'] = daily['Date'].dt.strftime('%Y-W%U')
+    daily['Month_Label'] = daily['Date'].dt.strftime('%b %Y')
+    return daily
+
+# This-year metric -> the export's prior-year column
+YOY_METRICS = {'Spend': 'LY_Spend', 'Clicks': 'LY_Clicks', 'Impressions': 'LY_Impressions'}
+
+def yoy_changes(sums):
+    """Add CPC, LY_CPC and the YoY change (%) of each YOY_METRICS column and of CPC."""
+    sums['CPC'] = ratio(sums['Spend'], sums['Clicks'])
+    sums['LY_CPC'] = ratio(sums['LY_Spend'], sums['LY_Clicks'])
+    for metric, last_year in [*YOY_METRICS.items(), ('CPC', 'LY_CPC')]:
+        sums[f'{metric}_YoY'] = ratio(sums[metric] - sums[last_year], sums[last_year]) * 100
+    return sums
+
+@profiled()
+def aggregate_yoy(daily, keys=('Portfolio_Type', 'Segment')):
+    """This year against the export's Last Year columns by month and keys.
+
+    Read from the daily totals, so no second year of data is loaded. None
+    when the export has no Last Year columns.
+    """
+    if not set(LAST_YEAR_COLUMNS) <= set(daily.columns):
+        return None
+    keys = ['Month_Label', *keys]
+    yoy = daily.groupby(keys, observed=True)[[*YOY_METRICS, *YOY_METRICS.values()]].sum().reset_index()
+    order = {m: i for i, m in enumerate(month_order(daily))}
+    yoy = yoy.sort_values(keys, key=lambda values: values.map(order) if values.name == 'Month_Label' else values)
+    return yoy_changes(yoy.reset_index(drop=True))
+
+# ============================================================================
+# INTERACTIVE TEMPLATE (AGG SHEET)
+# ============================================================================
+
+AGG_COLUMNS = ['Date', 'Portfolio_Type', 'Segment', 'Week', 'Month_Label',
+               'Spend', 'Sales', 'Orders', 'Clicks', 'Impressions']
+
+def populate_agg_sheet(wb, daily_data):
+    """Write the daily aggregates into the template's hidden Agg sheet."""
+    ws = wb['Agg']
+
+    for row, values in enumerate(daily_data[AGG_COLUMNS].itertuples(index=False), DATA_START_ROW):
+        for col, value in enumerate(values, 1):
+            cell = ws.cell(row=row, column=col, value=value)
+            if col == 1:
+                cell.number_format = 'YYYY-MM-DD'
+
+def create_interactive_workbook(campaign_df, daily_data=None, business_df=None):
+    """Build the interactive template with its formulas reading pre-aggregated daily data."""
+    if daily_data is None:
+        daily_data = aggregate_daily(campaign_df)
+
+    wb = create_campaign_report_workbook(use_agg=True, grids=template_grids(daily_data, business_df))
+    populate_agg_sheet(wb, daily_data)
+
+    # Default the date window to the data actually loaded
+    settings = wb['Settings']
+    settings['B6'] = campaign_df['Date'].min().to_pydatetime()
+    settings['B7'] = campaign_df['Date'].max().to_pydatetime()
+    return wb
+
+# ============================================================================
+# PERIOD CUBE (TEMPLATE GRIDS)
+# ============================================================================
+
+CUBE_MEASURES = ['Spend', 'Sales', 'Orders', 'Clicks']
+PIVOT_MEMBERS = {
+    'portfolio': ('Portfolio_Type', ['JN', 'Non-JN']),
+    'segment': ('Segment', ['Branded', 'Competitor', 'Non-Branded']),
+}
+
+def build_period_cube(daily_data, period_column):
+    """Sum the daily aggregate into a period x portfolio type x segment cube.
+
+    Periods are in chronological order; Start/End hold each period's first
+    and last day with data.
+    """
+    cube = daily_data.groupby([period_column, 'Portfolio_Type', 'Segment'], observed=True).agg(
+        Start=('Date', 'min'), End=('Date', 'max'),
+        **{measure: (measure, 'sum') for measure in CUBE_MEASURES})
+    order = cube['Start'].groupby(level=0).min().sort_values().index
+    return cube.reindex(order, level=0)
+
+def period_change(series):
+    """Period-over-period fractional change; blank where the prior period is 0 or missing."""
+    previous = series.shift(1)
+    return (series - previous).div(previous.where(previous != 0))
+
+def period_totals(cube, by=None):
+    """Collapse the cube to one row per period (per period and `by` value when given)."""
+    levels = [0] if by is None else [0, by]
+    totals = cube.groupby(level=levels, sort=False).agg(
+        Start=('Start', 'min'), End=('End', 'max'), **{m: (m, 'sum') for m in CUBE_MEASURES})
+    totals['ROAS'] = ratio(totals['Sales'], totals['Spend'])
+    totals['ACoS'] = ratio(totals['Spend'], totals['Sales'])
+    totals['CVR'] = ratio(totals['Orders'], totals['Clicks'])
+    return totals
+
+def grid_rows(frame, columns):
+    """Convert frame columns to row lists for write_grid_block (NaN -> blank)."""
+    block = frame.reset_index()[columns].astype(object)
+    return block.where(block.notna(), None).values.tolist()
+
+def pivot_grids(month_cube, key):
+    """Spend, sales and ROAS blocks of one pivot sheet (periods x members + Total)."""
+    import pandas as pd
+    level, members = PIVOT_MEMBERS[key]
+    sums = month_cube.groupby(level=[0, level], sort=False, observed=True)[['Spend', 'Sales']].sum()
+
+    tables = {}
+    for measure in ['Spend', 'Sales']:
+        table = sums[measure].unstack(level).reindex(columns=members).fillna(0)
+        table['Total'] = table.sum(axis=1)
+        tables[measure] = table
+
+    roas = pd.DataFrame(ratio(tables['Sales'], tables['Spend']),
+                        index=tables['Spend'].index, columns=tables['Spend'].columns)
+    columns = [tables['Spend'].index.name] + members + ['Total']
+    return {
+        f'{key}_spend': grid_rows(tables['Spend'], columns),
+        f'{key}_sales': grid_rows(tables['Sales'], columns),
+        f'{key}_roas': grid_rows(roas, columns),
+    }
+
+def template_grids(daily_data, business_df=None):
+    """Rows for the template's trend, analysis and pivot blocks, keyed by block.
+
+    Every block comes from the same month/week cube, one vectorized pass per
+    block, and has one row per period present in the data.
+    """
+    month_cube = build_period_cube(daily_data, 'Month_Label')
+    week_cube = build_period_cube(daily_data, 'Week')
+    monthly = period_totals(month_cube)
+    weekly = period_totals(week_cube)
+    grids = {}
+
+    weekly['Spend_Chg'] = weekly['Spend'].diff()
+    weekly['Sales_Chg'] = weekly['Sales'].diff()
+    weekly['Spend_Pct'] = period_change(weekly['Spend'])
+    weekly['Sales_Pct'] = period_change(weekly['Sales'])
+    weekly['ROAS_Pct'] = period_change(weekly['ROAS'])
+    weekly['Date_Range'] = weekly['Start'].dt.strftime('%b %d') + ' - ' + weekly['End'].dt.strftime('%b %d, %Y')
+    grids['trends_weekly'] = grid_rows(weekly, ['Week', 'Spend', 'Sales', 'ROAS', 'ACoS',
+                                                'Spend_Pct', 'Sales_Pct', 'ROAS_Pct'])
+    grids['weekly_analysis'] = grid_rows(weekly, ['Week', 'Date_Range', 'Spend', 'Spend_Chg', 'Spend_Pct',
+                                                  'Sales', 'Sales_Chg', 'Sales_Pct', 'ROAS', 'ACoS', 'Orders'])
+
+    monthly['Spend_Chg'] = monthly['Spend'].diff()
+    monthly['Sales_Chg'] = monthly['Sales'].diff()
+    monthly['ROAS_Chg'] = monthly['ROAS'].diff()
+    monthly['Spend_Pct'] = period_change(monthly['Spend'])
+    monthly['Sales_Pct'] = period_change(monthly['Sales'])
+    grids['trends_monthly'] = grid_rows(monthly, ['Month_Label', 'Spend', 'Sales', 'ROAS', 'ACoS', 'Orders',
+                                                  'Clicks', 'CVR', 'Spend_Pct', 'Sales_Pct'])
+    grids['monthly_analysis'] = grid_rows(monthly, ['Month_Label', 'Spend', 'Spend_Chg', 'Spend_Pct', 'Sales',
+                                                    'Sales_Chg', 'Sales_Pct', 'ROAS', 'ROAS_Chg', 'ACoS'])
+
+    segment_monthly = period_totals(month_cube, by='Segment')
+    segment_monthly['Sales_Pct'] = segment_monthly.groupby(level='Segment', sort=False)['Sales'].transform(period_change)
+    for segment, rows in segment_monthly.groupby(level='Segment', sort=False):
+        grids[f'trends_{segment}'] = grid_rows(rows.droplevel('Segment'),
+                                               ['Month_Label', 'Spend', 'Sales', 'ROAS', 'ACoS', 'Sales_Pct'])
+
+    if business_df is not None:
+        organic = monthly[['Spend', 'Sales']].join(business_df.groupby('Month_Label')['Total_Sales'].sum())
+        organic['Total_Sales'] = organic['Total_Sales'].fillna(0)
+        organic['Organic_Sales'] = (organic['Total_Sales'] - organic['Sales']).clip(lower=0)
+        organic['Organic_Pct'] = ratio(organic['Organic_Sales'], organic['Total_Sales'])
+        organic['Organic_Chg'] = period_change(organic['Organic_Sales'])
+        organic['Sales_Chg'] = period_change(organic['Sales'])
+        organic['TACOS'] = ratio(organic['Spend'], organic['Total_Sales'])
+        grids['organic_monthly'] = grid_rows(organic, ['Month_Label', 'Total_Sales', 'Sales', 'Organic_Sales',
+                                                       'Organic_Pct', 'Organic_Chg', 'Sales_Chg', 'TACOS'])
+
+    for key in PIVOT_MEMBERS:
+        grids.update(pivot_grids(month_cube, key))
+
+    return grids
+
+# ============================================================================
+# HYDRATE MODE (STREAM DATA INTO THE INTERACTIVE TEMPLATE)
+# ============================================================================
+
+# Parsed numeric columns written in place of the raw "$1,234" export text
+CAMPAIGN_PARSED_COLUMNS = {
+    'Impressions': 'Impressions',
+    'Clicks': 'Clicks',
+    'Spend': 'Spend',
+    '7 Day Total Orders (#)': 'Orders',
+    '7 Day Total Sales ': 'Sales',
+    'Last Year Impressions': 'LY_Impressions',
+    'Last Year Clicks': 'LY_Clicks',
+    'Last Year Spend': 'LY_Spend',
+}
+CAMPAIGN_CALC_COLUMNS = ['Portfolio_Type', 'Segment', 'Week', 'Month_Label']
+
+BUSINESS_PARSED_COLUMNS = {
+    'Ordered Product Sales': 'Total_Sales',
+    'Units Ordered': 'Units',
+    'Sessions - Total': 'Sessions',
+}
+BUSINESS_CALC_COLUMNS = ['Week', 'Month_Label']
+
+EXCEL_EPOCH = '1899-12-30'
+HYDRATE_CHUNK_ROWS = 50000
+
+def data_sheet_frame(df, headers, parsed_columns, calc_columns):
+    """Arrange a loaded frame in the template's column order (export columns + calculated)."""
+    import pandas as pd
+    columns = {}
+    for header in headers:
+        source = parsed_columns.get(header, header)
+        columns[header] = df[source] if source in df.columns else pd.Series(None, index=df.index, dtype=object)
+    for col in calc_columns:
+        columns[col] = df[col]
+    return pd.DataFrame(columns).reset_index(drop=True)
+
+def column_cells_xml(series, col_letter, row_refs, style=None, shared_strings=None, cell_refs=True):
+    """Build the <c> XML for one column of cells in a single vectorized pass.
+
+    Works on numpy object arrays; string columns are escaped once per
+    distinct value and gathered by code, since exports repeat names heavily.
+    With a SharedStringTable, string cells hold table indexes instead.
+    Without cell_refs, cells are positional (no r="A5"; blanks become <c/>),
+    which compresses far better.
+    """
+    import numpy as np
+    import pandas as pd
+    style_attr = f' s="{style}"' if style else ''
+    missing = series.isna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        serial = ((series - pd.Timestamp(EXCEL_EPOCH)) / pd.Timedelta(days=1)).to_numpy()
+        body = '><v>' + serial.astype(str).astype(object) + '</v></c>'
+    elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        body = '><v>' + series.to_numpy().astype(str).astype(object) + '</v></c>'
+    elif shared_strings is not None:
+        codes, uniques = pd.factorize(series)
+        indexes = np.array(shared_strings.indexes([str(value) for value in uniques]) + [0]).astype(str).astype(object)
+        body = ' t="s"><v>' + indexes[codes] + '</v></c>'
+    else:
+        codes, uniques = pd.factorize(series)
+        escaped = np.array([escape(str(value)) for value in uniques] + [''], dtype=object)
+        body = ' t="inlineStr"><is><t xml:space="preserve">' + escaped[codes] + '</t></is></c>'
+
+    if not cell_refs:
+        return np.where(missing, '<c/>', f'<c{style_attr}' + body)
+    cells = f'<c r="{col_letter}' + row_refs + f'"{style_attr}' + body
+    return np.where(missing, '', cells)
+
+def frame_to_row_xml(frame, start_row, styles, chunk_rows=HYDRATE_CHUNK_ROWS, shared_strings=None, cell_refs=True):
+    """Yield <row> XML for a frame in chunks, one vectorized pass per column."""
+    import numpy as np
+    from openpyxl.utils import get_column_letter
+    letters = [get_column_letter(i) for i in range(1, len(frame.columns) + 1)]
+
+    for offset in range(0, len(frame), chunk_rows):
+        chunk = frame.iloc[offset:offset + chunk_rows]
+        row_refs = np.arange(start_row + offset, start_row + offset + len(chunk)).astype(str).astype(object)
+
+        rows = '<row r="' + row_refs + '">'
+        for col_letter, col_name in zip(letters, chunk.columns):
+            rows = rows + column_cells_xml(chunk[col_name], col_letter, row_refs, styles.get(col_letter),
+                                           shared_strings, cell_refs)
+        yield ''.join(rows + '</row>')
+
+# ============================================================================
+# CACHED FORMULA VALUES
+# ============================================================================
+
+def formula_names(sheet_frames, use_agg=True):
+    """Map each data range name to the array of values it covers."""
+    import numpy as np
+    import pandas as pd
+    from openpyxl.utils import column_index_from_string
+    names = {}
+    for sheet_name, ranges in data_range_sources(use_agg):
+        frame = sheet_frames.get(sheet_name)
+        for name, col_letter in ranges.items():
+            if frame is None:
+                names[name] = np.array([], dtype=object)
+                continue
+            column = frame.iloc[:, column_index_from_string(col_letter) - 1]
+            if pd.api.types.is_datetime64_any_dtype(column):
+                column = (column - pd.Timestamp(EXCEL_EPOCH)) / pd.Timedelta(days=1)
+            names[name] = column.to_numpy()
+    return names
+
+def expected_cell_values(campaign_df, business_df, start, end):
+    """Totals for key formula cells computed directly from the raw rows."""
+    window = campaign_df[(campaign_df['Date'] >= start) & (campaign_df['Date'] <= end)]
+    segments = ['Branded', 'Competitor', 'Non-Branded']
+
+    def total(df, column, **filters):
+        for key, value in filters.items():
+            df = df[df[key] == value]
+        return float(df[column].sum())
+
+    expected = {
+        ('Dashboard', 'A12'): total(window, 'Spend'),
+        ('Dashboard', 'C12'): total(window, 'Sales'),
+        ('Organic vs Paid', 'B6'): total(window, 'Sales'),
+    }
+    for i, segment in enumerate(segments):
+        expected[('Dashboard', f'B{20 + i}')] = total(window, 'Spend', Segment=segment)
+        expected[('Dashboard', f'C{20 + i}')] = total(window, 'Sales', Segment=segment)
+        expected[('Segment Performance', f'B{6 + i}')] = total(window, 'Spend', Segment=segment)
+        expected[('Segment Performance', f'D{6 + i}')] = total(window, 'Sales', Segment=segment)
+        expected[('Segment Performance', f'B{14 + i}')] = total(window, 'Spend', Segment=segment, Portfolio_Type='JN')
+        expected[('Segment Performance', f'F{14 + i}')] = total(window, 'Sales', Segment=segment, Portfolio_Type='Non-JN')
+
+    for sheet_name, portfolio in [("JN Portfolio", "JN"), ("Non-JN Portfolio", "Non-JN")]:
+        expected[(sheet_name, 'A5')] = total(window, 'Spend', Portfolio_Type=portfolio)
+        expected[(sheet_name, 'B5')] = total(window, 'Sales', Portfolio_Type=portfolio)
+        expected[(sheet_name, 'E5')] = total(window, 'Orders', Portfolio_Type=portfolio)
+        expected[(sheet_name, 'F5')] = total(window, 'Clicks', Portfolio_Type=portfolio)
+        for i, segment in enumerate(segments):
+            expected[(sheet_name, f'B{10 + i}')] = total(window, 'Spend', Portfolio_Type=portfolio, Segment=segment)
+
+    # Executive Summary reports the month containing the end date
+    current_month = end.strftime('%b %Y')
+    expected[('Executive Summary', 'A6')] = total(campaign_df, 'Sales', Month_Label=current_month)
+    expected[('Executive Summary', 'A10')] = total(campaign_df, 'Spend', Month_Label=current_month)
+
+    if business_df is not None:
+        biz_window = business_df[(business_df['Date'] >= start) & (business_df['Date'] <= end)]
+        expected[('Dashboard', 'A16')] = float(biz_window['Total_Sales'].sum())
+        expected[('Organic vs Paid', 'A6')] = float(biz_window['Total_Sales'].sum())
+        expected[('Executive Summary', 'A15')] = total(business_df, 'Total_Sales', Month_Label=current_month)
+
+    return expected
+
+def verify_cached_values(cached, campaign_df, business_df, start, end, tolerance=0.01):
+    """Compare cached formula values with totals from the raw rows; return mismatches."""
+    mismatches = []
+    for (sheet_name, ref), expected in expected_cell_values(campaign_df, business_df, start, end).items():
+        actual = cached.get(sheet_name, {}).get(ref)
+        if actual is None or abs(float(actual) - expected) > tolerance:
+            mismatches.append(f"{sheet_name}!{ref}: cached {actual} != expected {expected:.2f}")
+    return mismatches
+
+def hydrate_template(campaign_path, business_path, output_path, cached_values=False, verify=False):
+    """Fill the interactive template's data sheets from the CSV exports.
+
+    Uses the same loaders as the report, computes the calculated columns
+    (Portfolio Type, Segment, Week, Month) vectorized, and streams the rows
+    straight into the sheet XML instead of creating openpyxl cells. With
+    cached_values, every formula's result is computed from the aggregates
+    and stored next to it so the workbook opens with numbers.
+    """
+    import pandas as pd
+    from openpyxl.utils import get_column_letter
+    campaign_df = load_campaign_data(campaign_path)
+
+    business_df = None
+    if business_path and os.path.exists(business_path):
+        business_df = load_business_data(business_path)
+    elif business_path:
+        print(f"Warning: Business report not found at {business_path}")
+
+    print("\nBuilding interactive template...")
+    daily_data = aggregate_daily(campaign_df)
+    wb = create_interactive_workbook(campaign_df, daily_data, business_df)
+    add_format_prototype_row(wb['Campaign Data'], CAMPAIGN_COLUMN_FORMATS)
+    add_format_prototype_row(wb['Business Data'], BUSINESS_COLUMN_FORMATS)
+
+    frames = {
+        "Campaign Data": data_sheet_frame(campaign_df, CAMPAIGN_HEADERS,
+                                          CAMPAIGN_PARSED_COLUMNS, CAMPAIGN_CALC_COLUMNS),
+    }
+    if business_df is not None:
+        frames["Business Data"] = data_sheet_frame(business_df, BUSINESS_HEADERS,
+                                                   BUSINESS_PARSED_COLUMNS, BUSINESS_CALC_COLUMNS)
+
+    cached = None
+    if cached_values:
+        print("Computing cached formula values...")
+        names = formula_names({**frames, "Agg": daily_data[AGG_COLUMNS]})
+        row_counts = {sheet_name: len(frame) for sheet_name, frame in frames.items()}
+        row_counts.setdefault("Business Data", 0)
+        row_counts["Agg"] = len(daily_data)
+        failures = []
+        from formula_values import compute_cached_values
+        cached = compute_cached_values(wb, names, row_counts, skip_sheets=row_counts.keys(), failures=failures)
+
+        if failures:
+            print(f"  {len(failures)} formulas left for Excel to compute (e.g. {failures[0]})")
+        else:
+            # Every value is current, so Excel does not need a full recalculation on open
+            wb.calculation.fullCalcOnLoad = False
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    template = buffer.getvalue()
+
+    if cached:
+        template = patch_workbook(template, cached)
+
+        if verify:
+            settings = wb['Settings']
+            mismatches = verify_cached_values(cached, campaign_df, business_df,
+                                              pd.Timestamp(settings['B6'].value), pd.Timestamp(settings['B7'].value))
+            if mismatches:
+                print("Cached value check FAILED:")
+                for line in mismatches:
+                    print(f"  - {line}")
+                raise ValueError(f"{len(mismatches)} cached values disagree with the raw data")
+            print("Cached value check passed")
+
+    sheet_rows = {}
+    for sheet_name, frame in frames.items():
+        styles = row_styles(template, sheet_name, DATA_START_ROW)
+        sheet_rows[sheet_name] = (
+            DATA_START_ROW, len(frame), get_column_letter(len(frame.columns)),
+            frame_to_row_xml(frame, DATA_START_ROW, styles),
+        )
+
+    print("Streaming data rows...")
+    write_package_with_rows(template, output_path, sheet_rows)
+
+    print(f"\nHydrated template saved to: {output_path}")
+    for sheet_name, frame in frames.items():
+        print(f"  {sheet_name}: {len(frame):,} rows")
 
 # ============================================================================
 # EXCEL REPORT GENERATION
 # ============================================================================
 
-def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
+@profiled()
+def create_summary_sheet(wb, date_range, overall, portfolio_data, segment_data, total_sales):
     """Create the Executive Summary sheet."""
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Executive Summary", 0)
 
     # Title
@@ -273,8 +916,8 @@ def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
     ws['A1'].font = Font(bold=True, size=20, color=COLORS['primary'])
     ws.merge_cells('A1:H1')
 
-    date_min = campaign_df['Date'].min().strftime('%b %d, %Y')
-    date_max = campaign_df['Date'].max().strftime('%b %d, %Y')
+    date_min = date_range[0].strftime('%b %d, %Y')
+    date_max = date_range[1].strftime('%b %d, %Y')
     ws['A2'] = f"Date Range: {date_min} - {date_max}"
     ws['A2'].font = Font(size=12, color='6B7280')
 
@@ -282,32 +925,33 @@ def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
     ws['A3'].font = Font(size=10, italic=True, color='6B7280')
 
     # Overall Metrics
-    overall = calc_metrics(campaign_df)
-    total_sales = business_df['Total_Sales'].sum() if business_df is not None else 0
+    total_sales = total_sales or 0
     tacos = (overall['Spend'] / total_sales * 100) if total_sales > 0 else 0
 
     ws['A5'] = "OVERALL PERFORMANCE"
     ws['A5'].font = Font(bold=True, size=14, color=COLORS['primary'])
 
+    # Numbers with display formats (not preformatted text) so they stay usable in formulas
     metrics = [
-        ("Ad Spend", format_currency(overall['Spend'])),
-        ("Ad Sales", format_currency(overall['Sales'])),
-        ("ROAS", f"{overall['ROAS']:.2f}x"),
-        ("ACoS", format_percent(overall['ACoS'])),
-        ("Total Sales", format_currency(total_sales)),
-        ("TACOS", format_percent(tacos)),
-        ("Orders", f"{overall['Orders']:,.0f}"),
-        ("Clicks", f"{overall['Clicks']:,.0f}"),
-        ("CVR", format_percent(overall['CVR'])),
+        ("Ad Spend", overall['Spend'], '$#,##0'),
+        ("Ad Sales", overall['Sales'], '$#,##0'),
+        ("ROAS", overall['ROAS'], '0.00"x"'),
+        ("ACoS", overall['ACoS'] / 100, '0.0%'),
+        ("Total Sales", total_sales, '$#,##0'),
+        ("TACOS", tacos / 100, '0.0%'),
+        ("Orders", overall['Orders'], '#,##0'),
+        ("Clicks", overall['Clicks'], '#,##0'),
+        ("CVR", overall['CVR'] / 100, '0.0%'),
     ]
 
     row = 6
-    for i, (label, value) in enumerate(metrics):
+    for i, (label, value, number_format) in enumerate(metrics):
         col = (i % 3) * 2 + 1
         if i > 0 and i % 3 == 0:
             row += 2
         ws.cell(row=row, column=col, value=label).font = Font(size=9, color='6B7280')
-        val_cell = ws.cell(row=row+1, column=col, value=value)
+        val_cell = ws.cell(row=row+1, column=col, value=float(value))
+        val_cell.number_format = number_format
         val_cell.font = Font(bold=True, size=16)
         val_cell.alignment = Alignment(horizontal='left')
 
@@ -321,7 +965,6 @@ def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
         cell = ws.cell(row=row, column=col, value=h)
         apply_header_style(cell)
 
-    portfolio_data = aggregate_by_portfolio(campaign_df)
     for _, prow in portfolio_data.iterrows():
         row += 1
         ws.cell(row=row, column=1, value=prow['Portfolio_Type']).font = Font(bold=True)
@@ -340,7 +983,6 @@ def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
         cell = ws.cell(row=row, column=col, value=h.replace("Portfolio", "Segment"))
         apply_header_style(cell, 'branded')
 
-    segment_data = aggregate_by_segment(campaign_df)
     for _, srow in segment_data.iterrows():
         row += 1
         ws.cell(row=row, column=1, value=srow['Segment']).font = Font(bold=True)
@@ -354,8 +996,11 @@ def create_summary_sheet(wb, campaign_df, business_df, monthly_data):
     for i, w in enumerate([15, 14, 14, 10, 10, 12, 12, 12], 1):
         ws.column_dimensions[get_column_letter(i)].width = w
 
+@profiled()
 def create_monthly_sheet(wb, monthly_data):
     """Create Monthly Performance sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Monthly Performance")
 
     ws['A1'] = "MONTHLY PERFORMANCE"
@@ -415,8 +1060,11 @@ def create_monthly_sheet(wb, monthly_data):
     for i in range(1, 12):
         ws.column_dimensions[get_column_letter(i)].width = 14
 
+@profiled()
 def create_weekly_sheet(wb, weekly_data):
     """Create Weekly Performance sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Weekly Performance")
 
     ws['A1'] = "WEEKLY PERFORMANCE"
@@ -440,19 +1088,16 @@ def create_weekly_sheet(wb, weekly_data):
     for i in range(1, 8):
         ws.column_dimensions[get_column_letter(i)].width = 14
 
-def create_segment_sheet(wb, campaign_df):
+@profiled()
+def create_segment_sheet(wb, segment_monthly, months):
     """Create Segment Analysis sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Segment Analysis")
 
     ws['A1'] = "SEGMENT PERFORMANCE BY MONTH"
     ws['A1'].font = Font(bold=True, size=16, color=COLORS['primary'])
 
-    segment_monthly = aggregate_by_segment_and_month(campaign_df)
-
-    # Get unique months in order
-    month_order = campaign_df.groupby('Month_Label')['Date'].min().sort_values()
-    months = list(month_order.index)
-
     segments = ['Branded', 'Competitor', 'Non-Branded']
 
     # Spend by Segment
@@ -509,18 +1154,16 @@ def create_segment_sheet(wb, campaign_df):
     for i in range(2, len(months) + 2):
         ws.column_dimensions[get_column_letter(i)].width = 12
 
-def create_portfolio_sheet(wb, campaign_df):
+@profiled()
+def create_portfolio_sheet(wb, portfolio_monthly, months):
     """Create Portfolio Analysis sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Portfolio Analysis")
 
     ws['A1'] = "PORTFOLIO PERFORMANCE BY MONTH"
     ws['A1'].font = Font(bold=True, size=16, color=COLORS['primary'])
 
-    portfolio_monthly = aggregate_by_portfolio_and_month(campaign_df)
-
-    month_order = campaign_df.groupby('Month_Label')['Date'].min().sort_values()
-    months = list(month_order.index)
-
     portfolios = ['JN', 'Non-JN']
 
     # Spend by Portfolio
@@ -583,20 +1226,22 @@ def create_portfolio_sheet(wb, campaign_df):
     for i in range(2, len(months) + 3):
         ws.column_dimensions[get_column_letter(i)].width = 12
 
-def create_organic_sheet(wb, campaign_df, business_df, monthly_data):
+@profiled()
+def create_organic_sheet(wb, overall, total_sales, monthly_data):
     """Create Organic vs Paid Analysis sheet."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet("Organic vs Paid")
 
     ws['A1'] = "ORGANIC VS PAID ANALYSIS"
     ws['A1'].font = Font(bold=True, size=16, color=COLORS['competitor'])
 
-    if business_df is None or 'Total_Sales' not in monthly_data.columns:
+    if total_sales is None or 'Total_Sales' not in monthly_data.columns:
         ws['A3'] = "Business Report data not available"
         return
 
     # Summary
-    total_sales = business_df['Total_Sales'].sum()
-    ad_sales = campaign_df['Sales'].sum()
+    ad_sales = overall['Sales']
     organic_sales = max(0, total_sales - ad_sales)
 
     ws['A3'] = "OVERALL SUMMARY"
@@ -652,8 +1297,68 @@ def create_organic_sheet(wb, campaign_df, business_df, monthly_data):
     for i in range(1, 8):
         ws.column_dimensions[get_column_letter(i)].width = 14
 
-def create_raw_data_sheet(wb, df, sheet_name, key_columns):
-    """Create a sheet with raw data for reference."""
+# (header, aggregate column, number format) of the year-over-year tables
+YOY_SHEET_COLUMNS = [
+    ("Spend", 'Spend', '$#,##0'), ("LY Spend", 'LY_Spend', '$#,##0'), ("Spend YoY", 'Spend_YoY', '0.0%'),
+    ("Clicks", 'Clicks', '#,##0'), ("LY Clicks", 'LY_Clicks', '#,##0'), ("Clicks YoY", 'Clicks_YoY', '0.0%'),
+    ("Impressions", 'Impressions', '#,##0'), ("LY Impressions", 'LY_Impressions', '#,##0'),
+    ("Impressions YoY", 'Impressions_YoY', '0.0%'),
+    ("CPC", 'CPC', '$0.00'), ("LY CPC", 'LY_CPC', '$0.00'), ("CPC YoY", 'CPC_YoY', '0.0%'),
+]
+
+@profiled()
+def create_yoy_sheet(wb, yoy_month, yoy):
+    """Create Year over Year sheet from the export's Last Year columns."""
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+    ws = wb.create_sheet("Year over Year")
+
+    ws['A1'] = "YEAR-OVER-YEAR COMPARISON"
+    ws['A1'].font = Font(bold=True, size=16, color=COLORS['primary'])
+    ws['A2'] = "Last year's figures come from the campaign export's Last Year columns"
+
+    row = 4
+    for title, data, keys in [("BY MONTH", yoy_month, [("Month", 'Month_Label')]),
+                              ("BY MONTH, PORTFOLIO AND SEGMENT", yoy,
+                               [("Month", 'Month_Label'), ("Portfolio", 'Portfolio_Type'), ("Segment", 'Segment')])]:
+        ws.cell(row=row, column=1, value=title).font = Font(bold=True, size=12, color=COLORS['primary'])
+        row += 1
+        for col, h in enumerate([h for h, _ in keys] + [h for h, _, _ in YOY_SHEET_COLUMNS], 1):
+            cell = ws.cell(row=row, column=col, value=h)
+            apply_header_style(cell)
+
+        for _, yrow in data.iterrows():
+            row += 1
+            for col, (_, key) in enumerate(keys, 1):
+                ws.cell(row=row, column=col, value=yrow[key])
+            for col, (_, column, number_format) in enumerate(YOY_SHEET_COLUMNS, len(keys) + 1):
+                value = yrow[column] / 100 if column.endswith('_YoY') else yrow[column]
+                cell = ws.cell(row=row, column=col, value=value)
+                cell.number_format = number_format
+                if column.endswith('_YoY'):
+                    cell.font = Font(color=COLORS['positive'] if value >= 0 else COLORS['negative'])
+        row += 2
+
+    for i in range(1, 3 + len(YOY_SHEET_COLUMNS) + 1):
+        ws.column_dimensions[get_column_letter(i)].width = 14
+
+# Column formats for compact raw data sheets (applied once per column)
+RAW_COLUMN_FORMATS = {
+    'Date': 'YYYY-MM-DD',
+    'Spend': '$#,##0.00', 'Sales': '$#,##0.00', 'Total_Sales': '$#,##0.00',
+    'Orders': '#,##0', 'Clicks': '#,##0', 'Impressions': '#,##0', 'Units': '#,##0', 'Sessions': '#,##0',
+}
+RAW_MAX_ROWS = 10000
+
+@profiled()
+def create_raw_data_sheet(wb, df, sheet_name, key_columns, stream=False):
+    """Create a sheet with raw data for reference.
+
+    With stream=True only the header, column formats and a style prototype
+    row are created; the rows to stream are returned as a frame.
+    """
+    import pandas as pd
+    from openpyxl.utils import get_column_letter
     ws = wb.create_sheet(sheet_name)
 
     # Select key columns
@@ -665,7 +1370,27 @@ def create_raw_data_sheet(wb, df, sheet_name, key_columns):
         apply_header_style(cell)
 
     # Write data (limit to first 10000 rows for Excel Online compatibility)
-    max_rows = min(len(df_export), 10000)
+    max_rows = min(len(df_export), RAW_MAX_ROWS)
+
+    if stream:
+        formats = {get_column_letter(col): RAW_COLUMN_FORMATS[name]
+                   for col, name in enumerate(df_export.columns, 1) if name in RAW_COLUMN_FORMATS}
+        for col_letter, fmt in formats.items():
+            ws.column_dimensions[col_letter].number_format = fmt
+        add_format_prototype_row(ws, formats, row=2)
+
+        if len(df_export) > max_rows:
+            ws.cell(row=max_rows + 3, column=1, value=f"Note: Showing first {max_rows:,} of {len(df_export):,} rows")
+        for i in range(1, len(df_export.columns) + 1):
+            ws.column_dimensions[get_column_letter(i)].width = 15
+
+        # Amounts to the cent: shorter numbers in the XML, same displayed values
+        rows = df_export.iloc[:max_rows].reset_index(drop=True)
+        for name in rows.columns:
+            if RAW_COLUMN_FORMATS.get(name) == '$#,##0.00':
+                rows[name] = rows[name].round(2)
+        return rows
+
     for row_idx in range(max_rows):
         for col_idx, col_name in enumerate(df_export.columns, 1):
             value = df_export.iloc[row_idx][col_name]
@@ -685,60 +1410,572 @@ def create_raw_data_sheet(wb, df, sheet_name, key_columns):
 # MAIN FUNCTION
 # ============================================================================
 
-def main():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+@profiled()
+def save_report(wb, output_path, raw_frames=None, compresslevel=None):
+    """Save the report, streaming compact raw data sheets when raw_frames is given.
+
+    output_path is a path or a writable binary file object (such as BytesIO).
+    Returns the size of the written file in bytes.
+    """
+    from openpyxl.utils import get_column_letter
+    def written_size():
+        return output_path.tell() if hasattr(output_path, 'write') else os.path.getsize(output_path)
+
+    if not raw_frames and compresslevel is None:
+        wb.save(output_path)
+        return written_size()
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    package = buffer.getvalue()
+
+    if not raw_frames:
+        package = patch_workbook(package, {}, compresslevel=compresslevel)
+        if hasattr(output_path, 'write'):
+            output_path.write(package)
+        else:
+            with open(output_path, 'wb') as f:
+                f.write(package)
+        return len(package)
+
+    shared_strings = SharedStringTable()
+    sheet_rows = {}
+    for sheet_name, frame in raw_frames.items():
+        styles = row_styles(package, sheet_name, 2)
+        sheet_rows[sheet_name] = (2, len(frame), get_column_letter(len(frame.columns)),
+                                  frame_to_row_xml(frame, 2, styles, shared_strings=shared_strings, cell_refs=False))
+    write_package_with_rows(package, output_path, sheet_rows, compresslevel, shared_strings)
+    return written_size()
+
+# Sheet keys accepted by --sheets / --skip-sheets, in workbook order
+REPORT_SHEETS = {
+    'summary': "Executive Summary",
+    'monthly': "Monthly Performance",
+    'weekly': "Weekly Performance",
+    'segment': "Segment Analysis",
+    'portfolio': "Portfolio Analysis",
+    'organic': "Organic vs Paid",
+    'yoy': "Year over Year",
+    'campaign-data': "Campaign Data",
+    'business-data': "Business Data",
+}
+RAW_SHEETS = ['campaign-data', 'business-data']
+
+def resolve_sheets(sheets=None, skip_sheets=None, include_raw=True):
+    """Return the sheet keys to build, in workbook order."""
+    for key in list(sheets or []) + list(skip_sheets or []):
+        if key not in REPORT_SHEETS:
+            raise ValueError(f"Unknown sheet '{key}' (choose from: {', '.join(REPORT_SHEETS)})")
+
+    selected = [key for key in REPORT_SHEETS if sheets is None or key in sheets]
+    selected = [key for key in selected if key not in (skip_sheets or [])]
+    if not include_raw:
+        selected = [key for key in selected if key not in RAW_SHEETS]
+    return selected
+
+def filter_date_window(df, start_date=None, end_date=None):
+    """Keep rows whose Date falls within [start_date, end_date] (either may be None)."""
+    import pandas as pd
+    if start_date is not None:
+        df = df[df['Date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['Date'] <= pd.Timestamp(end_date)]
+    return df
 
-    campaign_path = os.path.join(script_dir, CAMPAIGN_FILE)
-    business_path = os.path.join(script_dir, BUSINESS_FILE)
-    output_path = os.path.join(script_dir, OUTPUT_FILE)
+# ============================================================================
+# MEMORY BUDGET
+# ============================================================================
 
-    # Load data
-    campaign_df = load_campaign_data(campaign_path)
+MB = 1024 * 1024
 
-    business_df = None
-    if os.path.exists(business_path):
-        business_df = load_business_data(business_path)
-    else:
-        print(f"Warning: Business report not found at {business_path}")
+# Rough peak footprints measured with --profile-memory on synthetic exports
+PROCESS_BASE_BYTES = 120 * MB          # interpreter, pandas, openpyxl, aggregates
+FULL_LOAD_BYTES_PER_FILE_BYTE = 5      # load_campaign_data: all columns as strings plus parsed copies
+CHUNKED_LOAD_BYTES_PER_ROW = 170       # load_campaign_data_chunked result
+CHUNK_BYTES_PER_FILE_BYTE = 3          # one raw chunk in flight while loading
+WORKBOOK_BYTES_PER_CELL = 800          # openpyxl cells of the raw data sheets
+STREAMED_BYTES_PER_CELL = 150          # row frames and XML of the streaming writer
 
-    # Aggregate data
-    print("\nAggregating data...")
-    monthly_data = aggregate_by_month(campaign_df, business_df)
-    weekly_data = aggregate_by_week(campaign_df)
+def parse_memory_size(value):
+    """argparse type for sizes such as 512MB, 2GB or 1.5G."""
+    text = value.strip().upper().replace(' ', '').rstrip('B')
+    scale = {'K': 1024, 'M': MB, 'G': 1024 * MB, 'T': 1024 ** 4}.get(text[-1:], 1)
+    try:
+        size = float(text[:-1] if scale > 1 else text) * scale
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size '{value}' (e.g. 512MB, 2GB)")
+    if size <= 0:
+        raise argparse.ArgumentTypeError("memory budget must be positive")
+    return int(size)
+
+def estimate_rows(path, sample_bytes=1024 * 1024):
+    """Estimate a CSV's data rows from its size and the line length of its first sample_bytes."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        sample = f.read(sample_bytes)
+    if len(sample) == size:
+        return max(len(sample.splitlines()) - 1, 0)
+    return int(size / (len(sample) / max(sample.count(b'\n'), 1))) - 1
+
+def plan_memory(campaign_path, business_path, budget, sheets, chunk_rows=LOAD_CHUNK_ROWS):
+    """Choose the campaign loader and raw sheet writer that fit in budget bytes.
+
+    Footprints are estimated from the export sizes and row counts. Returns
+    (chunked, stream): whether to use load_campaign_data_chunked and the
+    streaming (compact) writer.
+    """
+    paths = export_paths(campaign_path)
+    size = sum(os.path.getsize(path) for path in paths)
+    rows = max(sum(estimate_rows(path) for path in paths), 1)
+    business = os.path.getsize(business_path) * FULL_LOAD_BYTES_PER_FILE_BYTE \
+        if business_path and os.path.exists(business_path) else 0
+
+    cells = min(rows, RAW_MAX_ROWS) * len(CAMPAIGN_RAW_COLUMNS) if 'campaign-data' in sheets else 0
+    if 'business-data' in sheets and business:
+        cells += min(estimate_rows(business_path), RAW_MAX_ROWS) * len(BUSINESS_RAW_COLUMNS)
+
+    full_load = size * FULL_LOAD_BYTES_PER_FILE_BYTE + business
+    chunked_load = rows * CHUNKED_LOAD_BYTES_PER_ROW + min(rows, chunk_rows) * size / rows * CHUNK_BYTES_PER_FILE_BYTE + business
+
+    chunked = PROCESS_BASE_BYTES + full_load + cells * STREAMED_BYTES_PER_CELL > budget
+    load = chunked_load if chunked else full_load
+    stream = PROCESS_BASE_BYTES + load + cells * WORKBOOK_BYTES_PER_CELL > budget
+    peak = PROCESS_BASE_BYTES + load + cells * (STREAMED_BYTES_PER_CELL if stream else WORKBOOK_BYTES_PER_CELL)
+
+    print(f"Memory budget {budget / MB:,.0f} MB: ~{rows:,} campaign rows, "
+          f"estimated peak {peak / MB:,.0f} MB with the {'chunked' if chunked else 'full'} loader "
+          f"and {'streaming' if stream else 'openpyxl'} writer")
+    if peak > budget:
+        print("  Warning: the estimate exceeds the budget even with the chunked loader and streaming writer")
+    return chunked, stream
 
-    print(f"  Monthly periods: {len(monthly_data)}")
-    print(f"  Weekly periods: {len(weekly_data)}")
+# ============================================================================
+# REPORT DEPENDENCY GRAPH
+# ============================================================================
+
+CAMPAIGN_RAW_COLUMNS = ['Date', 'Portfolio name', 'Campaign Name', 'Spend', 'Sales', 'Orders',
+                        'Clicks', 'Impressions', 'Portfolio_Type', 'Segment', 'Month_Label']
+BUSINESS_RAW_COLUMNS = ['Date', 'Total_Sales', 'Units', 'Sessions', 'Month_Label']
+
+# Each sheet's builder and the graph nodes passed to it after wb. Only the
+# 'campaign' and 'daily' nodes scan the raw campaign rows; every other
+# campaign aggregate is derived from the daily totals.
+SHEET_BUILDERS = {
+    'summary': (create_summary_sheet, ['date_range', 'overall', 'by_portfolio', 'by_segment', 'business_total']),
+    'monthly': (create_monthly_sheet, ['monthly']),
+    'weekly': (create_weekly_sheet, ['weekly']),
+    'segment': (create_segment_sheet, ['segment_month', 'months']),
+    'portfolio': (create_portfolio_sheet, ['portfolio_month', 'months']),
+    'organic': (create_organic_sheet, ['overall', 'business_total', 'monthly']),
+    'yoy': (create_yoy_sheet, ['yoy_month', 'yoy']),
+}
+RAW_SHEET_INPUTS = {
+    'campaign-data': ('campaign', CAMPAIGN_RAW_COLUMNS),
+    'business-data': ('business', BUSINESS_RAW_COLUMNS),
+}
+# Sheets that are left out when there is no business report
+BUSINESS_ONLY_SHEETS = {'organic', 'business-data'}
+# Sheets that are left out when the campaign export has no Last Year columns
+LAST_YEAR_SHEETS = {'yoy'}
+
+def load_campaign_window(campaign_path, start_date=None, end_date=None, chunked=False):
+    """Load the campaign export(s) restricted to the date window.
+
+    Several exports (oldest first) are merged with merge_campaign_exports.
+    """
+    loader = load_campaign_data_chunked if chunked else load_campaign_data
+    paths = export_paths(campaign_path)
+    frames = [filter_date_window(loader(path), start_date, end_date) for path in paths]
+    campaign_df = frames[0] if len(frames) == 1 else merge_campaign_exports(frames, paths)
+    if campaign_df.empty:
+        raise ValueError("No campaign rows in the selected date window")
+    return campaign_df
+
+def load_business_window(business_path, start_date=None, end_date=None, engine=ENGINE):
+    """Load the business export restricted to the date window, or None if none was given or it is missing."""
+    if not business_path:
+        return None
+    if not os.path.exists(business_path):
+        print(f"Warning: Business report not found at {business_path}")
+        return None
+    if engine == 'polars':
+        import polars_engine
+        return polars_engine.load_business_data(business_path, start_date, end_date)
+    return filter_date_window(load_business_data(business_path), start_date, end_date)
+
+def build_report_graph(campaign_path, business_path, start_date=None, end_date=None, chunked=False,
+                       engine=ENGINE):
+    """Declare the report's inputs and aggregates as lazily computed graph nodes.
+
+    With engine='polars' the exports are scanned by polars_engine and the
+    daily totals come straight from its 'campaign_rows' node; 'campaign'
+    (the pandas frame) is then only built for the raw data sheet, and
+    chunked does not apply.
+    """
+    graph = ReportGraph()
+    graph.add('business', lambda: load_business_window(business_path, start_date, end_date, engine))
+    if engine == 'polars':
+        # Imported here because polars_engine imports this module
+        import polars_engine
+        graph.add('campaign_rows', lambda: polars_engine.load_campaign_rows(campaign_path, start_date, end_date))
+        graph.add('campaign', polars_engine.campaign_frame, ['campaign_rows'])
+        graph.add('daily', polars_engine.aggregate_daily, ['campaign_rows'])
+    else:
+        graph.add('campaign', lambda: load_campaign_window(campaign_path, start_date, end_date, chunked))
+        # One pass over the raw rows; everything below reads the daily totals
+        graph.add('daily', aggregate_daily, ['campaign'])
+
+    graph.add('date_range', lambda daily: (daily['Date'].min(), daily['Date'].max()), ['daily'])
+    graph.add('months', month_order, ['daily'])
+    graph.add('overall', calc_metrics, ['daily'])
+    graph.add('monthly', aggregate_by_month, ['daily', 'business'])
+    graph.add('weekly', aggregate_by_week, ['daily'])
+    graph.add('by_segment', aggregate_by_segment, ['daily'])
+    graph.add('by_portfolio', aggregate_by_portfolio, ['daily'])
+    graph.add('segment_month', aggregate_by_segment_and_month, ['daily'])
+    graph.add('portfolio_month', aggregate_by_portfolio_and_month, ['daily'])
+    graph.add('yoy', aggregate_yoy, ['daily'])
+    graph.add('yoy_month', lambda daily: aggregate_yoy(daily, keys=()), ['daily'])
+    graph.add('business_total', lambda business: None if business is None else business['Total_Sales'].sum(),
+              ['business'])
+    return graph
+
+def sheet_nodes(sheets):
+    """Graph nodes needed to build the given sheet keys."""
+    nodes = []
+    for key in sheets:
+        if key in SHEET_BUILDERS:
+            nodes.extend(SHEET_BUILDERS[key][1])
+        else:
+            nodes.append(RAW_SHEET_INPUTS[key][0])
+        if key in BUSINESS_ONLY_SHEETS:
+            nodes.append('business')
+    return list(dict.fromkeys(nodes))
+
+def generate_report(campaign_path, business_path, output_path, compact=False, compresslevel=None,
+                    sheets=None, start_date=None, end_date=None, workers=None, memory_budget=None,
+                    aggregates_dir=None, aggregates_format=AGGREGATE_FORMAT, engine=ENGINE):
+    """Load the CSV exports, build the report workbook and save it to output_path.
+
+    campaign_path may also be a list of overlapping exports, oldest first
+    (see merge_campaign_exports). compact streams the raw data sheets
+    (shared strings, positional cells, column formats, cents-rounded
+    amounts); compresslevel sets the zip deflate level (0-9). sheets is a list of REPORT_SHEETS keys (default:
+    all); only the inputs and aggregates those sheets declare are computed,
+    each once, with independent ones in up to `workers` threads.
+    start_date/end_date restrict both exports to a date window.
+    memory_budget (bytes) switches to the chunked loader and/or streaming
+    writer when the estimated footprint would not fit. aggregates_dir also
+    writes the monthly, weekly, segment and portfolio aggregates there as
+    Parquet or CSV files (aggregates_format; by default Parquet when pyarrow
+    is installed, CSV otherwise). engine selects the pandas or polars
+    loaders (see build_report_graph).
+    """
+    if sheets is None:
+        sheets = list(REPORT_SHEETS)
+    if not sheets:
+        raise ValueError("No sheets selected")
+
+    chunked = False
+    if memory_budget:
+        chunked, stream = plan_memory(campaign_path, business_path, memory_budget, sheets)
+        compact = compact or stream
+
+    # Load and aggregate only what the selected sheets need
+    graph = build_report_graph(campaign_path, business_path, start_date, end_date, chunked, engine)
+    nodes = sheet_nodes(sheets)
+    if aggregates_dir is not None:
+        nodes = list(dict.fromkeys(nodes + list(AGGREGATE_EXPORTS)))
+    graph.compute(nodes, max_workers=workers)
+    sheet_names = write_report(graph, sheets, output_path, compact, compresslevel)
+
+    if aggregates_dir is not None:
+        prefix = os.path.splitext(os.path.basename(output_path))[0]
+        paths = export_aggregates(graph, aggregates_dir, prefix, aggregates_format)
+        print(f"\nAggregates written to: {aggregates_dir} ({len(paths)} {aggregates_format} files)")
+    return sheet_names
+
+def write_report(graph, sheets, output_path, compact=False, compresslevel=None):
+    """Build the selected sheets from the graph's nodes and save the workbook.
+
+    Nodes not yet computed are computed on first use. Returns the sheet names.
+    """
+    from openpyxl import Workbook
+    print("\nAggregating data...")
+    if 'monthly' in graph.values:
+        print(f"  Monthly periods: {len(graph.values['monthly'])}")
+    if 'weekly' in graph.values:
+        print(f"  Weekly periods: {len(graph.values['weekly'])}")
 
     # Create workbook
     print("\nGenerating Excel report...")
     wb = Workbook()
     wb.remove(wb.active)  # Remove default sheet
 
-    # Create sheets
-    create_summary_sheet(wb, campaign_df, business_df, monthly_data)
-    create_monthly_sheet(wb, monthly_data)
-    create_weekly_sheet(wb, weekly_data)
-    create_segment_sheet(wb, campaign_df)
-    create_portfolio_sheet(wb, campaign_df)
-
-    if business_df is not None:
-        create_organic_sheet(wb, campaign_df, business_df, monthly_data)
-
-    # Raw data sheets (limited for Excel Online)
-    campaign_cols = ['Date', 'Portfolio name', 'Campaign Name', 'Spend', 'Sales', 'Orders',
-                     'Clicks', 'Impressions', 'Portfolio_Type', 'Segment', 'Month_Label']
-    create_raw_data_sheet(wb, campaign_df, "Campaign Data", campaign_cols)
+    has_business = graph.values.get('business') is not None
+    raw_frames = {}
+    raw_rows = 0
+    for key in sheets:
+        if key in BUSINESS_ONLY_SHEETS and not has_business:
+            continue
+        if key in LAST_YEAR_SHEETS and graph.get('yoy') is None:
+            print(f"  Skipping {REPORT_SHEETS[key]}: the campaign export has no Last Year columns")
+            continue
+
+        if key in SHEET_BUILDERS:
+            builder, nodes = SHEET_BUILDERS[key]
+            builder(wb, *[graph.get(node) for node in nodes])
+        else:
+            # Raw data sheets (limited for Excel Online)
+            node, columns = RAW_SHEET_INPUTS[key]
+            df = graph.get(node)
+            raw_frames[REPORT_SHEETS[key]] = create_raw_data_sheet(wb, df, REPORT_SHEETS[key], columns, compact)
+            raw_rows += min(len(df), RAW_MAX_ROWS)
 
-    if business_df is not None:
-        business_cols = ['Date', 'Total_Sales', 'Units', 'Sessions', 'Month_Label']
-        create_raw_data_sheet(wb, business_df, "Business Data", business_cols)
+    if not wb.sheetnames:
+        raise ValueError("None of the selected sheets can be built from the available data")
 
     # Save
-    wb.save(output_path)
+    size = save_report(wb, output_path, raw_frames if compact else None, compresslevel)
     print(f"\nReport saved to: {output_path}")
+    if raw_rows:
+        print(f"  Size: {size / 1024:,.1f} KB ({size / raw_rows:,.1f} bytes per raw data row)")
+    else:
+        print(f"  Size: {size / 1024:,.1f} KB")
     print("\nSheets created:")
     for sheet in wb.sheetnames:
         print(f"  - {sheet}")
 
+    return wb.sheetnames
+
+# ============================================================================
+# AGGREGATE EXPORT
+# ============================================================================
+
+# Graph nodes written by --export-aggregates, with their file name suffixes
+AGGREGATE_EXPORTS = {
+    'monthly': 'monthly',
+    'weekly': 'weekly',
+    'by_segment': 'segment',
+    'by_portfolio': 'portfolio',
+    'segment_month': 'segment_month',
+    'portfolio_month': 'portfolio_month',
+    'yoy': 'yoy',
+}
+AGGREGATE_FORMATS = ['parquet', 'csv']
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) for engine in ('pyarrow', 'fastparquet'))
+
+def resolve_aggregate_format(fmt=None):
+    """fmt, or parquet when pyarrow/fastparquet is installed and csv otherwise."""
+    return fmt or ('parquet' if parquet_available() else 'csv')
+
+def aggregate_table(df):
+    """An aggregate as written to disk: month frames get a Month (first day) column and are sorted by it."""
+    import pandas as pd
+    if 'Month_Label' not in df.columns:
+        return df
+    table = df.copy()
+    table.insert(0, 'Month', pd.to_datetime(table['Month_Label'], format='%b %Y'))
+    return table.sort_values('Month', kind='stable', ignore_index=True)
+
+def write_tables(tables, directory, prefix, fmt=AGGREGATE_FORMAT):
+    """Write {name: DataFrame} as directory/<prefix>_<name>.<fmt>; return the paths."""
+    fmt = resolve_aggregate_format(fmt)
+    if fmt not in AGGREGATE_FORMATS:
+        raise ValueError(f"Unknown aggregate format '{fmt}' (choose from: {', '.join(AGGREGATE_FORMATS)})")
+    if fmt == 'parquet' and not parquet_available():
+        raise SystemExit("Parquet output requires pyarrow (pip install pyarrow); use csv instead")
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, table in tables.items():
+        path = os.path.join(directory, f"{prefix}_{name}.{fmt}")
+        with stage(f"export: {name}", rows=len(table)):
+            if fmt == 'parquet':
+                table.to_parquet(path, index=False)
+            else:
+                table.to_csv(path, index=False, date_format='%Y-%m-%d')
+        paths.append(path)
+    return paths
+
+@profiled()
+def export_aggregates(graph, directory, prefix, fmt=AGGREGATE_FORMAT):
+    """Write the AGGREGATE_EXPORTS frames as directory/<prefix>_<name>.<fmt>; return the paths.
+
+    Monthly, segment and portfolio frames are computed if the selected
+    sheets did not need them; yoy is left out when the export has no Last
+    Year columns.
+    """
+    tables = {name: aggregate_table(graph.get(node)) for node, name in AGGREGATE_EXPORTS.items()
+              if graph.get(node) is not None}
+    return write_tables(tables, directory, prefix, fmt)
+
+# ============================================================================
+# LIBRARY API
+# ============================================================================
+
+# Columns load_campaign_data / load_business_data add that the report reads
+CAMPAIGN_FRAME_COLUMNS = ['Date', 'Spend', 'Sales', 'Orders', 'Clicks', 'Impressions', 'Campaign Name',
+                          'Portfolio name', 'Portfolio_Type', 'Segment', 'Month', 'Month_Label']
+BUSINESS_FRAME_COLUMNS = ['Date', 'Total_Sales', 'Units', 'Sessions', 'Month', 'Month_Label']
+
+def report_graph_from_frames(campaign_df, business_df=None, start_date=None, end_date=None):
+    """A report graph whose inputs are already-loaded DataFrames instead of CSV paths."""
+    for name, df, columns in [('campaign_df', campaign_df, CAMPAIGN_FRAME_COLUMNS),
+                              ('business_df', business_df, BUSINESS_FRAME_COLUMNS)]:
+        missing = [] if df is None else [c for c in columns if c not in df.columns]
+        if missing:
+            loader = 'load_campaign_data' if name == 'campaign_df' else 'load_business_data'
+            raise ValueError(f"{name} is missing {', '.join(missing)}; load it with {loader}()")
+
+    campaign_df = filter_date_window(campaign_df, start_date, end_date)
+    if campaign_df.empty:
+        raise ValueError("No campaign rows in the selected date window")
+    if business_df is not None:
+        business_df = filter_date_window(business_df, start_date, end_date)
+
+    graph = build_report_graph(None, None)
+    graph.values.update(campaign=campaign_df, business=business_df)
+    return graph
+
+def build_report(campaign_df, business_df=None, sheets=None, start_date=None, end_date=None,
+                 compact=False, compresslevel=None, workers=None, verbose=False):
+    """Build the report from loaded exports and return the xlsx file as bytes.
+
+    campaign_df and business_df are DataFrames as returned by
+    load_campaign_data and load_business_data (business_df may be None);
+    they are not modified, so one load can serve any number of reports.
+    The other options are those of generate_report. Progress lines are
+    suppressed unless verbose.
+    """
+    if sheets is None:
+        sheets = list(REPORT_SHEETS)
+    if not sheets:
+        raise ValueError("No sheets selected")
+
+    graph = report_graph_from_frames(campaign_df, business_df, start_date, end_date)
+    buffer = io.BytesIO()
+    with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+        graph.compute(sheet_nodes(sheets), max_workers=workers)
+        write_report(graph, sheets, buffer, compact, compresslevel)
+    return buffer.getvalue()
+
+def parse_sheet_list(value):
+    """argparse type for comma-separated sheet keys."""
+    keys = [key.strip().lower() for key in value.split(',') if key.strip()]
+    unknown = [key for key in keys if key not in REPORT_SHEETS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown sheet(s) {', '.join(unknown)} (choose from: {', '.join(REPORT_SHEETS)})")
+    return keys
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}' (expected YYYY-MM-DD)")
+
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Generate the populated campaign performance report from CSV exports.")
+    parser.add_argument('--campaign', nargs='+', default=[os.path.join(script_dir, CAMPAIGN_FILE)],
+                        metavar='CSV',
+                        help=f"Campaign report CSV (default: {CAMPAIGN_FILE} next to this script); "
+                             "several overlapping exports are merged, oldest first, later files "
+                             "replacing the earlier ones' rows")
+    parser.add_argument('--business', default=os.path.join(script_dir, BUSINESS_FILE),
+                        help=f"Business report CSV (default: {BUSINESS_FILE} next to this script)")
+    parser.add_argument('--output', default=os.path.join(script_dir, OUTPUT_FILE),
+                        help=f"Output workbook (default: {OUTPUT_FILE} next to this script)")
+    parser.add_argument('--start', type=parse_date, help="First date to include (YYYY-MM-DD)")
+    parser.add_argument('--end', type=parse_date, help="Last date to include (YYYY-MM-DD)")
+    parser.add_argument('--sheets', type=parse_sheet_list,
+                        help=f"Comma-separated sheets to build (default: all): {', '.join(REPORT_SHEETS)}")
+    parser.add_argument('--skip-sheets', type=parse_sheet_list, help="Comma-separated sheets to leave out")
+    parser.add_argument('--no-raw', action='store_true', help="Leave out the raw Campaign Data / Business Data sheets")
+    parser.add_argument('--compact', action='store_true', default=COMPACT_OUTPUT,
+                        help="Size-optimized output (streamed raw sheets with shared strings)")
+    parser.add_argument('--compresslevel', type=int, choices=range(10), default=ZIP_COMPRESSLEVEL,
+                        metavar='0-9', help="Zip deflate level (default: zlib default)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Threads for loading and aggregating independent inputs (1 = serial)")
+    parser.add_argument('--engine', choices=ENGINES, default=ENGINE,
+                        help=f"Loading/aggregation engine (default: {ENGINE}); polars scans the exports "
+                             "multithreaded")
+    parser.add_argument('--rules', metavar='PATH',
+                        help="Segment/portfolio classification rules (default: classification_rules.json "
+                             "next to this script)")
+    parser.add_argument('--export-aggregates', nargs='?', const='', metavar='DIR',
+                        help="Also write the monthly, weekly, segment and portfolio aggregates as "
+                             "<report>_<name> files to DIR (default: next to the report)")
+    parser.add_argument('--aggregate-format', choices=AGGREGATE_FORMATS, default=AGGREGATE_FORMAT,
+                        help="File format for --export-aggregates (default: parquet if pyarrow is installed, "
+                             "else csv)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="Write per-stage wall/CPU time, rows and rows/sec to PATH (.json or .csv)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Also record each stage's peak traced memory (tracemalloc) and RSS; "
+                             "slows Python-heavy stages")
+    parser.add_argument('--memory-budget', type=parse_memory_size, metavar='SIZE',
+                        help="Peak memory to stay within, e.g. 2GB; switches to the chunked loader "
+                             "and streaming writer when the estimate exceeds it")
+    parser.add_argument('--profile-dump', metavar='PATH',
+                        help="Also profile each stage and write the slowest one's dump "
+                             "(.prof for cProfile/pstats, .html for pyinstrument); runs serially")
+    args = parser.parse_args(argv)
+
+    if args.start and args.end and args.start > args.end:
+        parser.error("--start must not be after --end")
+    for path in args.campaign:
+        if not os.path.isfile(path):
+            parser.error(f"campaign report not found: {path}")
+
+    sheets = resolve_sheets(args.sheets, args.skip_sheets, include_raw=not args.no_raw)
+    if not sheets:
+        parser.error("no sheets left to build")
+
+    try:
+        use_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(f"classification rules: {e}")
+
+    if args.engine == 'polars' and importlib.util.find_spec('polars') is None:
+        parser.error("--engine polars requires polars (pip install polars)")
+
+    aggregates_dir = args.export_aggregates
+    if aggregates_dir == '':
+        aggregates_dir = os.path.dirname(os.path.abspath(args.output))
+    if aggregates_dir is not None and args.aggregate_format == 'parquet' and not parquet_available():
+        parser.error("--aggregate-format parquet requires pyarrow (pip install pyarrow); "
+                     "use --aggregate-format csv")
+
+    profiler = None
+    workers = args.workers
+    if args.profile or args.profile_dump or args.profile_memory:
+        profiler = StageProfiler(dump_path=args.profile_dump, track_memory=args.profile_memory)
+        if args.profile_dump:
+            # Python allows one active profiler at a time
+            workers = 1
+
+    with profiler.activate() if profiler else contextlib.nullcontext():
+        generate_report(args.campaign, args.business, args.output,
+                        compact=args.compact, compresslevel=args.compresslevel,
+                        sheets=sheets, start_date=args.start, end_date=args.end, workers=workers,
+                        memory_budget=args.memory_budget, aggregates_dir=aggregates_dir,
+                        aggregates_format=args.aggregate_format, engine=args.engine)
+
+    if profiler:
+        profiler.print_summary()
+        if args.profile:
+            profiler.write(args.profile)
+            print(f"  Profile written to: {args.profile}")
+        dumped = profiler.write_slowest_dump()
+        if dumped:
+            print(f"  Profile dump of slowest stage '{dumped[0]}' written to: {dumped[1]}")
+
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+History Store
+A local SQLite database (one file, standard library only, works offline)
+that accumulates the parsed campaign and business rows of every export, so
+reports for any window come from SQL instead of re-parsing CSVs.
+
+Each export is upserted by day: a newer campaign export replaces every row
+of the days it covers (an export can hold several rows per campaign and
+day, so whole days are the unit), and business rows are keyed by Date.
+Files already imported (same content) are skipped. Rows keep their raw
+campaign and portfolio names; the segment and portfolio labels are stored
+alongside with the hash of the rules that gave them, and every row is
+relabelled when the store is next used with different rules (--rules).
+Reports are built from aggregate queries: the
+daily totals per portfolio type and segment are summed in SQL over the
+(Date, Portfolio_Type, Segment, Campaign) index, and raw rows are only read
+when a raw data sheet is requested.
+
+    python history_store.py ingest --campaign campaign.csv --business business.csv
+    python history_store.py report --start 2025-01-01 --end 2025-03-31 --output q1.xlsx --no-raw
+    python history_store.py info
+    python history_store.py --rules brand_x.json report --output brand_x.xlsx
+"""
+
+import os
+import sys
+import sqlite3
+import argparse
+import contextlib
+from datetime import datetime
+
+import pandas as pd
+
+from watch_reports import file_digest
+from classification_rules import get_classifier, active_digest, use_rules
+from generate_report_from_data import (
+    load_campaign_data_chunked, load_business_data, build_report_graph, sheet_nodes, write_report,
+    resolve_sheets, parse_sheet_list, parse_date, REPORT_SHEETS, OUTPUT_FILE, COMPACT_OUTPUT,
+)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+STORE_FILE = "report_history.sqlite"
+INSERT_BATCH_ROWS = 50000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaign_rows (
+    date TEXT NOT NULL,
+    campaign_name TEXT NOT NULL,
+    portfolio_name TEXT,
+    portfolio_type TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    spend REAL NOT NULL,
+    sales REAL NOT NULL,
+    orders REAL NOT NULL,
+    clicks REAL NOT NULL,
+    impressions REAL NOT NULL,
+    ly_spend REAL,
+    ly_clicks REAL,
+    ly_impressions REAL
+);
+CREATE INDEX IF NOT EXISTS campaign_rows_window
+    ON campaign_rows (date, portfolio_type, segment, campaign_name);
+
+CREATE TABLE IF NOT EXISTS business_rows (
+    date TEXT PRIMARY KEY,
+    total_sales REAL NOT NULL,
+    units REAL NOT NULL,
+    sessions REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    digest TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    first_date TEXT,
+    last_date TEXT,
+    imported_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Store column -> report frame column
+CAMPAIGN_COLUMNS = {
+    'date': 'Date', 'campaign_name': 'Campaign Name', 'portfolio_name': 'Portfolio name',
+    'portfolio_type': 'Portfolio_Type', 'segment': 'Segment', 'spend': 'Spend', 'sales': 'Sales',
+    'orders': 'Orders', 'clicks': 'Clicks', 'impressions': 'Impressions',
+    'ly_spend': 'LY_Spend', 'ly_clicks': 'LY_Clicks', 'ly_impressions': 'LY_Impressions',
+}
+BUSINESS_COLUMNS = {'date': 'Date', 'total_sales': 'Total_Sales', 'units': 'Units', 'sessions': 'Sessions'}
+METRIC_COLUMNS = ['spend', 'sales', 'orders', 'clicks', 'impressions']
+# The export's Last Year columns; NULL for rows from exports without them
+LAST_YEAR_COLUMNS = ['ly_spend', 'ly_clicks', 'ly_impressions']
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+def upsert_sql(table, columns, key):
+    """INSERT ... ON CONFLICT(key) DO UPDATE for all non-key columns."""
+    updates = ', '.join(f"{column} = excluded.{column}" for column in columns if column not in key)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}")
+
+def window_clause(start_date=None, end_date=None):
+    """(WHERE clause, parameters) restricting the ISO date column to a window."""
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append("date >= ?")
+        params.append(f"{pd.Timestamp(start_date):%Y-%m-%d}")
+    if end_date is not None:
+        conditions.append("date <= ?")
+        params.append(f"{pd.Timestamp(end_date):%Y-%m-%d}")
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+def add_time_dimensions(df):
+    """Date as datetime plus the loaders' Month / Month_Label / Week columns."""
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    df['Month'] = df['Date'].dt.to_period('M')
+    df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
+    df['Week'] = df['Date'].dt.strftime('%Y-W%U')
+    return df
+
+def last_year_columns(df):
+    """Drop the Last Year columns if no row in df has them, as for an export without
+    them; otherwise count missing values as 0, as summing the exports would."""
+    columns = [CAMPAIGN_COLUMNS[column] for column in LAST_YEAR_COLUMNS]
+    if df[columns].isna().all().all():
+        return df.drop(columns=columns)
+    df[columns] = df[columns].fillna(0.0)
+    return df
+
+class HistoryStore:
+    """The SQLite history file. Each call opens its own connection, so graph
+    nodes can query it from worker threads."""
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before the Last Year columns were kept
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(campaign_rows)")}
+            for column in LAST_YEAR_COLUMNS:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE campaign_rows ADD COLUMN {column} REAL")
+
+    @contextlib.contextmanager
+    def connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:  # Commits, or rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------ ingest
+
+    def imported(self, digest):
+        with self.connect() as conn:
+            return conn.execute("SELECT 1 FROM imports WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def relabel(self):
+        """Re-classify every stored campaign row if the active rules differ from the ones
+        that labelled them; return True if the labels were rewritten."""
+        digest = active_digest()
+        with self.connect() as conn:
+            stored = conn.execute("SELECT value FROM meta WHERE key = 'rules_digest'").fetchone()
+            if stored and stored[0] == digest:
+                return False
+            relabelled = False
+            if conn.execute("SELECT 1 FROM campaign_rows LIMIT 1").fetchone():
+                print(f"Relabelling {self.path} for the active classification rules...")
+                for kind, column, label_column in [('segment', 'campaign_name', 'segment'),
+                                                   ('portfolio', 'portfolio_name', 'portfolio_type')]:
+                    names = [name for name, in conn.execute(
+                        f"SELECT DISTINCT COALESCE({column}, '') FROM campaign_rows")]
+                    conn.execute(f"CREATE TEMP TABLE {kind}_labels (name TEXT PRIMARY KEY, label TEXT NOT NULL)")
+                    conn.executemany(f"INSERT INTO {kind}_labels VALUES (?, ?)",
+                                     zip(names, get_classifier(kind).labels(names)))
+                    conn.execute(f"UPDATE campaign_rows SET {label_column} = "
+                                 f"(SELECT label FROM {kind}_labels WHERE name = COALESCE({column}, ''))")
+                relabelled = True
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('rules_digest', ?)", (digest,))
+        return relabelled
+
+    def upsert(self, table, columns, key, rows, replace_dates=None):
+        """Upsert an iterable of row tuples in batches; return the row count.
+
+        With replace_dates, existing rows on those dates are deleted first
+        (in the same transaction) and the rows are plain inserts.
+        """
+        sql = upsert_sql(table, columns, key) if key else (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})")
+        count = 0
+        with self.connect() as conn:
+            if replace_dates is not None:
+                conn.execute("CREATE TEMP TABLE replaced_dates (date TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO replaced_dates VALUES (?)", ((d,) for d in replace_dates))
+                conn.execute(f"DELETE FROM {table} WHERE date IN (SELECT date FROM replaced_dates)")
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_ROWS:
+                    conn.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany(sql, batch)
+            count += len(batch)
+        return count
+
+    def record_import(self, digest, kind, path, df):
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (digest, kind, os.path.abspath(path), len(df),
+                          f"{df['Date'].min():%Y-%m-%d}", f"{df['Date'].max():%Y-%m-%d}",
+                          datetime.now().isoformat(timespec='seconds')))
+
+    def ingest(self, path, kind, force=False):
+        """Parse one export and upsert its rows; return the row count (None if already imported)."""
+        digest = file_digest(path)
+        if not force and self.imported(digest):
+            print(f"Skipping {path}: already imported")
+            return None
+
+        if kind == 'campaign':
+            self.relabel()  # Stored rows get the same rules as the new ones
+            df = load_campaign_data_chunked(path)
+            table, mapping, key = 'campaign_rows', CAMPAIGN_COLUMNS, None
+        else:
+            df = load_business_data(path)
+            table, mapping, key = 'business_rows', BUSINESS_COLUMNS, ['date']
+
+        frame = df.reindex(columns=list(mapping.values()))  # Last Year columns may be absent
+        frame['Date'] = frame['Date'].dt.strftime('%Y-%m-%d')
+        if 'Portfolio name' in frame.columns:
+            names = frame['Portfolio name'].astype(object)
+            frame['Portfolio name'] = names.where(names.notna(), None)
+        dates = frame['Date'].unique() if key is None else None
+        count = self.upsert(table, list(mapping), key, frame.itertuples(index=False, name=None), dates)
+        self.record_import(digest, kind, path, df)
+        print(f"  Upserted {count:,} {kind} rows into {self.path}")
+        return count
+
+    # ----------------------------------------------------------------- queries
+
+    def query(self, sql, params=()):
+        with self.connect() as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def daily_frame(self, start_date=None, end_date=None):
+        """aggregate_daily's frame, summed in SQL over the window."""
+        where, params = window_clause(start_date, end_date)
+        sums = ', '.join(f"SUM({column}) AS {CAMPAIGN_COLUMNS[column]}"
+                         for column in METRIC_COLUMNS + LAST_YEAR_COLUMNS)
+        df = self.query(f"SELECT date AS Date, portfolio_type AS Portfolio_Type, segment AS Segment, {sums} "
+                        f"FROM campaign_rows {where} GROUP BY date, portfolio_type, segment "
+                        f"ORDER BY date, portfolio_type, segment", params)
+        if df.empty:
+            raise ValueError("No campaign rows in the selected date window")
+        df = add_time_dimensions(last_year_columns(df))
+        return df.drop(columns='Month')
+
+    def campaign_frame(self, start_date=None, end_date=None):
+        """Campaign rows in the window, shaped like load_campaign_data output."""
+        where, params = window_clause(start_date, end_date)
+        columns = ', '.join(f'{column} AS "{name}"' for column, name in CAMPAIGN_COLUMNS.items())
+        df = self.query(f"SELECT {columns} FROM campaign_rows {where} ORDER BY date, campaign_name", params)
+        if df.empty:
+            raise ValueError("No campaign rows in the selected date window")
+        df = add_time_dimensions(last_year_columns(df))
+        df['Year'] = df['Date'].dt.year
+        return df
+
+    def business_frame(self, start_date=None, end_date=None):
+        """Business rows in the window shaped like load_business_data output, or None if there are none."""
+        where, params = window_clause(start_date, end_date)
+        columns = ', '.join(f"{column} AS {name}" for column, name in BUSINESS_COLUMNS.items())
+        df = self.query(f"SELECT {columns} FROM business_rows {where} ORDER BY date", params)
+        return add_time_dimensions(df) if not df.empty else None
+
+    def summary(self):
+        with self.connect() as conn:
+            spans = {table: conn.execute(f"SELECT COUNT(*), MIN(date), MAX(date) FROM {table}").fetchone()
+                     for table in ['campaign_rows', 'business_rows']}
+            imports = conn.execute("SELECT kind, path, rows, first_date, last_date, imported_at "
+                                   "FROM imports ORDER BY imported_at").fetchall()
+        return spans, imports
+
+# ============================================================================
+# REPORTS
+# ============================================================================
+
+def build_store_graph(store, start_date=None, end_date=None):
+    """The report graph with its inputs and daily totals read from the store."""
+    store.relabel()
+    graph = build_report_graph(None, None)
+    graph.add('campaign', lambda: store.campaign_frame(start_date, end_date))
+    graph.add('business', lambda: store.business_frame(start_date, end_date))
+    graph.add('daily', lambda: store.daily_frame(start_date, end_date))
+    return graph
+
+def generate_store_report(store, output_path, sheets, start_date=None, end_date=None,
+                          compact=False, workers=None):
+    """Build the report for a window from the store and save it to output_path."""
+    graph = build_store_graph(store, start_date, end_date)
+    graph.compute(sheet_nodes(sheets), max_workers=workers)
+    return write_report(graph, sheets, output_path, compact)
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Keep parsed exports in a local SQLite store and report from it.")
+    parser.add_argument('--db', default=os.path.join(script_dir, STORE_FILE),
+                        help=f"Store file (default: {STORE_FILE} next to this script)")
+    parser.add_argument('--rules', metavar='PATH',
+                        help="Segment/portfolio classification rules (default: classification_rules.json "
+                             "next to this script); stored rows are relabelled when the rules change")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Upsert campaign and/or business exports into the store")
+    ingest.add_argument('--campaign', action='append', default=[], help="Campaign report CSV (repeatable)")
+    ingest.add_argument('--business', action='append', default=[], help="Business report CSV (repeatable)")
+    ingest.add_argument('--force', action='store_true', help="Re-import files that were imported before")
+
+    report = commands.add_parser('report', help="Generate the report for a window from the store")
+    report.add_argument('--output', default=OUTPUT_FILE, help=f"Output workbook (default: {OUTPUT_FILE})")
+    report.add_argument('--start', type=parse_date, help="First date to include (YYYY-MM-DD)")
+    report.add_argument('--end', type=parse_date, help="Last date to include (YYYY-MM-DD)")
+    report.add_argument('--sheets', type=parse_sheet_list,
+                        help=f"Comma-separated sheets to build (default: all): {', '.join(REPORT_SHEETS)}")
+    report.add_argument('--skip-sheets', type=parse_sheet_list, help="Comma-separated sheets to leave out")
+    report.add_argument('--no-raw', action='store_true', help="Leave out the raw data sheets")
+    report.add_argument('--compact', action='store_true', default=COMPACT_OUTPUT, help="Size-optimized output")
+    report.add_argument('--workers', type=int, default=None, help="Threads for querying and aggregating")
+
+    commands.add_parser('info', help="Show what the store holds")
+    args = parser.parse_args(argv)
+
+    try:
+        use_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(f"classification rules: {e}")
+
+    if args.command == 'ingest':
+        paths = [(path, 'campaign') for path in args.campaign] + [(path, 'business') for path in args.business]
+        if not paths:
+            parser.error("ingest needs --campaign and/or --business")
+        missing = [path for path, _ in paths if not os.path.isfile(path)]
+        if missing:
+            parser.error(f"not found: {', '.join(missing)}")
+        store = HistoryStore(args.db)
+        for path, kind in paths:
+            store.ingest(path, kind, force=args.force)
+        return 0
+
+    if args.command == 'report':
+        if args.start and args.end and args.start > args.end:
+            parser.error("--start must not be after --end")
+        sheets = resolve_sheets(args.sheets, args.skip_sheets, include_raw=not args.no_raw)
+        if not sheets:
+            parser.error("no sheets left to build")
+        if not os.path.exists(args.db):
+            parser.error(f"store not found: {args.db} (run ingest first)")
+        generate_store_report(HistoryStore(args.db), args.output, sheets, args.start, args.end,
+                              args.compact, args.workers)
+        return 0
+
+    if not os.path.exists(args.db):
+        parser.error(f"store not found: {args.db}")
+    spans, imports = HistoryStore(args.db).summary()
+    for table, (rows, first, last) in spans.items():
+        print(f"{table}: {rows:,} rows" + (f", {first} to {last}" if rows else ""))
+    print(f"\nImports ({len(imports)}):")
+    for kind, path, rows, first, last, imported_at in imports:
+        print(f"  {imported_at}  {kind:<8} {rows:>10,} rows  {first} to {last}  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
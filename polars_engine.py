@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Polars Engine
+Polars versions of the CSV loaders and of the raw-row aggregation for
+generate_report_from_data.py (--engine polars; requires polars).
+
+The exports are scanned lazily: only the columns the report uses are read
+(projection pushdown) and the date window is applied inside the scan
+(predicate pushdown). Currency parsing and the daily aggregation are
+expressions that run multithreaded; classification runs the rules once per
+distinct name and maps the labels back with one replace. Results reach the
+sheet writers as pandas frames with the same columns and values as the
+pandas loaders. Every other aggregate is derived from the small daily
+frame and stays in pandas, and the full campaign rows are only converted
+when a raw data sheet needs them.
+"""
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from stage_profiler import stage, profiled
+from classification_rules import get_classifier
+from generate_report_from_data import (
+    CAMPAIGN_LOAD_COLUMNS, LAST_YEAR_LOAD_COLUMNS, MERGE_KEY_COLUMNS, export_paths, print_merge_summary,
+)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+BUSINESS_LOAD_COLUMNS = {
+    'Date': 'Date', 'Ordered Product Sales': 'Total_Sales', 'Units Ordered': 'Units',
+    'Sessions - Total': 'Sessions',
+}
+
+# Date layouts seen in the exports ("Sep 01, 2024", "9/1/24"), tried in order
+DATE_FORMATS = ['%b %d, %Y', '%m/%d/%y', '%m/%d/%Y', '%Y-%m-%d']
+
+METRIC_COLUMNS = ['Spend', 'Sales', 'Orders', 'Clicks', 'Impressions']
+LAST_YEAR_COLUMNS = list(LAST_YEAR_LOAD_COLUMNS.values())
+
+# ============================================================================
+# EXPRESSIONS
+# ============================================================================
+
+def currency(column):
+    """"$1,234.56" text -> Float64, 0.0 where empty or unparseable (as parse_currency)."""
+    cleaned = pl.col(column).str.replace_all(r'[$,"]', '').str.strip_chars()
+    return cleaned.cast(pl.Float64, strict=False).fill_null(0.0).alias(column)
+
+def export_date(column='Date'):
+    """Export date text -> Datetime, trying each of DATE_FORMATS."""
+    text = pl.col(column).str.strip_chars()
+    parsed = [text.str.strptime(pl.Datetime('us'), fmt, strict=False) for fmt in DATE_FORMATS]
+    return pl.coalesce(parsed).alias(column)
+
+def classify(rows, source, column, kind):
+    """Label column for rows[source] by the classification rules, matched once per distinct name."""
+    names = rows[source].fill_null('').unique()
+    labels = get_classifier(kind).labels(names.to_list())
+    return pl.col(source).fill_null('').replace_strict(names, labels, return_dtype=pl.String).alias(column)
+
+def time_labels(frame):
+    """Month_Label and Week columns ('%b %Y', '%Y-W%U')."""
+    return frame.with_columns(pl.col('Date').dt.strftime('%b %Y').alias('Month_Label'),
+                              pl.col('Date').dt.strftime('%Y-W%U').alias('Week'))
+
+def date_window(frame, start_date=None, end_date=None):
+    if start_date is not None:
+        frame = frame.filter(pl.col('Date') >= pd.Timestamp(start_date).to_pydatetime())
+    if end_date is not None:
+        frame = frame.filter(pl.col('Date') <= pd.Timestamp(end_date).to_pydatetime())
+    return frame
+
+def scan_export(filepath, columns, optional=None):
+    """LazyFrame of the given export columns (all read as text), renamed.
+
+    optional maps further columns that are included when the export has them.
+    """
+    frame = pl.scan_csv(filepath, infer_schema=False, encoding='utf8-lossy')
+    # The exports start with a UTF-8 byte order mark
+    header = frame.collect_schema().names()
+    names = {name: name.lstrip('\ufeff') for name in header}
+    missing = [column for column in columns if column not in names.values()]
+    if missing:
+        raise ValueError(f"{filepath} is missing columns: {', '.join(missing)}")
+    columns = {**{name: column for name, column in (optional or {}).items() if name in names.values()}, **columns}
+    return frame.select([pl.col(raw).alias(columns[name]) for raw, name in names.items() if name in columns])
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def to_pandas(frame):
+    """pandas DataFrame of a polars frame (column by column, no pyarrow needed)."""
+    return pd.DataFrame({name: frame[name].to_numpy() for name in frame.columns})
+
+@profiled()
+def load_campaign_rows(filepath, start_date=None, end_date=None):
+    """Campaign export rows in the date window as a polars DataFrame.
+
+    filepath may be a list of overlapping exports, oldest first; they are
+    scanned together and merged as by merge_campaign_exports.
+    """
+    paths = export_paths(filepath)
+    print(f"Loading campaign data from {', '.join(map(str, paths))} (polars)...")
+    with stage('campaign: scan') as timing:
+        frames = []
+        for number, path in enumerate(paths):
+            frame = scan_export(path, CAMPAIGN_LOAD_COLUMNS, LAST_YEAR_LOAD_COLUMNS)
+            last_year = [column for column in LAST_YEAR_COLUMNS if column in frame.collect_schema().names()]
+            frame = frame.with_columns(export_date(), *[currency(column) for column in METRIC_COLUMNS + last_year],
+                                       pl.lit(number, pl.Int32).alias('Export'))
+            frames.append(date_window(frame, start_date, end_date))
+        rows = time_labels(pl.concat(frames, how='diagonal')).collect()
+        timing['rows'] = rows.height
+    with stage('campaign: classify', rows=rows.height):
+        rows = rows.with_columns(classify(rows, 'Portfolio name', 'Portfolio_Type', 'portfolio'),
+                                 classify(rows, 'Campaign Name', 'Segment', 'segment'))
+    rows = merge_exports(rows, paths) if len(paths) > 1 else rows.drop('Export')
+    if rows.is_empty():
+        raise ValueError("No campaign rows in the selected date window")
+
+    print(f"  Loaded {rows.height:,} rows")
+    print(f"  Date range: {rows['Date'].min()} to {rows['Date'].max()}")
+    return rows
+
+@profiled()
+def merge_exports(rows, names):
+    """Keep only the latest export's rows for each merge key (see merge_campaign_exports)."""
+    with stage('campaign: merge exports', rows=rows.height):
+        latest = pl.col('Export') == pl.col('Export').max().over(pl.struct(MERGE_KEY_COLUMNS).hash())
+        replaced = rows.filter(~latest)['Export'].to_numpy()
+        rows = rows.filter(latest).drop('Export')
+    print_merge_summary(names, rows.height, np.bincount(replaced, minlength=len(names)))
+    return rows
+
+@profiled()
+def campaign_frame(rows):
+    """The campaign rows as the pandas frame load_campaign_data produces (report columns only)."""
+    with stage('campaign: to pandas', rows=rows.height):
+        last_year = [column for column in LAST_YEAR_COLUMNS if column in rows.columns]
+        df = to_pandas(rows.select(['Date', 'Portfolio name', 'Campaign Name', *METRIC_COLUMNS, *last_year,
+                                    'Portfolio_Type', 'Segment', 'Month_Label', 'Week']))
+        df['Month'] = df['Date'].dt.to_period('M')
+        df['Year'] = df['Date'].dt.year
+    return df
+
+@profiled()
+def load_business_data(filepath, start_date=None, end_date=None):
+    """The business export as the pandas frame load_business_data produces (report columns only)."""
+    print(f"Loading business data from {filepath} (polars)...")
+    with stage('business: scan') as timing:
+        frame = scan_export(filepath, BUSINESS_LOAD_COLUMNS)
+        frame = frame.with_columns(export_date(), *[currency(column) for column in ['Total_Sales', 'Units', 'Sessions']])
+        rows = time_labels(date_window(frame, start_date, end_date)).collect()
+        timing['rows'] = rows.height
+    df = to_pandas(rows)
+    df['Month'] = df['Date'].dt.to_period('M')
+    print(f"  Loaded {len(df):,} rows")
+    return df
+
+# ============================================================================
+# AGGREGATION
+# ============================================================================
+
+@profiled()
+def aggregate_daily(rows):
+    """aggregate_daily on the polars campaign rows, returned as pandas."""
+    metrics = METRIC_COLUMNS + [column for column in LAST_YEAR_COLUMNS if column in rows.columns]
+    daily = (rows.lazy()
+             .group_by(['Date', 'Portfolio_Type', 'Segment'])
+             .agg([pl.col(column).sum() for column in metrics])
+             .sort(['Date', 'Portfolio_Type', 'Segment']))
+    return to_pandas(time_labels(daily).collect())
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Report Diff
+Compares the aggregates of two report runs and lists every value that
+changed, for example after Amazon restated attribution or two exports
+overlapped.
+
+Each side is a generated report (.xlsx, read with report_reader.py) or the
+Parquet/CSV files written by --export-aggregates: a folder holding one set,
+or DIR/PREFIX when it holds several. The aggregates are aligned on their
+month / week x portfolio x segment keys with an indexed join, so years of
+data diff in milliseconds.
+
+    python report_diff.py old/Campaign_Performance_Report.xlsx new/Campaign_Performance_Report.xlsx
+    python report_diff.py aggregates/2025-01 aggregates/2025-02 --tolerance 1 --output changes.csv
+"""
+
+import io
+import os
+import sys
+import argparse
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from generate_report_from_data import AGGREGATE_EXPORTS, AGGREGATE_FORMATS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Changes at or below both tolerances are ignored
+ABSOLUTE_TOLERANCE = 0.01
+RELATIVE_TOLERANCE = 0.0
+
+# Changed values printed per aggregate (all go to --output)
+PRINT_LIMIT = 20
+
+# Aggregate names (file suffixes) in AGGREGATE_EXPORTS order, and their keys
+AGGREGATE_NAMES = list(AGGREGATE_EXPORTS.values())
+KEY_COLUMNS = ['Month_Label', 'Week', 'Portfolio_Type', 'Segment']
+
+# ============================================================================
+# LOADING
+# ============================================================================
+
+def find_aggregate_files(source):
+    """{name: path} of the aggregate files for a folder or DIR/PREFIX source."""
+    if os.path.isdir(source):
+        # A set is identified by its <prefix>_monthly file
+        directory, prefixes = source, set()
+        for entry in os.listdir(directory):
+            stem, ext = os.path.splitext(entry)
+            if ext[1:] in AGGREGATE_FORMATS and stem.endswith('_monthly'):
+                prefixes.add(stem[:-len('_monthly')])
+        if len(prefixes) != 1:
+            found = ', '.join(sorted(prefixes)) or 'none'
+            raise ValueError(f"{source} must hold exactly one set of aggregates (found: {found}); "
+                             f"pass DIR/PREFIX to choose one")
+        prefix = os.path.join(directory, prefixes.pop())
+    else:
+        prefix = source
+
+    files = {}
+    for name in AGGREGATE_NAMES:
+        for fmt in AGGREGATE_FORMATS:
+            path = f"{prefix}_{name}.{fmt}"
+            if os.path.exists(path):
+                files[name] = path
+                break
+    if not files:
+        raise ValueError(f"no aggregate files found for {source}")
+    return files
+
+def load_aggregates(source):
+    """{name: DataFrame} of the aggregates of a report (.xlsx) or exported aggregate files."""
+    if source.lower().endswith('.xlsx'):
+        from report_reader import read_report
+        with contextlib.redirect_stdout(io.StringIO()):
+            frames = read_report(source, include_raw=False)
+        return {AGGREGATE_EXPORTS[node]: df for node, df in frames.items() if node in AGGREGATE_EXPORTS}
+
+    frames = {}
+    for name, path in find_aggregate_files(source).items():
+        if path.endswith('.parquet'):
+            frames[name] = pd.read_parquet(path)
+        else:
+            frames[name] = pd.read_csv(path, dtype={key: str for key in KEY_COLUMNS}, keep_default_na=False)
+    return frames
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+def long_values(df, keys):
+    """Numeric columns as one Series indexed by (keys..., Metric)."""
+    values = df.set_index(keys).select_dtypes('number')
+    values.columns.name = 'Metric'
+    return values.stack(future_stack=True)
+
+def diff_aggregate(old, new, abs_tol=ABSOLUTE_TOLERANCE, rel_tol=RELATIVE_TOLERANCE):
+    """Changed values between two versions of one aggregate, as a frame.
+
+    Rows are aligned on the key columns both versions share and only
+    metrics present in both are compared. Keys found on one side only show
+    up with the other side's value missing.
+    """
+    keys = [key for key in KEY_COLUMNS if key in old.columns and key in new.columns]
+    if not keys:
+        raise ValueError("aggregates share no key columns")
+    metrics = sorted(set(old.select_dtypes('number').columns) & set(new.select_dtypes('number').columns))
+    old_values = long_values(old[keys + metrics], keys)
+    new_values = long_values(new[keys + metrics], keys)
+
+    joined = pd.concat({'Old': old_values, 'New': new_values}, axis=1, join='outer')
+    delta = joined['New'] - joined['Old']
+    size = delta.abs().to_numpy()
+    changed = (size > abs_tol) & (size > rel_tol * joined['Old'].abs().to_numpy())
+    changed |= joined['Old'].isna().to_numpy() != joined['New'].isna().to_numpy()
+
+    result = joined[changed].copy()
+    result['Change'] = delta[changed]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['Change %'] = result['Change'] / result['Old'].abs() * 100
+    return result.reset_index()
+
+def diff_reports(old_frames, new_frames, abs_tol=ABSOLUTE_TOLERANCE, rel_tol=RELATIVE_TOLERANCE):
+    """{name: changes} for every aggregate present on both sides."""
+    return {name: diff_aggregate(old_frames[name], new_frames[name], abs_tol, rel_tol)
+            for name in AGGREGATE_NAMES if name in old_frames and name in new_frames}
+
+def print_changes(name, changes, limit=PRINT_LIMIT):
+    print(f"\n{name}: {len(changes):,} changed value{'s' if len(changes) != 1 else ''}")
+    if changes.empty:
+        return
+    keys = [column for column in changes.columns if column in KEY_COLUMNS]
+    shown = changes.reindex(changes['Change'].abs().sort_values(ascending=False, na_position='first').index)
+    for _, row in shown.head(limit).iterrows():
+        label = ' / '.join(str(row[key]) for key in keys) + f" {row['Metric']}"
+        old = 'missing' if pd.isna(row['Old']) else f"{row['Old']:,.2f}"
+        new = 'missing' if pd.isna(row['New']) else f"{row['New']:,.2f}"
+        change = '' if pd.isna(row['Change']) else f"{row['Change']:+,.2f}"
+        if np.isfinite(row['Change %']):
+            change += f" ({row['Change %']:+.1f}%)"
+        print(f"  {label:<40} {old:>16} -> {new:>16}  {change}")
+    if len(changes) > limit:
+        print(f"  ... {len(changes) - limit:,} more")
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the aggregate values that differ between two report runs.")
+    parser.add_argument('old', help="Earlier run: report .xlsx, aggregate folder or DIR/PREFIX")
+    parser.add_argument('new', help="Later run, in any of the same forms")
+    parser.add_argument('--tolerance', type=float, default=ABSOLUTE_TOLERANCE,
+                        help=f"Ignore absolute changes up to this size (default: {ABSOLUTE_TOLERANCE})")
+    parser.add_argument('--relative-tolerance', type=float, default=RELATIVE_TOLERANCE, metavar='FRACTION',
+                        help="Also ignore changes up to this fraction of the old value, e.g. 0.001")
+    parser.add_argument('--limit', type=int, default=PRINT_LIMIT, help="Changed values printed per aggregate")
+    parser.add_argument('--output', metavar='PATH', help="Write all changed values to a CSV file")
+    args = parser.parse_args(argv)
+
+    try:
+        old_frames = load_aggregates(args.old)
+        new_frames = load_aggregates(args.new)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    diffs = diff_reports(old_frames, new_frames, args.tolerance, args.relative_tolerance)
+    if not diffs:
+        parser.error("the two runs have no aggregates in common")
+
+    print(f"Comparing {args.old} -> {args.new}")
+    for name, changes in diffs.items():
+        print_changes(name, changes, args.limit)
+
+    total = sum(len(changes) for changes in diffs.values())
+    print(f"\n{total:,} changed values in {len(diffs)} aggregates")
+    if args.output:
+        pd.concat([changes.assign(Aggregate=name) for name, changes in diffs.items()],
+                  ignore_index=True).to_csv(args.output, index=False)
+        print(f"Changes written to: {args.output}")
+    return 1 if total else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
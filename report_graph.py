@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Report Dependency Graph
+Lazily evaluated, memoized nodes with declared dependencies. Each sheet
+declares the inputs and aggregates it needs; every node is computed at most
+once, only when something requested depends on it, and nodes whose
+dependencies are ready run in parallel threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class ReportGraph:
+    """A small DAG of named, memoized computations."""
+
+    def __init__(self):
+        self.nodes = {}
+        self.values = {}
+
+    def add(self, name, func, deps=()):
+        """Register node name computed as func(*values of deps)."""
+        self.nodes[name] = (func, tuple(deps))
+
+    def requirements(self, names):
+        """Return names and everything they depend on, dependencies first."""
+        order, done, visiting = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.nodes:
+                raise KeyError(f"Unknown report node '{name}'")
+            if name in visiting:
+                raise ValueError(f"Dependency cycle at report node '{name}'")
+            visiting.add(name)
+            for dep in self.nodes[name][1]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def run_node(self, name):
+        """Compute one node from its (already computed) dependencies."""
+        func, deps = self.nodes[name]
+        return func(*[self.values[dep] for dep in deps])
+
+    def get(self, name):
+        """Return a node's value, computing it and its dependencies on first use."""
+        if name not in self.values:
+            for node in self.requirements([name]):
+                if node not in self.values:
+                    self.values[node] = self.run_node(node)
+        return self.values[name]
+
+    def compute(self, names, max_workers=None):
+        """Compute names and their dependencies, running independent nodes in parallel.
+
+        max_workers=1 computes serially in dependency order.
+        """
+        pending = [name for name in self.requirements(names) if name not in self.values]
+
+        if max_workers == 1 or len(pending) < 2:
+            for name in pending:
+                self.values[name] = self.run_node(name)
+            return {name: self.values[name] for name in names}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while pending or running:
+                for name in list(pending):
+                    if all(dep in self.values for dep in self.nodes[name][1]):
+                        running[pool.submit(self.run_node, name)] = name
+                        pending.remove(name)
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    # Values are only stored from this thread; result() re-raises node errors
+                    self.values[running.pop(future)] = future.result()
+
+        return {name: self.values[name] for name in names}
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Report Reader
+Recovers the data in a previously generated Campaign_Performance_Report.xlsx
+when the CSV exports it was built from are gone.
+
+The workbook is opened with openpyxl in read-only mode and each sheet is
+streamed row by row as plain values, so a report with full raw data sheets
+reads in about a second. The "Campaign Data" and "Business Data" sheets come
+back shaped like load_campaign_data / load_business_data output (ready for
+build_report), and the Monthly, Weekly, Segment and Portfolio sheets as the
+report graph's monthly, weekly, segment_month and portfolio_month frames.
+
+Raw data sheets hold at most 10,000 rows; a truncated sheet is reported.
+
+    python report_reader.py old/Campaign_Performance_Report.xlsx --output-dir recovered/ --format csv
+"""
+
+import os
+import re
+import sys
+import argparse
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from generate_report_from_data import (
+    write_tables, aggregate_table, parquet_available, REPORT_SHEETS, CAMPAIGN_RAW_COLUMNS,
+    BUSINESS_RAW_COLUMNS, AGGREGATE_EXPORTS, AGGREGATE_FORMATS, AGGREGATE_FORMAT,
+)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Monthly / Weekly Performance headers -> aggregate columns
+PERIOD_COLUMNS = {
+    'Month': 'Month_Label', 'Week': 'Week', 'Spend': 'Spend', 'Sales': 'Sales', 'ROAS': 'ROAS',
+    'ACoS': 'ACoS', 'Orders': 'Orders', 'Clicks': 'Clicks', 'CVR': 'CVR',
+    'Total Sales': 'Total_Sales', 'Organic': 'Organic_Sales', 'TACOS': 'TACOS',
+}
+# Stored as fractions in the sheets, as percentages in the aggregates
+PERCENT_COLUMNS = ['ACoS', 'CVR', 'TACOS']
+
+# Aggregate node -> (sheet, key column) for the "<METRIC> BY <KEY>" month grids
+PIVOT_SHEETS = {
+    'segment_month': (REPORT_SHEETS['segment'], 'Segment'),
+    'portfolio_month': (REPORT_SHEETS['portfolio'], 'Portfolio_Type'),
+}
+PIVOT_METRICS = {'SPEND': 'Spend', 'SALES': 'Sales', 'ROAS': 'ROAS'}
+
+RAW_NUMERIC_COLUMNS = ['Spend', 'Sales', 'Orders', 'Clicks', 'Impressions', 'Total_Sales', 'Units', 'Sessions']
+TRUNCATION_NOTE = re.compile(r'Showing first ([\d,]+) of ([\d,]+) rows')
+
+# File name suffixes for --output-dir
+RAW_EXPORTS = {'campaign': 'campaign_data', 'business': 'business_data'}
+
+# ============================================================================
+# SHEET READING
+# ============================================================================
+
+def take_until_blank(rows):
+    """Rows from the iterator up to (and consuming) the first one with an empty first cell."""
+    block = []
+    for row in rows:
+        if row[0] is None:
+            break
+        block.append(row)
+    return block
+
+def header_columns(row):
+    return [value for value in row if value is not None]
+
+def read_raw_sheet(ws):
+    """(rows as a DataFrame, row count of the original data) for a raw data sheet."""
+    rows = ws.iter_rows(values_only=True)
+    columns = header_columns(next(rows, ()))
+    df = pd.DataFrame([row[:len(columns)] for row in take_until_blank(rows)], columns=columns)
+
+    # A "Showing first N of M rows" note follows the blank row when truncated
+    note = next((row[0] for row in rows if isinstance(row[0], str)), None)
+    match = TRUNCATION_NOTE.search(note) if note else None
+    total_rows = int(match.group(2).replace(',', '')) if match else len(df)
+    return df, total_rows
+
+def read_period_sheet(ws):
+    """Monthly or Weekly Performance table (header in row 3) as an aggregate frame."""
+    rows = ws.iter_rows(min_row=3, values_only=True)
+    columns = header_columns(next(rows, ()))
+    df = pd.DataFrame([row[:len(columns)] for row in take_until_blank(rows)], columns=columns)
+    df = df.rename(columns=PERIOD_COLUMNS)
+    for column in PERCENT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column] * 100
+    return df
+
+def read_pivot_sheet(ws, key_column):
+    """Month x key grids of a Segment/Portfolio Analysis sheet as one long frame."""
+    metrics = {}
+    rows = ws.iter_rows(min_row=2, values_only=True)
+    for row in rows:
+        title = row[0]
+        if not (isinstance(title, str) and ' BY ' in title):
+            continue
+        metric = PIVOT_METRICS.get(title.split(' BY ')[0])
+        header = next(rows, ())
+        months = [h for h in header[1:] if h and h != 'Total']
+        block = take_until_blank(rows)
+        if metric:
+            grid = pd.DataFrame([row[1:len(months) + 1] for row in block],
+                                index=[row[0] for row in block], columns=months)
+            metrics[metric] = grid.stack(future_stack=True)
+
+    if not metrics:
+        return pd.DataFrame(columns=['Month_Label', key_column] + list(PIVOT_METRICS.values()))
+    df = pd.concat(metrics, axis=1)
+    df.index.names = [key_column, 'Month_Label']
+    df = df.reset_index()[['Month_Label', key_column] + list(metrics)]
+    month = pd.to_datetime(df['Month_Label'], format='%b %Y')
+    return df.iloc[month.argsort(kind='stable')].reset_index(drop=True)
+
+# ============================================================================
+# FRAME RECONSTRUCTION
+# ============================================================================
+
+def restore_loaded_frame(df, kind):
+    """Raw sheet rows with the types and time dimensions the CSV loaders add."""
+    df['Date'] = pd.to_datetime(df['Date'])
+    for column in RAW_NUMERIC_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce').fillna(0).astype(float)
+    df['Month'] = df['Date'].dt.to_period('M')
+    df['Month_Label'] = df['Date'].dt.strftime('%b %Y')
+    df['Week'] = df['Date'].dt.strftime('%Y-W%U')
+    if kind == 'campaign':
+        df['Year'] = df['Date'].dt.year
+    return df
+
+def read_report(path, include_raw=True):
+    """Read a generated report into {node: DataFrame}; sheets the report lacks are left out.
+
+    Keys are 'campaign' and 'business' (raw data sheets) and 'monthly',
+    'weekly', 'segment_month' and 'portfolio_month' (aggregates).
+    """
+    print(f"Reading report {path}...")
+    wb = load_workbook(path, read_only=True, data_only=True)
+    frames = {}
+    try:
+        raw_sheets = {'campaign': REPORT_SHEETS['campaign-data'], 'business': REPORT_SHEETS['business-data']}
+        for kind, sheet_name in raw_sheets.items():
+            if not include_raw or sheet_name not in wb.sheetnames:
+                continue
+            df, total_rows = read_raw_sheet(wb[sheet_name])
+            frames[kind] = restore_loaded_frame(df, kind)
+            print(f"  {sheet_name}: {len(df):,} rows")
+            if total_rows > len(df):
+                print(f"  Warning: {sheet_name} holds only the first {len(df):,} of {total_rows:,} rows")
+
+        for node, sheet_name in [('monthly', REPORT_SHEETS['monthly']), ('weekly', REPORT_SHEETS['weekly'])]:
+            if sheet_name in wb.sheetnames:
+                frames[node] = read_period_sheet(wb[sheet_name])
+                print(f"  {sheet_name}: {len(frames[node]):,} periods")
+
+        for node, (sheet_name, key_column) in PIVOT_SHEETS.items():
+            if sheet_name in wb.sheetnames:
+                frames[node] = read_pivot_sheet(wb[sheet_name], key_column)
+                print(f"  {sheet_name}: {len(frames[node]):,} month x {key_column} rows")
+    finally:
+        wb.close()
+    return frames
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recover data and aggregates from a generated report workbook.")
+    parser.add_argument('report', help="Campaign_Performance_Report.xlsx written by generate_report_from_data.py")
+    parser.add_argument('--output-dir', metavar='DIR',
+                        help="Write the recovered frames as <report>_<name> files to DIR")
+    parser.add_argument('--format', choices=AGGREGATE_FORMATS, default=AGGREGATE_FORMAT,
+                        help="File format for --output-dir (default: parquet if pyarrow is installed, else csv)")
+    parser.add_argument('--no-raw', action='store_true', help="Skip the raw Campaign Data / Business Data sheets")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(args.report):
+        parser.error(f"report not found: {args.report}")
+    if args.output_dir and args.format == 'parquet' and not parquet_available():
+        parser.error("--format parquet requires pyarrow (pip install pyarrow); use --format csv")
+
+    frames = read_report(args.report, include_raw=not args.no_raw)
+    if 'campaign' in frames:
+        campaign = frames['campaign']
+        print(f"  Date range: {campaign['Date'].min():%Y-%m-%d} to {campaign['Date'].max():%Y-%m-%d}")
+
+    if args.output_dir:
+        tables = {}
+        for kind, columns in [('campaign', CAMPAIGN_RAW_COLUMNS), ('business', BUSINESS_RAW_COLUMNS)]:
+            if kind in frames:
+                tables[RAW_EXPORTS[kind]] = frames[kind][columns]
+        for node, name in AGGREGATE_EXPORTS.items():
+            if node in frames:
+                tables[name] = aggregate_table(frames[node])
+        prefix = os.path.splitext(os.path.basename(args.report))[0]
+        paths = write_tables(tables, args.output_dir, prefix, args.format)
+        print(f"\n{len(paths)} files written to: {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
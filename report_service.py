@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Report Service
+A small local HTTP service (asyncio, standard library only) that loads the
+campaign and business exports once, keeps them indexed in memory and serves
+populated reports for any date window, portfolio and set of sheets.
+
+Workbooks are built in a process pool, so concurrent requests do not block
+each other or the event loop; the finished xlsx is streamed from memory.
+Worker processes inherit the loaded data when the platform forks them and
+load it once at startup otherwise. A worker that dies (killed for memory on
+a large window) breaks the pool; the service replaces it, failing only the
+requests that were being built with 503.
+
+    python report_service.py --campaign campaign.csv --business business.csv --port 8765 [--rules brand_x.json]
+    curl -o jn.xlsx "http://127.0.0.1:8765/report?start=2025-01-01&end=2025-03-31&portfolio=JN&sheets=summary,segment"
+
+Endpoints:
+    GET /health   row counts, date span and portfolios of the loaded data
+    GET /report   xlsx; query parameters start, end (YYYY-MM-DD), portfolio
+                  (JN, Non-JN or a portfolio name; type:JN or name:JN when
+                  a portfolio is named like a type), sheets, skip_sheets,
+                  no_raw=1 and compact=1
+"""
+
+import io
+import os
+import sys
+import json
+import asyncio
+import argparse
+import contextlib
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from generate_report_from_data import (
+    load_campaign_data, load_business_data, build_report, resolve_sheets, parse_sheet_list, parse_date,
+    REPORT_SHEETS, CAMPAIGN_FILE, BUSINESS_FILE, BUSINESS_ONLY_SHEETS, LAST_YEAR_SHEETS, LAST_YEAR_COLUMNS,
+)
+from classification_rules import use_rules
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+HOST = '127.0.0.1'
+PORT = 8765
+STREAM_CHUNK_BYTES = 64 * 1024
+MAX_REQUEST_LINE = 8192
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               422: 'Unprocessable Entity', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# ============================================================================
+# INDEXED DATA
+# ============================================================================
+
+class SelectionError(LookupError):
+    """The requested window, portfolio and sheets select nothing that can be reported."""
+
+
+class ReportData:
+    """The loaded exports, sorted by date and indexed for window/portfolio selection."""
+
+    def __init__(self, campaign_df, business_df=None):
+        self.campaign = campaign_df.sort_values('Date', kind='stable').reset_index(drop=True)
+        self.campaign_dates = self.campaign['Date'].to_numpy()
+        self.business = None
+        if business_df is not None:
+            self.business = business_df.sort_values('Date', kind='stable').reset_index(drop=True)
+            self.business_dates = self.business['Date'].to_numpy()
+
+        # Row positions per portfolio type and per portfolio name (case-insensitive)
+        self.type_rows = self.row_index('Portfolio_Type')
+        self.name_rows = self.row_index('Portfolio name')
+
+    @classmethod
+    def load(cls, campaign_path, business_path=None):
+        campaign_df = load_campaign_data(campaign_path)
+        business_df = None
+        if business_path and os.path.exists(business_path):
+            business_df = load_business_data(business_path)
+        return cls(campaign_df, business_df)
+
+    def row_index(self, column):
+        """{lowercased value: sorted row positions} of a campaign column."""
+        keys = self.campaign[column].fillna('').astype(str).str.lower()
+        return keys.groupby(keys).indices
+
+    def portfolio_positions(self, portfolio):
+        """Row positions for 'type:<type>', 'name:<name>' or a bare value (type first, then name)."""
+        prefix, _, value = portfolio.partition(':')
+        indexes = {'type': [self.type_rows], 'name': [self.name_rows]}.get(prefix.strip().lower())
+        if indexes is None:
+            indexes, value = [self.type_rows, self.name_rows], portfolio
+        key = value.strip().lower()
+        for rows in indexes:
+            if key in rows:
+                return rows[key]
+        raise SelectionError(f"Unknown portfolio '{portfolio}'")
+
+    def portfolios(self):
+        return sorted(self.campaign['Portfolio name'].dropna().unique().tolist())
+
+    @staticmethod
+    def window(dates, start=None, end=None):
+        """slice of the date-sorted rows within [start, end]."""
+        first = np.searchsorted(dates, np.datetime64(start), 'left') if start else 0
+        last = np.searchsorted(dates, np.datetime64(end), 'right') if end else len(dates)
+        return slice(first, last)
+
+    def select(self, start=None, end=None, portfolio=None):
+        """(campaign_df, business_df) for a date window and optional portfolio.
+
+        The business report is account-wide, so it is left out (along with
+        the sheets that need it) when a portfolio is selected.
+        """
+        rows = self.window(self.campaign_dates, start, end)
+        campaign_df = self.campaign.iloc[rows]
+        if portfolio:
+            positions = self.portfolio_positions(portfolio)
+            positions = positions[(positions >= rows.start) & (positions < rows.stop)]
+            campaign_df = self.campaign.iloc[positions]
+
+        business_df = None
+        if self.business is not None and not portfolio:
+            business_df = self.business.iloc[self.window(self.business_dates, start, end)]
+        return campaign_df, business_df
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+_data = None
+
+
+def init_worker(campaign_path, business_path, rules_path=None):
+    """Process pool initializer: load the rules, and the exports unless inherited by fork."""
+    global _data
+    use_rules(rules_path)
+    if _data is None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            _data = ReportData.load(campaign_path, business_path)
+
+
+def build_report_bytes(start, end, portfolio, sheets, compact):
+    """Build one report from the worker's warm data and return the xlsx bytes."""
+    campaign_df, business_df = _data.select(start, end, portfolio)
+    if campaign_df.empty:
+        raise SelectionError("No campaign rows in the selected window")
+    has_last_year = set(LAST_YEAR_COLUMNS) <= set(campaign_df.columns)
+    if all((key in BUSINESS_ONLY_SHEETS and business_df is None) or (key in LAST_YEAR_SHEETS and not has_last_year)
+           for key in sheets):
+        raise SelectionError("None of the selected sheets can be built for this selection "
+                             "(portfolio reports have no business data)" if portfolio else
+                             "None of the selected sheets can be built from the loaded exports")
+    return build_report(campaign_df, business_df, sheets, compact=compact, workers=1)
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+class RequestError(Exception):
+    """A request that cannot be served; carries the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def report_params(query):
+    """Validate /report query parameters into build_report_bytes arguments."""
+    def one(name):
+        values = query.get(name)
+        return values[-1].strip() if values and values[-1].strip() else None
+
+    try:
+        start = parse_date(one('start')) if one('start') else None
+        end = parse_date(one('end')) if one('end') else None
+        sheets = parse_sheet_list(one('sheets')) if one('sheets') else None
+        skip = parse_sheet_list(one('skip_sheets')) if one('skip_sheets') else None
+    except argparse.ArgumentTypeError as e:
+        raise RequestError(400, str(e))
+    if start and end and start > end:
+        raise RequestError(400, "start must not be after end")
+
+    sheets = resolve_sheets(sheets, skip, include_raw=one('no_raw') not in ('1', 'true', 'yes'))
+    if not sheets:
+        raise RequestError(400, "no sheets left to build")
+    compact = one('compact') in ('1', 'true', 'yes')
+    return start, end, one('portfolio'), sheets, compact
+
+
+class ReportService:
+    """Routes requests to its process pool and streams the responses.
+
+    make_pool() creates the pool, and a fresh one whenever a worker dies.
+    """
+
+    def __init__(self, data, make_pool):
+        self.data = data
+        self.make_pool = make_pool
+        self.pool = make_pool()
+
+    def replace_pool(self, broken):
+        """Swap in a new pool for a broken one (once, however many requests saw it break)."""
+        if self.pool is broken:
+            print(f"[{datetime.now():%H:%M:%S}] Worker process died; starting a new pool", flush=True)
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self.make_pool()
+        return self.pool
+
+    async def build(self, params):
+        """xlsx bytes built in the pool; 503 if the worker building it dies."""
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            future = loop.run_in_executor(pool, build_report_bytes, *params)
+        except BrokenProcessPool:
+            # Broke while idle, before this request: it can run on a new pool
+            pool = self.replace_pool(pool)
+            future = loop.run_in_executor(pool, build_report_bytes, *params)
+        try:
+            return await future
+        except BrokenProcessPool:
+            self.replace_pool(pool)
+            raise RequestError(503, "The worker building this report died (out of memory?); try again")
+        except SelectionError as e:
+            # Unknown portfolio, empty window or no buildable sheets
+            raise RequestError(422, str(e))
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        try:
+            status, headers, body = await self.respond(reader)
+        except RequestError as e:
+            status, headers, body = self.json_response(e.status, {'error': str(e)})
+        except Exception as e:
+            status, headers, body = self.json_response(500, {'error': f"{type(e).__name__}: {e}"})
+
+        try:
+            head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", f"Content-Length: {len(body)}",
+                    "Connection: close"] + [f"{k}: {v}" for k, v in headers.items()]
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+            view = memoryview(body)
+            for offset in range(0, len(body), STREAM_CHUNK_BYTES):
+                writer.write(view[offset:offset + STREAM_CHUNK_BYTES])
+                await writer.drain()
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        try:
+            request_line = await reader.readuntil(b'\r\n')
+            while (await reader.readuntil(b'\r\n')) != b'\r\n':
+                pass  # Headers are not needed
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            raise RequestError(400, "malformed request")
+
+        parts = request_line.decode('latin-1').split()
+        if len(parts) != 3 or len(request_line) > MAX_REQUEST_LINE:
+            raise RequestError(400, "malformed request line")
+        method, target = parts[0], urlsplit(parts[1])
+        if method != 'GET':
+            raise RequestError(405, f"{method} not allowed")
+
+        if target.path == '/health':
+            return self.json_response(200, self.health())
+        if target.path != '/report':
+            raise RequestError(404, f"no such endpoint {target.path}")
+
+        params = report_params(parse_qs(target.query))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        content = await self.build(params)
+        print(f"[{datetime.now():%H:%M:%S}] GET {parts[1]} -> {len(content):,} bytes "
+              f"in {loop.time() - started:.2f}s", flush=True)
+
+        filename = f"Campaign_Report_{params[0]:%Y%m%d}-{params[1]:%Y%m%d}.xlsx" \
+            if params[0] and params[1] else "Campaign_Performance_Report.xlsx"
+        return 200, {'Content-Type': XLSX_CONTENT_TYPE,
+                     'Content-Disposition': f'attachment; filename="{filename}"'}, content
+
+    def health(self):
+        campaign = self.data.campaign
+        return {
+            'campaign_rows': len(campaign),
+            'business_rows': 0 if self.data.business is None else len(self.data.business),
+            'first_date': campaign['Date'].min().strftime('%Y-%m-%d'),
+            'last_date': campaign['Date'].max().strftime('%Y-%m-%d'),
+            'portfolio_types': sorted(campaign['Portfolio_Type'].unique().tolist()),
+            'portfolios': self.data.portfolios(),
+            'sheets': list(REPORT_SHEETS),
+        }
+
+    @staticmethod
+    def json_response(status, payload):
+        return status, {'Content-Type': 'application/json'}, json.dumps(payload).encode('utf-8')
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving reports on http://{address[0]}:{address[1]}/report (Ctrl+C to stop)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    global _data
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Serve populated campaign reports over local HTTP.")
+    parser.add_argument('--campaign', default=os.path.join(script_dir, CAMPAIGN_FILE), help="Campaign report CSV")
+    parser.add_argument('--business', default=os.path.join(script_dir, BUSINESS_FILE), help="Business report CSV")
+    parser.add_argument('--host', default=HOST, help=f"Interface to listen on (default: {HOST})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"Port (default: {PORT}; 0 picks a free port)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes building workbooks (default: number of CPUs)")
+    parser.add_argument('--rules', metavar='PATH',
+                        help="Segment/portfolio classification rules (default: classification_rules.json "
+                             "next to this script)")
+    args = parser.parse_args(argv)
+
+    try:
+        use_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(f"classification rules: {e}")
+
+    # Loaded before the pool starts so forked workers inherit the warm data
+    _data = ReportData.load(args.campaign, args.business)
+    service = ReportService(_data, lambda: ProcessPoolExecutor(
+        max_workers=args.workers, initializer=init_worker, initargs=(args.campaign, args.business, args.rules)))
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped.")
+    finally:
+        service.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
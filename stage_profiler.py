@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Stage Profiler
+Per-stage wall time, CPU time, rows processed and rows/sec for a report run.
+Instrumentation is a no-op until a StageProfiler is activated, so the
+stage() blocks and @profiled functions cost nothing in normal runs.
+
+Optionally every top-level stage is also run under cProfile (or
+pyinstrument, when installed and an .html dump is requested) and the dump
+for the slowest stage is written out.
+
+With track_memory, each stage also records its peak traced Python/numpy
+memory (tracemalloc) and peak resident set size. A sampler thread reads
+both every SAMPLE_SECONDS and charges each interval's peak to every stage
+open at the time, so nested and concurrent stages all see process-wide
+peaks. tracemalloc slows allocation-heavy Python code noticeably.
+"""
+
+import os
+import csv
+import json
+import time
+import threading
+import functools
+import contextlib
+import tracemalloc
+
+_active = None
+_local = threading.local()
+
+STAGE_FIELDS = ['stage', 'depth', 'start_seconds', 'wall_seconds', 'cpu_seconds', 'rows', 'rows_per_second',
+                'peak_traced_mb', 'peak_rss_mb']
+SAMPLE_SECONDS = 0.01
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where it cannot be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageProfiler:
+    """Collects stage records; use activate() around the run being measured."""
+
+    def __init__(self, dump_path=None, track_memory=False):
+        self.records = []
+        self.dump_path = dump_path
+        self.dumps = {}
+        self.started = None
+        self.total_seconds = 0.0
+        self.track_memory = track_memory
+        self.open_records = {}
+        self.peak_traced = 0
+        self.peak_rss = 0
+        self._memory_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self):
+        global _active
+        previous, _active = _active, self
+        self.started = time.perf_counter()
+        sampler = self._start_sampler() if self.track_memory else None
+        try:
+            yield self
+        finally:
+            self.total_seconds = time.perf_counter() - self.started
+            if sampler:
+                sampler()
+            _active = previous
+
+    def _start_sampler(self):
+        """Start tracemalloc and the sampler thread; return a callable that stops both."""
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        done = threading.Event()
+
+        def run():
+            while not done.wait(SAMPLE_SECONDS):
+                self.sample_memory()
+
+        thread = threading.Thread(target=run, name='memory-sampler', daemon=True)
+        thread.start()
+
+        def stop():
+            done.set()
+            thread.join()
+            self.sample_memory()
+            if started_tracing:
+                tracemalloc.stop()
+        return stop
+
+    def sample_memory(self):
+        """Charge the traced peak since the last sample and the current RSS to all open stages."""
+        with self._memory_lock:
+            traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            rss = current_rss() or 0
+            self.peak_traced = max(self.peak_traced, traced)
+            self.peak_rss = max(self.peak_rss, rss)
+            for record in self.open_records.values():
+                record['_peak_traced'] = max(record['_peak_traced'], traced)
+                record['_peak_rss'] = max(record['_peak_rss'], rss)
+
+    def open_stage(self, record):
+        self.sample_memory()
+        with self._memory_lock:
+            record['_peak_traced'] = tracemalloc.get_traced_memory()[0]
+            record['_peak_rss'] = current_rss() or 0
+            self.open_records[id(record)] = record
+
+    def close_stage(self, record):
+        self.sample_memory()
+        with self._memory_lock:
+            del self.open_records[id(record)]
+        record['peak_traced_mb'] = round(record.pop('_peak_traced') / MB, 1)
+        rss = record.pop('_peak_rss')
+        record['peak_rss_mb'] = round(rss / MB, 1) if rss else None
+
+    def add(self, record, dump=None):
+        self.records.append(record)
+        if dump is not None:
+            self.dumps[len(self.records) - 1] = dump
+
+    def largest(self, depth=0):
+        """The record with the highest peak traced memory at the given nesting depth."""
+        candidates = [r for r in self.records if r['depth'] == depth and r['peak_traced_mb'] is not None]
+        return max(candidates, key=lambda r: r['peak_traced_mb']) if candidates else None
+
+    def slowest(self, depth=0):
+        """The record with the largest wall time at the given nesting depth."""
+        candidates = [r for r in self.records if r['depth'] == depth]
+        return max(candidates, key=lambda r: r['wall_seconds']) if candidates else None
+
+    def ordered(self):
+        return sorted(self.records, key=lambda r: r['start_seconds'])
+
+    def write(self, path):
+        """Write the records as JSON or CSV (chosen by file extension)."""
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=STAGE_FIELDS)
+                writer.writeheader()
+                for record in self.ordered():
+                    writer.writerow({k: record[k] for k in STAGE_FIELDS})
+        else:
+            summary = {'total_seconds': self.total_seconds}
+            if self.track_memory:
+                summary['peak_traced_mb'] = round(self.peak_traced / MB, 1)
+                summary['peak_rss_mb'] = round(self.peak_rss / MB, 1) if self.peak_rss else None
+            summary['stages'] = [{k: r[k] for k in STAGE_FIELDS} for r in self.ordered()]
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(summary, f, indent=2)
+
+    def write_slowest_dump(self):
+        """Write the profiler dump of the slowest top-level stage; return (stage, path)."""
+        if not self.dump_path or not self.dumps:
+            return None
+        index = max(self.dumps, key=lambda i: self.records[i]['wall_seconds'])
+        dump = self.dumps[index]
+        if self.dump_path.lower().endswith('.html'):
+            with open(self.dump_path, 'w', encoding='utf-8') as f:
+                f.write(dump.output_html())
+        else:
+            dump.dump_stats(self.dump_path)
+        return self.records[index]['stage'], self.dump_path
+
+    def print_summary(self, limit=15):
+        print("\nStage profile:")
+        header = f"  {'Stage':<44} {'Wall s':>8} {'CPU s':>8} {'Rows':>10} {'Rows/s':>12}"
+        if self.track_memory:
+            header += f" {'Peak MB':>9} {'RSS MB':>9}"
+        print(header)
+        records = self.ordered()
+        for record in records[:limit] if limit else records:
+            rows = f"{record['rows']:,}" if record['rows'] is not None else ''
+            rate = f"{record['rows_per_second']:,.0f}" if record['rows_per_second'] else ''
+            name = '  ' * record['depth'] + record['stage']
+            line = f"  {name:<44} {record['wall_seconds']:8.3f} {record['cpu_seconds']:8.3f} {rows:>10} {rate:>12}"
+            if self.track_memory:
+                rss = f"{record['peak_rss_mb']:,.1f}" if record['peak_rss_mb'] is not None else ''
+                line += f" {record['peak_traced_mb']:9,.1f} {rss:>9}"
+            print(line)
+        if limit and len(self.records) > limit:
+            print(f"  ... {len(self.records) - limit} more stages in the profile file")
+        slowest = self.slowest()
+        if slowest:
+            print(f"  Slowest stage: {slowest['stage']} ({slowest['wall_seconds']:.3f}s)")
+        largest = self.largest()
+        if largest:
+            print(f"  Largest stage: {largest['stage']} ({largest['peak_traced_mb']:,.1f} MB traced peak)")
+        print(f"  Total: {self.total_seconds:.3f}s")
+        if self.track_memory:
+            rss = f", {self.peak_rss / MB:,.1f} MB peak RSS" if self.peak_rss else ''
+            print(f"  Peak memory: {self.peak_traced / MB:,.1f} MB traced{rss}")
+
+
+def _stage_dumper(path):
+    """Start a profiler for one stage and return a stop() callable giving its dump."""
+    if path.lower().endswith('.html'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise SystemExit("HTML profile dumps require pyinstrument (pip install pyinstrument)")
+        profiler = Profiler()
+        profiler.start()
+        return lambda: (profiler.stop(), profiler)[1]
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        return pstats.Stats(profiler)
+    return stop
+
+
+@contextlib.contextmanager
+def stage(name, rows=None):
+    """Time a block as one stage. Yields a dict; set ['rows'] if known only afterwards."""
+    profiler = _active
+    if profiler is None:
+        yield {}
+        return
+
+    depth = getattr(_local, 'depth', 0)
+    record = {'stage': name, 'depth': depth, 'rows': rows,
+              'start_seconds': time.perf_counter() - profiler.started,
+              'peak_traced_mb': None, 'peak_rss_mb': None}
+    # Only one Python profiler can run at a time, so dumps cover top-level stages
+    stop_dump = _stage_dumper(profiler.dump_path) if profiler.dump_path and depth == 0 else None
+
+    if profiler.track_memory:
+        profiler.open_stage(record)
+    _local.depth = depth + 1
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    finally:
+        record['wall_seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds'] = time.thread_time() - cpu_start
+        _local.depth = depth
+        if profiler.track_memory:
+            profiler.close_stage(record)
+        dump = stop_dump() if stop_dump else None
+        rows = record['rows']
+        record['rows_per_second'] = rows / record['wall_seconds'] if rows and record['wall_seconds'] > 0 else None
+        profiler.add(record, dump)
+
+
+def input_rows(args):
+    """Row count of the first DataFrame-like positional argument, if any."""
+    for arg in args:
+        if hasattr(arg, 'columns') and hasattr(arg, '__len__'):
+            return len(arg)
+    return None
+
+
+def profiled(name=None):
+    """Decorator recording each call of a function as a stage."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return func(*args, **kwargs)
+            with stage(name or func.__name__, rows=input_rows(args)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
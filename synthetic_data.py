@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Synthetic Export Generator
+Writes deterministic campaign and business report CSVs in the same layout as
+the Amazon exports (exact headers, "$1,234.56" amounts, "Sep 01, 2024" /
+"9/1/24" dates), for benchmarks and for trying the reports without real data.
+
+The same rows, seed and start date always produce byte-identical files.
+Campaign and portfolio names cover every classification rule: "branded",
+the " pat " / "- pat -" / "_pat_" competitor patterns, non-branded names,
+and JN / Non-JN portfolios (including blank portfolios).
+"""
+
+import os
+import argparse
+import numpy as np
+import pandas as pd
+from generate_excel_report import CAMPAIGN_HEADERS, BUSINESS_HEADERS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SEED = 2024
+START_DATE = '2024-09-01'
+REPORT_DAYS = 517  # Sep 1, 2024 - Jan 30, 2026, the span of the sample exports
+CHUNK_ROWS = 250000
+
+# Portfolio names: JN matches case-insensitively anywhere in the name; ''
+# is written as an empty cell like unassigned campaigns in the export
+PORTFOLIOS = [
+    'JN Vitamins', 'JN Supplements', 'Jn Protein & Fitness', 'Sports Nutrition - JN',
+    'Piping Rock Essentials', 'Herbal Extracts', 'Beauty & Personal Care', '',
+]
+
+# Campaign name patterns with the segment each one must classify as
+CAMPAIGN_PATTERNS = [
+    ('SP - Branded - Exact', 'Branded'),
+    ('SB - Brand Defense - BRANDED', 'Branded'),
+    ('SP - pat - Comp', 'Competitor'),
+    ('SP - Competitor ASIN pat Targets', 'Competitor'),
+    ('SD_pat_Views', 'Competitor'),
+    ('SP - Generic - Broad', 'Non-Branded'),
+    ('SP - Auto - Close Match', 'Non-Branded'),
+    ('SB - Category - Patterns', 'Non-Branded'),
+]
+
+PROGRAM_TYPES = ['SP', 'SB', 'SD']
+TARGETING_TYPES = ['Manual', 'Auto']
+BIDDING_STRATEGIES = ['Fixed', 'Dynamic bids - down only', 'Dynamic bids - up and down']
+BUDGETS = np.array([25, 50, 75, 100, 150, 250])
+
+# ============================================================================
+# FORMATTING
+# ============================================================================
+
+def money(values, decimals=2):
+    """Format amounts like the export: $1,234.56."""
+    return [f"${v:,.{decimals}f}" for v in values.tolist()]
+
+def count(values):
+    """Format counts with thousands separators: 1,234."""
+    return [f"{v:,}" for v in values.tolist()]
+
+def percent(values):
+    """Format fractions as percentages: 0.0123 -> 1.23%."""
+    return [f"{v:.2%}" for v in values.tolist()]
+
+def campaign_date_labels(dates):
+    """'Sep 01, 2024' labels for a DatetimeIndex."""
+    return dates.strftime('%b %d, %Y')
+
+def business_date_labels(dates):
+    """'9/1/24' labels (no zero padding) for a DatetimeIndex."""
+    return [f"{d.month}/{d.day}/{d.year % 100:02d}" for d in dates]
+
+# ============================================================================
+# CAMPAIGN EXPORT
+# ============================================================================
+
+def campaign_layout(rows, days=REPORT_DAYS):
+    """Number of days and campaigns per day for a campaign export of `rows` rows.
+
+    Like the real export there is one row per campaign per day; larger
+    exports get more campaigns rather than a longer date span.
+    """
+    days = max(1, min(days, rows))
+    return days, -(-rows // days)
+
+def campaign_names(campaigns):
+    """Portfolio and campaign names for campaign ids 0..campaigns-1."""
+    ids = np.arange(campaigns)
+    portfolios = np.array(PORTFOLIOS, dtype=object)[ids % len(PORTFOLIOS)]
+    # Step through the patterns at a different rate than the portfolios so
+    # every portfolio gets every segment
+    patterns = np.array([p for p, _ in CAMPAIGN_PATTERNS], dtype=object)
+    names = patterns[(ids // len(PORTFOLIOS) + ids) % len(patterns)]
+    names = names + pd.Series(ids).map(' {:04d}'.format).to_numpy(dtype=object)
+    return portfolios, names
+
+def campaign_chunk(first_row, rows, campaigns, start, seed):
+    """Campaign export rows first_row..first_row+rows-1 as a DataFrame of strings."""
+    rng = np.random.default_rng([seed, first_row])
+    row_ids = np.arange(first_row, first_row + rows)
+    campaign_ids = row_ids % campaigns
+    dates = pd.Timestamp(start) + pd.to_timedelta(row_ids // campaigns, unit='D')
+    portfolios, names = campaign_names(campaigns)
+
+    # Per-campaign characteristics, fixed across days
+    profile = np.random.default_rng([seed, campaigns])
+    reach = profile.lognormal(6.5, 1.2, campaigns)
+    base_ctr = profile.uniform(0.002, 0.02, campaigns)
+    base_cpc = profile.uniform(0.35, 2.5, campaigns)
+    base_cvr = profile.uniform(0.03, 0.25, campaigns)
+    order_value = profile.uniform(12, 60, campaigns)
+    budget = BUDGETS[profile.integers(0, len(BUDGETS), campaigns)]
+
+    impressions = rng.poisson(reach[campaign_ids])
+    clicks = rng.binomial(impressions, base_ctr[campaign_ids])
+    cpc = np.round(base_cpc[campaign_ids] * rng.uniform(0.8, 1.2, rows), 2)
+    spend = np.round(clicks * cpc, 2)
+    orders = rng.binomial(clicks, base_cvr[campaign_ids])
+    sales = np.round(orders * order_value[campaign_ids] * rng.uniform(0.9, 1.1, rows), 2)
+
+    ly_impressions = rng.poisson(reach[campaign_ids] * 0.8)
+    ly_clicks = rng.binomial(ly_impressions, base_ctr[campaign_ids])
+    ly_cpc = np.round(base_cpc[campaign_ids] * rng.uniform(0.7, 1.1, rows), 2)
+    ly_spend = np.round(ly_clicks * ly_cpc, 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ctr = np.where(impressions > 0, clicks / impressions, 0.0)
+        acos = np.where(sales > 0, spend / sales, 0.0)
+        roas = np.where(spend > 0, sales / spend, 0.0)
+
+    def pick(options, salt):
+        return np.array(options, dtype=object)[(campaign_ids + salt) % len(options)]
+
+    columns = [
+        campaign_date_labels(dates), portfolios[campaign_ids], pick(PROGRAM_TYPES, 0),
+        names[campaign_ids], 'Amazon', 'US', np.where(rng.random(rows) < 0.95, 'Enabled', 'Paused'),
+        'USD', money(budget[campaign_ids], 0), pick(TARGETING_TYPES, 1), pick(BIDDING_STRATEGIES, 2),
+        count(impressions), count(ly_impressions), count(clicks), count(ly_clicks), percent(ctr),
+        money(spend), money(ly_spend), money(cpc), money(ly_cpc), count(orders), percent(acos),
+        [f"{v:.2f}" for v in roas.tolist()], money(sales),
+    ]
+    return pd.DataFrame(dict(zip(CAMPAIGN_HEADERS, columns)))
+
+def write_campaign_csv(path, rows, seed=SEED, start=START_DATE, chunk_rows=CHUNK_ROWS):
+    """Write a synthetic campaign export of `rows` rows to path, in chunks."""
+    days, campaigns = campaign_layout(rows)
+    print(f"Writing {rows:,} campaign rows ({campaigns:,} campaigns x {days:,} days) to {path}...")
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        for first_row in range(0, rows, chunk_rows):
+            chunk = campaign_chunk(first_row, min(chunk_rows, rows - first_row), campaigns, start, seed)
+            chunk.to_csv(f, index=False, header=first_row == 0)
+    return path
+
+# ============================================================================
+# BUSINESS REPORT
+# ============================================================================
+
+def business_frame(days=REPORT_DAYS, seed=SEED, start=START_DATE):
+    """One business report row per day as a DataFrame of strings."""
+    rng = np.random.default_rng([seed, days, 1])
+    dates = pd.date_range(start, periods=days, freq='D')
+    weekly = 1 + 0.08 * np.sin(2 * np.pi * np.arange(days) / 7)
+
+    sessions = rng.poisson(12500 * weekly)
+    sessions_b2b = rng.poisson(200, days)
+    order_items = rng.binomial(sessions, 0.42)
+    order_items_b2b = rng.binomial(sessions_b2b, 0.5)
+    units = order_items + rng.poisson(order_items * 0.18)
+    units_b2b = order_items_b2b + rng.poisson(order_items_b2b * 0.3)
+    price = rng.uniform(10.5, 12.0, days)
+    price_b2b = rng.uniform(9.5, 11.0, days)
+    sales = np.round(units * price, 2)
+    sales_b2b = np.round(units_b2b * price_b2b, 2)
+
+    def per(numerator, denominator):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), 0.0)
+
+    columns = [
+        business_date_labels(dates), money(sales), money(sales_b2b), count(units), count(units_b2b),
+        count(order_items), count(order_items_b2b), money(per(sales, order_items)),
+        money(per(sales_b2b, order_items_b2b)), [f"{v:.2f}" for v in per(units, order_items).tolist()],
+        [f"{v:.2f}" for v in per(units_b2b, order_items_b2b).tolist()], money(per(sales, units)),
+        money(per(sales_b2b, units_b2b)), count(sessions), count(sessions_b2b),
+        percent(per(order_items, sessions)), percent(per(order_items_b2b, sessions_b2b)),
+        count(rng.integers(440, 480, days)),
+    ]
+    return pd.DataFrame(dict(zip(BUSINESS_HEADERS, columns)))
+
+def write_business_csv(path, days=REPORT_DAYS, seed=SEED, start=START_DATE):
+    """Write a synthetic business report covering `days` days to path."""
+    print(f"Writing {days:,} business report days to {path}...")
+    business_frame(days, seed, start).to_csv(path, index=False, encoding='utf-8-sig')
+    return path
+
+def write_exports(directory, rows, seed=SEED, start=START_DATE, reuse=True):
+    """Write a matching campaign/business export pair into directory; return their paths.
+
+    With reuse, files already generated for the same rows and seed are kept.
+    """
+    os.makedirs(directory, exist_ok=True)
+    days, _ = campaign_layout(rows)
+    campaign_path = os.path.join(directory, f"campaign_{rows}_seed{seed}.csv")
+    business_path = os.path.join(directory, f"business_{days}d_seed{seed}.csv")
+    if not (reuse and os.path.exists(campaign_path)):
+        write_campaign_csv(campaign_path + '.tmp', rows, seed, start)
+        os.replace(campaign_path + '.tmp', campaign_path)
+    if not (reuse and os.path.exists(business_path)):
+        write_business_csv(business_path, days, seed, start)
+    return campaign_path, business_path
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def parse_row_count(value):
+    """argparse type for row counts such as 10000, 10k or 1m."""
+    text = value.strip().lower().replace(',', '').replace('_', '')
+    scale = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    try:
+        rows = int(float(text[:-1] if scale > 1 else text) * scale)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid row count '{value}'")
+    if rows < 1:
+        raise argparse.ArgumentTypeError("row count must be at least 1")
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic campaign and business exports.")
+    parser.add_argument('--rows', type=parse_row_count, default=10000, help="Campaign rows, e.g. 10000, 100k, 1m")
+    parser.add_argument('--campaign', default='synthetic_campaign.csv', help="Campaign export path")
+    parser.add_argument('--business', default='synthetic_business.csv', help="Business report path")
+    parser.add_argument('--seed', type=int, default=SEED, help=f"Random seed (default: {SEED})")
+    parser.add_argument('--start', default=START_DATE, help=f"First date (default: {START_DATE})")
+    args = parser.parse_args(argv)
+
+    days, _ = campaign_layout(args.rows)
+    write_campaign_csv(args.campaign, args.rows, args.seed, args.start)
+    write_business_csv(args.business, days, args.seed, args.start)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Shared fixtures: the scripts live in the repository root, next to this folder."""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic_data import write_exports
+
+SYNTHETIC_ROWS = 3000
+
+
+@pytest.fixture(scope='session')
+def exports(tmp_path_factory):
+    """(campaign path, business path) of a small deterministic synthetic export pair."""
+    return write_exports(str(tmp_path_factory.mktemp('exports')), SYNTHETIC_ROWS)
@@ -0,0 +1,83 @@
+"""Per-job classification rules in batch manifests."""
+
+import json
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import batch_generate
+from batch_generate import load_manifest, run_job
+from classification_rules import get_classifier, use_rules
+
+
+def test_jobs_use_their_own_rules_file(exports, tmp_path):
+    (tmp_path / 'all_other.json').write_text(json.dumps({'portfolio': {'rules': [], 'default': 'Non-JN'}}))
+    (tmp_path / 'broken.json').write_text(json.dumps({'portfolio': {'rules': [{'pattern': '(?i)jn', 'label': 'JN'}]}}))
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'jobs': [
+        {'account': 'other', 'campaign': exports[0], 'output': 'out/other.xlsx', 'rules': 'all_other.json'},
+        {'account': 'broken', 'campaign': exports[0], 'output': 'out/broken.xlsx', 'rules': 'broken.json'},
+        {'account': 'default', 'campaign': exports[0], 'output': 'out/default.xlsx'},
+    ]}))
+
+    jobs = load_manifest(str(manifest))
+    assert jobs[0]['rules'] == os.path.join(str(tmp_path), 'all_other.json')
+    assert jobs[2]['rules'] is None
+    try:
+        result = run_job(jobs[0])
+        assert result['status'] == 'ok', result['error']
+        assert get_classifier('portfolio')('JN Vitamins') == 'Non-JN'
+
+        result = run_job(jobs[1])
+        assert result['status'] == 'failed' and result['error'].startswith('ValueError')
+
+        result = run_job(jobs[2])  # Reused worker: back to the default rules
+        assert result['status'] == 'ok', result['error']
+        assert get_classifier('portfolio')('JN Vitamins') == 'JN'
+    finally:
+        use_rules()
+
+
+def fake_run_job(job):
+    """Quick stand-in for run_job; the account 'crash' kills its worker process."""
+    if job['account'] == 'crash':
+        os._exit(1)
+    time.sleep(0.05)
+    return {'account': job['account'], 'output': job['output'], 'status': 'ok', 'error': None,
+            'seconds': 0.05, 'log': ''}
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="workers must inherit the patched run_job")
+@pytest.mark.parametrize('workers', [1, 3])
+def test_crashed_worker_fails_only_its_own_job(monkeypatch, workers):
+    monkeypatch.setattr(batch_generate, 'run_job', fake_run_job)
+    accounts = ['a', 'b', 'crash', 'c', 'd', 'e']
+    jobs = [{'account': account, 'output': f'{account}.xlsx'} for account in accounts]
+
+    results = batch_generate.run_batch(jobs, workers)
+
+    assert [r['account'] for r in results] == accounts
+    assert {r['account']: r['status'] for r in results} == {
+        'a': 'ok', 'b': 'ok', 'crash': 'failed', 'c': 'ok', 'd': 'ok', 'e': 'ok'}
+    assert 'BrokenProcessPool' in results[2]['error']
+
+
+def test_main_prints_summary_and_writes_json(exports, tmp_path, capsys):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text("account,campaign,business,output\n"
+                        f"good,{exports[0]},{exports[1]},out/good.xlsx\n"
+                        "missing,missing.csv,,out/missing.xlsx\n")
+    summary_path = tmp_path / 'summary.json'
+
+    assert batch_generate.main([str(manifest), '--jobs', '2', '--summary-json', str(summary_path)]) == 1
+
+    out = capsys.readouterr().out
+    assert "Jobs: 2  Succeeded: 1  Failed: 1" in out
+    assert "- missing: FileNotFoundError" in out
+    summary = json.loads(summary_path.read_text())
+    assert [job['status'] for job in summary['jobs']] == ['ok', 'failed']
+    assert summary['wall_seconds'] > 0
+    assert (tmp_path / 'out' / 'good.xlsx').exists()
@@ -0,0 +1,29 @@
+"""Engine parity as checked by benchmarks.py --parity."""
+
+import contextlib
+import io
+
+import pytest
+
+from benchmarks import PARITY_NODES, check_parity, parity_mismatches
+from generate_report_from_data import build_report_graph
+
+pytest.importorskip('polars')
+
+
+def test_polars_engine_matches_pandas(tmp_path):
+    assert check_parity(3000, data_dir=str(tmp_path)) == []
+
+
+def test_missing_columns_are_mismatches(exports):
+    values = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for engine in ['pandas', 'polars']:
+            graph = build_report_graph(*exports, engine=engine)
+            graph.compute(PARITY_NODES)
+            values[engine] = dict(graph.values)
+    values['polars']['yoy'] = values['polars']['yoy'].drop(columns='LY_CPC')
+    values['pandas']['weekly'] = values['pandas']['weekly'].drop(columns='CTR')
+
+    assert parity_mismatches(values['pandas'], values['polars']) == \
+        ['weekly: missing CTR (pandas)', 'yoy: missing LY_CPC (polars)']
@@ -0,0 +1,25 @@
+"""build_report on loaded frames."""
+
+import io
+
+import pytest
+from openpyxl import load_workbook
+
+from generate_report_from_data import build_report, load_business_data, load_campaign_data
+
+
+@pytest.fixture(scope='module')
+def frames(exports):
+    return load_campaign_data(exports[0]), load_business_data(exports[1])
+
+
+def test_raw_campaign_sheet_from_loaded_frames(frames):
+    xlsx = build_report(*frames, sheets=['summary', 'campaign-data'])
+    wb = load_workbook(io.BytesIO(xlsx), read_only=True)
+    assert len(wb.sheetnames) == 2
+
+
+@pytest.mark.parametrize('column', ['Campaign Name', 'Portfolio name', 'Segment'])
+def test_frame_missing_a_column_is_rejected(frames, column):
+    with pytest.raises(ValueError, match=column):
+        build_report(frames[0].drop(columns=column), frames[1], sheets=['campaign-data'])
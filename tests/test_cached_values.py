@@ -0,0 +1,194 @@
+"""Cached formula values of the hydrated template (hydrate_template(cached_values=True)).
+
+Every formula cell's stored <v> must equal the formula evaluated over the
+data rows saved in the same file, and every SUMIFS cell must equal a sum
+computed with pandas straight from the CSV exports.
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.utils.datetime import to_excel
+
+from formula_values import WorkbookEvaluator, parse_formula
+from generate_excel_report import DATA_START_ROW
+from generate_report_from_data import hydrate_template
+
+NAME_RANGE = re.compile(r"^'([^']+)'!\$([A-Z]+)\$\d+:")
+
+# Template range name -> column of the frames built by export_frames()
+CAMPAIGN_NAMES = {
+    'Ad_Date': 'Serial', 'Ad_Spend': 'Spend', 'Ad_Sales': 'Sales', 'Ad_Orders': 'Orders',
+    'Ad_Clicks': 'Clicks', 'Ad_Impressions': 'Impressions', 'Ad_Portfolio_Type': 'Portfolio_Type',
+    'Ad_Segment': 'Segment', 'Ad_Week': 'Week', 'Ad_Month': 'Month',
+}
+BUSINESS_NAMES = {
+    'Biz_Date': 'Serial', 'Biz_Total_Sales': 'Total_Sales', 'Biz_Units': 'Units',
+    'Biz_Sessions': 'Sessions', 'Biz_Week': 'Week', 'Biz_Month': 'Month',
+}
+NAMES = {**CAMPAIGN_NAMES, **BUSINESS_NAMES}
+
+
+def money(values):
+    return pd.to_numeric(values.astype(str).str.replace(r'[$,]', '', regex=True), errors='coerce').fillna(0.0)
+
+
+def parsed_export(df, metrics):
+    """Metric, Excel date serial, week and month columns of an export read as text."""
+    dates = pd.to_datetime(df['Date'], format='mixed')
+    frame = pd.DataFrame({name: money(df[source]) for name, source in metrics.items()})
+    frame['Serial'] = (dates - pd.Timestamp('1899-12-30')).dt.days.astype(float)
+    frame['Week'] = dates.dt.strftime('%Y-W%U')
+    frame['Month'] = dates.dt.strftime('%b %Y')
+    return frame
+
+
+def export_frames(campaign_path, business_path):
+    """The exports parsed with plain pandas, without the report's loaders."""
+    campaign = pd.read_csv(campaign_path, encoding='utf-8-sig', dtype=str)
+    business = pd.read_csv(business_path, encoding='utf-8-sig', dtype=str)
+    ad = parsed_export(campaign, {'Spend': 'Spend', 'Sales': '7 Day Total Sales ', 'Orders': '7 Day Total Orders (#)',
+                                  'Clicks': 'Clicks', 'Impressions': 'Impressions'})
+    biz = parsed_export(business, {'Total_Sales': 'Ordered Product Sales', 'Units': 'Units Ordered',
+                                   'Sessions': 'Sessions - Total'})
+
+    # The default classification rules, written out independently
+    name = campaign['Campaign Name'].fillna('').str.lower()
+    ad['Segment'] = np.select([name.str.contains('branded'), name.str.contains(r' pat |- pat -|_pat_')],
+                              ['Branded', 'Competitor'], 'Non-Branded')
+    portfolio = campaign['Portfolio name'].fillna('').str.lower()
+    ad['Portfolio_Type'] = np.where(portfolio.str.contains('jn'), 'JN', 'Non-JN')
+    return ad, biz
+
+
+def saved_names(wb):
+    """{range name: array} read back from the data sheets stored in the workbook."""
+    columns = {}
+    for name, defined in wb.defined_names.items():
+        sheet, column = NAME_RANGE.match(defined.attr_text).groups()
+        columns[name] = (sheet, column)
+
+    names = {}
+    for sheet in {sheet for sheet, _ in columns.values()}:
+        ws = wb[sheet]
+        rows = [row for row in ws.iter_rows(min_row=DATA_START_ROW, values_only=True) if row[0] is not None]
+        for name, (name_sheet, column) in columns.items():
+            if name_sheet != sheet:
+                continue
+            index = ws[f'{column}1'].column - 1
+            values = [float(to_excel(row[index])) if isinstance(row[index], datetime) else row[index] for row in rows]
+            names[name] = np.array(values, dtype=object)
+    for name, values in names.items():
+        if all(isinstance(v, (int, float)) for v in values):
+            names[name] = values.astype(float)
+    return names
+
+
+def split_args(text):
+    """Top-level comma-separated arguments of a function call's argument text."""
+    args, depth, quoted, current = [], 0, False, ''
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            args.append(current)
+            current = ''
+            continue
+        current += char
+    return args + [current]
+
+
+def pandas_mask(column, criterion):
+    """Independent SUMIFS criterion test on a pandas column."""
+    if isinstance(criterion, str):
+        op, operand = re.match(r'^(<=|>=|<>|<|>|=)?(.*)$', criterion).groups()
+        op = op or '='
+        try:
+            operand = float(operand)
+        except ValueError:
+            pass
+    else:
+        op, operand = '=', float(criterion)
+    if operand == '*':
+        return column.astype(str).str.len() > 0
+    if isinstance(operand, str):
+        matched = column.astype(str).str.lower() == operand.lower()
+        return ~matched if op == '<>' else matched
+    numeric = pd.to_numeric(column, errors='coerce')
+    return {'=': numeric == operand, '<>': numeric != operand, '<': numeric < operand,
+            '>': numeric > operand, '<=': numeric <= operand, '>=': numeric >= operand}[op]
+
+
+def pandas_sumifs(formula, sheet, evaluator, frames):
+    """Value of a top-level SUMIFS formula summed with pandas; criteria expressions use the evaluator."""
+    args = split_args(formula[len('=SUMIFS('):-1])
+    frame = frames[args[0][:3]]
+    mask = pd.Series(True, index=frame.index)
+    for range_name, expression in zip(args[1::2], args[2::2]):
+        criterion = evaluator.evaluate(parse_formula('=' + expression), sheet)
+        mask &= pandas_mask(frame[NAMES[range_name]], criterion)
+    return float(frame.loc[mask, NAMES[args[0]]].sum())
+
+
+@pytest.fixture(scope='module')
+def hydrated(exports, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('hydrated') / 'template.xlsx')
+    hydrate_template(*exports, path, cached_values=True)
+    return path
+
+
+def formula_cells(wb):
+    return [(ws.title, cell.coordinate, cell.value) for ws in wb.worksheets for row in ws.iter_rows()
+            for cell in row if isinstance(cell.value, str) and cell.value.startswith('=')]
+
+
+def test_every_formula_has_its_evaluated_value_cached(hydrated):
+    wb = load_workbook(hydrated)
+    stored = load_workbook(hydrated, data_only=True)
+    # COUNTA over the data sheets counts their filled rows
+    row_counts = {sheet: sum(1 for row in wb[sheet].iter_rows(min_row=DATA_START_ROW, max_col=1, values_only=True)
+                             if row[0] is not None)
+                  for sheet in ['Campaign Data', 'Business Data', 'Agg']}
+    evaluator = WorkbookEvaluator(wb, saved_names(wb), row_counts)
+
+    cells = formula_cells(wb)
+    assert len(cells) > 100
+    for sheet, ref, formula in cells:
+        cached = stored[sheet][ref].value
+        assert cached is not None, f"{sheet}!{ref} {formula} has no cached value"
+        expected = evaluator.cell_value(sheet, ref)
+        if isinstance(cached, datetime):
+            cached = float(to_excel(cached))
+        if isinstance(expected, str):
+            assert cached == expected, f"{sheet}!{ref} {formula}"
+        else:
+            assert cached == pytest.approx(float(expected), rel=1e-9, abs=1e-9), f"{sheet}!{ref} {formula}"
+
+
+@pytest.mark.parametrize('window', [None, ('2024-10-15', '2024-12-31')])
+def test_sumifs_cells_match_pandas_sums(hydrated, exports, window):
+    wb = load_workbook(hydrated)
+    if window:
+        wb['Settings']['B6'].value = datetime.fromisoformat(window[0])
+        wb['Settings']['B7'].value = datetime.fromisoformat(window[1])
+    ad, biz = export_frames(*exports)
+    evaluator = WorkbookEvaluator(wb, saved_names(wb))
+
+    checked = 0
+    for sheet, ref, formula in formula_cells(wb):
+        if not (formula.startswith('=SUMIFS(') and formula.endswith(')') and formula.count('SUMIFS(') == 1):
+            continue
+        expected = pandas_sumifs(formula, sheet, evaluator, {'Ad_': ad, 'Biz': biz})
+        assert float(evaluator.cell_value(sheet, ref)) == pytest.approx(expected, rel=1e-9, abs=1e-6), \
+            f"{sheet}!{ref} {formula}"
+        checked += 1
+    assert checked > 40
+    assert ad['Spend'].sum() > 0
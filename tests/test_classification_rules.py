@@ -0,0 +1,44 @@
+"""Rules file validation in classification_rules."""
+
+import json
+
+import pytest
+
+from classification_rules import Classifier, load_rules, validate_rules
+from generate_report_from_data import main as report_main
+
+
+def portfolio(*patterns):
+    return {'rules': [{'pattern': pattern, 'label': 'JN'} for pattern in patterns]}
+
+
+@pytest.mark.parametrize('patterns', [
+    ['(?i)jn'],                        # inline global flag
+    ['(?P<brand>jn)', '(?P<brand>j&n)'],  # group name used twice
+    ['(?P<r0>jn)'],                    # clashes with the rule groups
+    ['(j)\\1'],                        # numbered backreference
+    ['(?P<j>j)(?P=j)'],                # named backreference
+])
+def test_patterns_that_break_the_combined_regex_are_rejected(patterns):
+    with pytest.raises(ValueError):
+        validate_rules('portfolio', portfolio(*patterns), 'rules.json')
+
+
+def test_valid_patterns_classify_in_rule_order():
+    spec = validate_rules('segment', {'rules': [{'pattern': r'pat\b', 'label': 'Competitor'},
+                                                {'pattern': '(brand|branded)', 'label': 'Branded'},
+                                                {'pattern': r'\\1', 'label': 'Competitor'}]}, 'rules.json')
+    classifier = Classifier('segment', spec, cache_dir=None)
+    assert classifier.labels(['Branded - pat', 'SP Branded', 'x\\1', 'Generic', None]) == \
+        ['Competitor', 'Branded', 'Competitor', 'Non-Branded', 'Non-Branded']
+
+
+def test_cli_reports_a_bad_rules_file(exports, tmp_path, capsys):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'portfolio': portfolio('(?i)jn')}))
+    with pytest.raises(ValueError):
+        load_rules(str(path))
+    with pytest.raises(SystemExit) as exit_info:
+        report_main(['--campaign', exports[0], '--business', exports[1], '--rules', str(path)])
+    assert exit_info.value.code == 2
+    assert 'do not combine' in capsys.readouterr().err
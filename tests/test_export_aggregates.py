@@ -0,0 +1,34 @@
+"""Aggregate files from --export-aggregates and report_reader.py --output-dir."""
+
+import os
+
+import pytest
+
+import generate_report_from_data
+import report_reader
+
+
+@pytest.fixture
+def no_parquet(monkeypatch):
+    """A clean install: requirements.txt has no pyarrow or fastparquet."""
+    monkeypatch.setattr(generate_report_from_data, 'parquet_available', lambda: False)
+    monkeypatch.setattr(report_reader, 'parquet_available', lambda: False)
+
+
+def test_default_format_is_csv_without_pyarrow(exports, tmp_path, no_parquet):
+    report = str(tmp_path / 'report.xlsx')
+    generate_report_from_data.main(['--campaign', exports[0], '--business', exports[1],
+                                    '--output', report, '--sheets', 'summary,monthly',
+                                    '--export-aggregates', str(tmp_path / 'aggregates')])
+    assert os.path.isfile(tmp_path / 'aggregates' / 'report_monthly.csv')
+
+    assert report_reader.main([report, '--no-raw', '--output-dir', str(tmp_path / 'recovered')]) == 0
+    assert os.path.isfile(tmp_path / 'recovered' / 'report_monthly.csv')
+
+
+def test_explicit_parquet_without_pyarrow_is_an_error(exports, tmp_path, no_parquet):
+    with pytest.raises(SystemExit) as exit_info:
+        generate_report_from_data.main(['--campaign', exports[0], '--business', exports[1],
+                                        '--output', str(tmp_path / 'report.xlsx'),
+                                        '--export-aggregates', '--aggregate-format', 'parquet'])
+    assert exit_info.value.code == 2
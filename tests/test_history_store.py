@@ -0,0 +1,86 @@
+"""The SQLite history store against reports built straight from the CSVs."""
+
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from classification_rules import use_rules
+from generate_report_from_data import build_report_graph
+from history_store import SCHEMA, HistoryStore, build_store_graph
+
+
+@pytest.fixture
+def rules(tmp_path):
+    """Write a rules file and make it active; the default rules are restored afterwards."""
+    def activate(config):
+        path = tmp_path / 'rules.json'
+        path.write_text(json.dumps(config))
+        use_rules(str(path))
+        return str(path)
+    yield activate
+    use_rules()
+
+
+@pytest.fixture
+def store(exports, tmp_path):
+    use_rules()
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.ingest(exports[0], 'campaign')
+    store.ingest(exports[1], 'business')
+    return store
+
+
+def assert_same_node(store, exports, node):
+    expected = build_report_graph(*exports).get(node).reset_index(drop=True)
+    actual = build_store_graph(store).get(node).reset_index(drop=True)
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False, check_exact=False)
+
+
+@pytest.mark.parametrize('node', ['daily', 'yoy', 'monthly'])
+def test_store_aggregates_match_the_csv(store, exports, node):
+    assert_same_node(store, exports, node)
+
+
+def test_exports_without_last_year_columns_skip_year_over_year(exports, tmp_path):
+    use_rules()
+    campaign = pd.read_csv(exports[0], dtype=str, encoding='utf-8-sig')
+    campaign = campaign.drop(columns=[c for c in campaign.columns if c.startswith('Last Year')])
+    path = str(tmp_path / 'no_last_year.csv')
+    campaign.to_csv(path, index=False)
+
+    store = HistoryStore(str(tmp_path / 'history.sqlite'))
+    store.ingest(path, 'campaign')
+    assert_same_node(store, (path, exports[1]), 'daily')
+    assert build_store_graph(store).get('yoy') is None
+
+
+def test_stores_without_last_year_columns_are_migrated(exports, tmp_path):
+    path = str(tmp_path / 'old.sqlite')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(SCHEMA.replace(',\n    ly_spend REAL,\n    ly_clicks REAL,\n    ly_impressions REAL', ''))
+    assert 'ly_spend' not in {row[1] for row in sqlite3.connect(path).execute("PRAGMA table_info(campaign_rows)")}
+
+    use_rules()
+    store = HistoryStore(path)
+    store.ingest(exports[0], 'campaign')
+    store.ingest(exports[1], 'business')
+    assert_same_node(store, exports, 'yoy')
+
+
+def test_reingesting_the_same_file_is_skipped(store, exports):
+    assert store.ingest(exports[0], 'campaign') is None
+
+
+def test_rows_are_relabelled_when_the_rules_change(store, exports, rules):
+    rules({'portfolio': {'rules': [], 'default': 'Non-JN'},
+           'segment': {'rules': [{'pattern': 'exact', 'label': 'Competitor'}], 'default': 'Branded'}})
+    assert_same_node(store, exports, 'daily')
+    labels = store.query("SELECT DISTINCT portfolio_type FROM campaign_rows")
+    assert labels['portfolio_type'].tolist() == ['Non-JN']
+    assert not store.relabel()  # Already labelled by these rules
+
+    use_rules()
+    assert store.relabel()
+    assert_same_node(store, exports, 'daily')
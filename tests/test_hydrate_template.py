@@ -0,0 +1,19 @@
+"""generate_excel_report.py --campaign: hydrating the template with or without a business report."""
+
+import pytest
+
+import generate_excel_report
+
+
+@pytest.mark.parametrize('business, warned', [
+    (None, False),                  # No --business: a campaign-only template, nothing to warn about
+    ('missing.csv', True),
+])
+def test_business_warning_only_for_a_missing_file(exports, tmp_path, capsys, business, warned):
+    argv = ['--campaign', exports[0], '--output', str(tmp_path / 'template.xlsx')]
+    if business:
+        argv += ['--business', str(tmp_path / business)]
+    generate_excel_report.main(argv)
+
+    out = capsys.readouterr().out
+    assert ('Warning: Business report not found' in out) == warned
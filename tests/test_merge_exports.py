@@ -0,0 +1,39 @@
+"""merge_campaign_exports: overlapping campaign exports, latest file wins."""
+
+import pandas as pd
+
+from generate_report_from_data import merge_campaign_exports
+
+
+def export(rows):
+    """Campaign frame from (date, campaign, portfolio, spend) rows."""
+    df = pd.DataFrame(rows, columns=['Date', 'Campaign Name', 'Portfolio name', 'Spend'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def test_latest_export_wins_and_repeats_within_an_export_are_kept(capsys):
+    old = export([
+        ('2025-01-01', 'A', 'P1', 1.0),
+        ('2025-01-01', 'B', 'P1', 2.0),
+        ('2025-01-02', 'A', 'P1', 3.0),
+        ('2025-01-02', 'A', 'P1', 4.0),     # Repeated within the old export, both replaced
+    ])
+    new = export([
+        ('2025-01-02', 'A', 'P1', 30.0),
+        ('2025-01-02', 'A', 'P1', 40.0),    # Repeated within the new export, both kept
+        ('2025-01-02', 'A', 'P2', 50.0),    # Same campaign, other portfolio: a new key
+        ('2025-01-03', 'A', 'P1', 60.0),
+    ])
+    newest = export([
+        ('2025-01-03', 'A', 'P1', 600.0),
+    ])
+
+    merged = merge_campaign_exports([old, new, newest], ['old.csv', 'new.csv', 'newest.csv'])
+
+    assert merged['Spend'].tolist() == [1.0, 2.0, 30.0, 40.0, 50.0, 600.0]
+    out = capsys.readouterr().out
+    assert "Merged 3 campaign exports: 6 rows, 3 overlapping rows replaced" in out
+    assert "old.csv: 2 rows replaced" in out
+    assert "new.csv: 1 rows replaced" in out
+    assert "newest.csv" not in out
@@ -0,0 +1,148 @@
+"""report_service: portfolio selection, worker failures, and the HTTP endpoints of a running service."""
+
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from conftest import ROOT
+import report_service
+from report_service import ReportData, ReportService, RequestError, SelectionError
+
+
+def test_portfolio_names_do_not_shadow_types():
+    campaign = pd.DataFrame({
+        'Date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04']),
+        'Portfolio name': ['Non-JN', 'JN Vitamins', 'Other', None],
+        'Portfolio_Type': ['JN', 'JN', 'Non-JN', 'Non-JN'],
+    })
+    data = ReportData(campaign)
+
+    def names(portfolio):
+        return data.select(portfolio=portfolio)[0]['Portfolio name'].fillna('').tolist()
+
+    assert names('non-jn') == ['Other', '']          # A bare value is the type first...
+    assert names('name:Non-JN') == ['Non-JN']        # ...a prefix reaches the portfolio named like it
+    assert names('type:JN') == ['Non-JN', 'JN Vitamins']
+    assert names('jn vitamins') == ['JN Vitamins']
+    with pytest.raises(SelectionError):
+        data.select(portfolio='type:JN Vitamins')
+
+
+def fake_build(start, end, portfolio, sheets, compact):
+    """build_report_bytes stand-in: the portfolio picks what the worker does."""
+    if portfolio == 'crash':
+        os._exit(1)
+    if portfolio == 'bug':
+        raise ValueError("a bug in build_report")
+    if portfolio == 'none':
+        raise SelectionError("Unknown portfolio 'none'")
+    return b'xlsx'
+
+
+@pytest.fixture
+def pool_service(monkeypatch):
+    """A ReportService whose forked workers run fake_build."""
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        pytest.skip("needs the fork start method to patch the workers")
+    monkeypatch.setattr(report_service, 'build_report_bytes', fake_build)
+    context = multiprocessing.get_context('fork')
+    service = ReportService(None, lambda: report_service.ProcessPoolExecutor(max_workers=1, mp_context=context))
+    yield service
+    service.shutdown()
+
+
+def build(service, portfolio):
+    """(status, body) of one build on the service's pool."""
+    try:
+        return 200, asyncio.run(service.build((None, None, portfolio, ['summary'], False)))
+    except RequestError as e:
+        return e.status, str(e)
+
+
+def test_dead_worker_fails_only_its_request(pool_service):
+    first = pool_service.pool
+    assert build(pool_service, 'crash')[0] == 503
+    assert pool_service.pool is not first
+    assert build(pool_service, None) == (200, b'xlsx')
+
+
+def test_pool_broken_while_idle_is_replaced(pool_service):
+    with pytest.raises(report_service.BrokenProcessPool):
+        pool_service.pool.submit(fake_build, None, None, 'crash', [], False).result()
+    assert build(pool_service, None) == (200, b'xlsx')
+
+
+def test_only_selection_errors_are_client_errors(pool_service):
+    assert build(pool_service, 'none') == (422, "Unknown portfolio 'none'")
+    with pytest.raises(ValueError, match='a bug'):
+        build(pool_service, 'bug')
+
+
+@pytest.fixture(scope='module')
+def service(exports):
+    """Base URL of report_service.py running on a free port."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'report_service.py'), '--campaign', exports[0],
+         '--business', exports[1], '--port', '0', '--workers', '1'],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in process.stdout:
+            if line.startswith('Serving reports on '):
+                yield line.split()[3].rsplit('/report', 1)[0]
+                break
+        else:
+            pytest.fail(f"service exited with {process.wait()}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def get(url):
+    """(status, content type, body) of a GET request."""
+    try:
+        with urllib.request.urlopen(url, timeout=120) as response:
+            return response.status, response.headers['Content-Type'], response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers['Content-Type'], e.read()
+
+
+def test_health(service):
+    status, content_type, body = get(f"{service}/health")
+    health = json.loads(body)
+    assert (status, content_type) == (200, 'application/json')
+    assert health['campaign_rows'] > 0 and health['business_rows'] > 0
+    assert health['portfolio_types'] == ['JN', 'Non-JN']
+
+
+def test_window_report(service):
+    status, content_type, body = get(f"{service}/report?start=2024-10-01&end=2024-12-31&sheets=summary,monthly")
+    assert status == 200 and content_type.endswith('.sheet')
+    wb = load_workbook(io.BytesIO(body), read_only=True)
+    assert len(wb.sheetnames) == 2
+
+
+@pytest.mark.parametrize('query, status', [
+    ('portfolio=No Such Portfolio', 422),
+    ('start=2030-01-01&end=2030-01-31', 422),
+    ('portfolio=type:JN&sheets=organic', 422),
+    ('start=2025-02-30', 400),
+    ('start=2025-03-01&end=2025-01-01', 400),
+])
+def test_rejected_requests(service, query, status):
+    code, content_type, body = get(f"{service}/report?{query.replace(' ', '%20')}")
+    assert (code, content_type) == (status, 'application/json')
+    assert json.loads(body)['error']
+
+
+def test_unknown_endpoint(service):
+    assert get(f"{service}/nope")[0] == 404
@@ -0,0 +1,34 @@
+"""Argument and missing-input errors exit before the heavy modules are imported."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl']
+
+
+def imported_modules(*args):
+    """Top-level modules imported by a script run, from python -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True)
+    assert result.returncode == 2, result.stderr
+    return {line.split('|')[-1].strip().split('.')[0] for line in result.stderr.splitlines()
+            if line.startswith('import time:')}
+
+
+@pytest.mark.parametrize('args', [
+    ['--bogus'],
+    ['--campaign', 'missing.csv'],
+    ['--start', '2025-13-01'],
+])
+def test_report_errors_skip_heavy_imports(args):
+    modules = imported_modules(os.path.join(ROOT, 'generate_report_from_data.py'), *args)
+    assert not modules & set(HEAVY_MODULES)
+
+
+def test_template_errors_skip_heavy_imports():
+    modules = imported_modules(os.path.join(ROOT, 'generate_excel_report.py'), '--bogus')
+    assert not modules & set(HEAVY_MODULES)
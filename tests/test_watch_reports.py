@@ -0,0 +1,34 @@
+"""watch_reports.watch retries a failed build."""
+
+import shutil
+import time
+
+from watch_reports import watch
+
+
+class FlakyReport:
+    """Stands in for WarmReport; the first builds fail."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.output_path = 'report.xlsx'
+        self.fingerprints = {}
+        self.builds = []
+
+    def build(self, fingerprints):
+        self.builds.append(time.monotonic())
+        if len(self.builds) <= self.failures:
+            raise PermissionError("report.xlsx is open in Excel")
+        self.fingerprints = fingerprints
+        return []
+
+
+def test_failed_build_is_retried_without_new_exports(exports, tmp_path):
+    shutil.copy(exports[0], tmp_path / 'campaign.csv')
+    report = FlakyReport(failures=2)
+    watch(str(tmp_path), report, interval=0.01, debounce=0.01, max_runs=3, retry=0.1)
+
+    assert report.fingerprints['campaign'][0].endswith('campaign.csv')
+    first, second, third = report.builds
+    assert second - first >= 0.1 and third - second >= 0.2  # The wait doubles
+
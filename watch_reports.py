@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Report Watcher
+Watches a folder that campaign and business exports are dropped into and
+regenerates the populated report whenever the newest export of either kind
+changes.
+
+The folder is polled (stat only, no reads) every --interval seconds. A burst
+of arrivals is debounced: the report is rebuilt once the CSVs have stopped
+changing for --debounce seconds. Inputs are fingerprinted by content, so
+touching or re-copying an identical export does not trigger a rebuild. The
+process stays warm between runs: parsed exports and every aggregate whose
+inputs did not change are reused, so a new business report only re-reads the
+business report.
+
+    python watch_reports.py exports/ --output exports/Campaign_Performance_Report.xlsx [--rules brand_x.json]
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import traceback
+
+from generate_report_from_data import (
+    build_report_graph, sheet_nodes, write_report, resolve_sheets, parse_sheet_list,
+    REPORT_SHEETS, OUTPUT_FILE, COMPACT_OUTPUT,
+)
+from classification_rules import use_rules
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+POLL_SECONDS = 1.0
+DEBOUNCE_SECONDS = 2.0
+# A failed build is retried with unchanged inputs after this long, doubling up to MAX_RETRY_SECONDS
+RETRY_SECONDS = 5.0
+MAX_RETRY_SECONDS = 300.0
+
+# A CSV is recognised as an export by a column in its header row
+EXPORT_MARKERS = {
+    'campaign': 'Campaign Name',
+    'business': 'Ordered Product Sales',
+}
+INPUT_NODES = list(EXPORT_MARKERS)
+
+# ============================================================================
+# INPUT DISCOVERY
+# ============================================================================
+
+def snapshot(directory):
+    """Stat signature (name -> (size, mtime_ns)) of the CSV files in directory."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name.lower().endswith('.csv') and not entry.name.startswith('.'):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def export_kind(path):
+    """'campaign', 'business' or None, from the CSV's header row."""
+    try:
+        with open(path, encoding='utf-8-sig', errors='replace') as f:
+            header = f.readline()
+    except OSError:
+        return None
+    for kind, marker in EXPORT_MARKERS.items():
+        if marker in header:
+            return kind
+    return None
+
+def file_digest(path, block_size=1024 * 1024):
+    """Content hash of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class InputTracker:
+    """Finds the newest export of each kind and fingerprints it by content.
+
+    Header checks and hashes are cached per (path, size, mtime), so an
+    unchanged folder costs one scandir per poll.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.kinds = {}
+        self.digests = {}
+
+    def latest_exports(self, files):
+        """{kind: path} of the most recently modified export of each kind."""
+        latest = {}
+        for name, signature in files.items():
+            path = os.path.join(self.directory, name)
+            key = (path, signature)
+            if key not in self.kinds:
+                self.kinds[key] = export_kind(path)
+            kind = self.kinds[key]
+            if kind and (kind not in latest or signature[1] > latest[kind][1]):
+                latest[kind] = (path, signature[1])
+        return {kind: path for kind, (path, _) in latest.items()}
+
+    def fingerprints(self, files):
+        """{kind: (path, content digest)} for the current inputs."""
+        result = {}
+        for kind, path in self.latest_exports(files).items():
+            key = (path, files[os.path.basename(path)])
+            if key not in self.digests:
+                self.digests[key] = file_digest(path)
+            result[kind] = (path, self.digests[key])
+        return result
+
+# ============================================================================
+# WARM REGENERATION
+# ============================================================================
+
+class WarmReport:
+    """Regenerates the report, reusing graph values whose inputs are unchanged."""
+
+    def __init__(self, output_path, sheets, compact=False, compresslevel=None, workers=None):
+        self.output_path = output_path
+        self.sheets = sheets
+        self.compact = compact
+        self.compresslevel = compresslevel
+        self.workers = workers
+        self.graph = None
+        self.fingerprints = {}
+
+    def reusable(self, graph, fingerprints):
+        """Values from the previous run whose input exports have the same fingerprint."""
+        if self.graph is None:
+            return {}
+        unchanged = {kind for kind in INPUT_NODES if fingerprints.get(kind) == self.fingerprints.get(kind)}
+        values = {}
+        for name, value in self.graph.values.items():
+            inputs = set(graph.requirements([name])) & set(INPUT_NODES)
+            if inputs <= unchanged:
+                values[name] = value
+        return values
+
+    def build(self, fingerprints):
+        """Write the report for the given inputs; return the names of the reused nodes."""
+        campaign = fingerprints.get('campaign')
+        business = fingerprints.get('business')
+        graph = build_report_graph(campaign[0], business[0] if business else None)
+        reused = self.reusable(graph, fingerprints)
+        graph.values.update(reused)
+
+        graph.compute(sheet_nodes(self.sheets), max_workers=self.workers)
+
+        # Write next to the target and swap it in, so readers never see a partial file
+        directory, name = os.path.split(os.path.abspath(self.output_path))
+        temp_path = os.path.join(directory, f".~{name}")
+        write_report(graph, self.sheets, temp_path, self.compact, self.compresslevel)
+        os.replace(temp_path, self.output_path)
+
+        self.graph, self.fingerprints = graph, fingerprints
+        return sorted(reused)
+
+# ============================================================================
+# WATCH LOOP
+# ============================================================================
+
+def wait_for_quiet(directory, files, interval, debounce):
+    """Poll until the CSV files have not changed for debounce seconds; return the final snapshot."""
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(interval)
+        current = snapshot(directory)
+        if current != files:
+            files, quiet_since = current, time.monotonic()
+    return files
+
+def watch(directory, report, interval=POLL_SECONDS, debounce=DEBOUNCE_SECONDS, max_runs=None,
+          retry=RETRY_SECONDS):
+    """Regenerate the report whenever the newest exports in directory change.
+
+    A failed build is retried after retry seconds even if nothing changes
+    (a locked output file, a share that was briefly unavailable), waiting
+    twice as long after each further failure.
+    """
+    tracker = InputTracker(directory)
+    files = None
+    runs = 0
+    retry_at, retry_delay = None, retry
+    print(f"Watching {directory} for exports (poll every {interval:g}s, debounce {debounce:g}s). Ctrl+C to stop.")
+
+    while max_runs is None or runs < max_runs:
+        current = snapshot(directory)
+        retrying = current == files and retry_at is not None and time.monotonic() >= retry_at
+        if current == files and not retrying:
+            time.sleep(interval)
+            continue
+
+        if not retrying:
+            files = wait_for_quiet(directory, current, interval, debounce) if files is not None else current
+            retry_at, retry_delay = None, retry
+        fingerprints = tracker.fingerprints(files)
+        if 'campaign' not in fingerprints:
+            print("  Waiting for a campaign export...")
+            continue
+        if fingerprints == report.fingerprints:
+            continue
+
+        changed = [kind for kind in INPUT_NODES if fingerprints.get(kind) != report.fingerprints.get(kind)]
+        action = "retrying" if retrying else "regenerating"
+        print(f"\n[{time.strftime('%H:%M:%S')}] Changed: {', '.join(changed)} - {action}...")
+        start = time.perf_counter()
+        try:
+            reused = report.build(fingerprints)
+        except Exception as e:
+            # Keep watching; the next drop may fix a bad export, and a passing problem a retry
+            print(f"  Failed: {type(e).__name__}: {e} (retrying in {retry_delay:g}s unless the exports change)")
+            traceback.print_exc()
+            retry_at = time.monotonic() + retry_delay
+            retry_delay = min(retry_delay * 2, MAX_RETRY_SECONDS)
+        else:
+            retry_at = None
+            print(f"  Report refreshed in {time.perf_counter() - start:.2f}s "
+                  f"(reused {len(reused)} warm values): {report.output_path}")
+        runs += 1
+
+# ============================================================================
+# MAIN FUNCTION
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate the campaign report when new exports land in a folder.")
+    parser.add_argument('directory', help="Folder the campaign and business CSV exports are dropped into")
+    parser.add_argument('--output', help=f"Report to refresh (default: {OUTPUT_FILE} in the watched folder)")
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS, help="Seconds between polls")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help="Seconds the folder must be unchanged before regenerating")
+    parser.add_argument('--sheets', type=parse_sheet_list,
+                        help=f"Comma-separated sheets to build (default: all): {', '.join(REPORT_SHEETS)}")
+    parser.add_argument('--skip-sheets', type=parse_sheet_list, help="Comma-separated sheets to leave out")
+    parser.add_argument('--no-raw', action='store_true', help="Leave out the raw data sheets")
+    parser.add_argument('--compact', action='store_true', default=COMPACT_OUTPUT, help="Size-optimized output")
+    parser.add_argument('--workers', type=int, default=None, help="Threads for loading and aggregating")
+    parser.add_argument('--max-runs', type=int, default=None, help="Stop after this many regenerations")
+    parser.add_argument('--retry', type=float, default=RETRY_SECONDS,
+                        help="Seconds before retrying a failed regeneration (doubles after each failure)")
+    parser.add_argument('--rules', metavar='PATH',
+                        help="Segment/portfolio classification rules (default: classification_rules.json "
+                             "next to this script)")
+    args = parser.parse_args(argv)
+
+    try:
+        use_rules(args.rules)
+    except (OSError, ValueError) as e:
+        parser.error(f"classification rules: {e}")
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    sheets = resolve_sheets(args.sheets, args.skip_sheets, include_raw=not args.no_raw)
+    if not sheets:
+        parser.error("no sheets left to build")
+
+    output = args.output or os.path.join(args.directory, OUTPUT_FILE)
+    report = WarmReport(output, sheets, compact=args.compact, workers=args.workers)
+    try:
+        watch(args.directory, report, args.interval, args.debounce, args.max_runs, args.retry)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+XLSX Package Helpers
+Low-level edits of a saved .xlsx package (a zip of XML parts) without
+loading it back into openpyxl. Used to patch a handful of cells in a
+prebuilt template, which is much faster than rebuilding the workbook, and
+to stream large data blocks into a sheet without building openpyxl cells.
+"""
+
+import io
+import re
+import zipfile
+import posixpath
+from datetime import datetime
+
+# Day 0 of Excel's 1900 date system
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+
+def sheet_part_paths(zf):
+    """Map sheet names to their worksheet part paths inside the package."""
+    workbook_xml = zf.read('xl/workbook.xml').decode('utf-8')
+    rels_xml = zf.read('xl/_rels/workbook.xml.rels').decode('utf-8')
+
+    targets = {}
+    for rel in re.finditer(r'<Relationship\b[^>]*>', rels_xml):
+        attrs = dict(re.findall(r'(\w+)="([^"]*)"', rel.group(0)))
+        target = attrs.get('Target', '')
+        if target.startswith('/'):
+            target = target[1:]
+        else:
+            target = posixpath.normpath(posixpath.join('xl', target))
+        targets[attrs.get('Id')] = target
+
+    paths = {}
+    for sheet in re.finditer(r'<sheet\b[^>]*>', workbook_xml):
+        tag = sheet.group(0)
+        name = re.search(r'\bname="([^"]*)"', tag).group(1)
+        rid = re.search(r'\br:id="([^"]*)"', tag).group(1)
+        paths[unescape_attr(name)] = targets[rid]
+
+    return paths
+
+
+def unescape_attr(value):
+    """Undo XML attribute escaping for sheet names."""
+    return (value.replace('&quot;', '"').replace('&apos;', "'")
+            .replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&'))
+
+
+def escape(text):
+    """Escape &, < and > for XML text, as xml.sax.saxutils.escape.
+
+    Defined here because xml.sax.saxutils imports urllib (tens of ms).
+    """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def excel_serial(value):
+    """Excel serial number of a datetime, as openpyxl.utils.datetime.to_excel.
+
+    Computed here so that patching a package never imports openpyxl.
+    """
+    days = (value - EXCEL_EPOCH).days
+    if 0 < days <= 60:
+        days -= 1  # Excel counts a 29 Feb 1900
+    return days + (value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 10**6) / 86400
+
+
+def cell_value_xml(value):
+    """Return (type attribute, <v> text) for a Python value."""
+    if isinstance(value, bool):
+        return ' t="b"', '1' if value else '0'
+    if isinstance(value, datetime):
+        return '', repr(excel_serial(value))
+    if isinstance(value, (int, float)):
+        return '', repr(value)
+    return ' t="str"', escape(str(value))
+
+
+def patch_sheet_cells(sheet_xml, values):
+    """Replace the cached values of existing cells in a worksheet part.
+
+    values maps cell references (e.g. 'B6') to Python values. Each cell must
+    already exist in the sheet (it carries the style); formulas are kept.
+    """
+    for ref, value in values.items():
+        pattern = re.compile(r'<c r="%s"([^>]*?)(?:/>|>(.*?)</c>)' % ref, re.S)
+        match = pattern.search(sheet_xml)
+        if match is None:
+            raise KeyError(f"Cell {ref} not found in worksheet")
+
+        attrs = re.sub(r'\s+t="[^"]*"', '', match.group(1))
+        inner = match.group(2) or ''
+        formula = re.search(r'<f\b.*?(?:/>|</f>)', inner, re.S)
+        type_attr, text = cell_value_xml(value)
+        if formula:
+            # Formula cells keep their formula; a string result is typed "str"
+            new_cell = f'<c r="{ref}"{attrs}{type_attr}>{formula.group(0)}<v>{text}</v></c>'
+        else:
+            if type_attr == ' t="str"':
+                type_attr = ' t="inlineStr"'
+                new_cell = f'<c r="{ref}"{attrs}{type_attr}><is><t>{text}</t></is></c>'
+            else:
+                new_cell = f'<c r="{ref}"{attrs}{type_attr}><v>{text}</v></c>'
+        sheet_xml = sheet_xml[:match.start()] + new_cell + sheet_xml[match.end():]
+
+    return sheet_xml
+
+
+def patch_core_dates(core_xml, when):
+    """Set the created/modified document properties."""
+    stamp = when.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return re.sub(r'(<dcterms:(?:created|modified)\b[^>]*>)[^<]*(</dcterms:)',
+                  lambda m: m.group(1) + stamp + m.group(2), core_xml)
+
+
+def patch_workbook(xlsx_bytes, cell_values, when=None, compresslevel=None):
+    """Return a copy of the package with cells patched.
+
+    cell_values maps sheet names to {cell_ref: value} dicts. Untouched parts
+    are copied through unchanged.
+    """
+    source = zipfile.ZipFile(io.BytesIO(xlsx_bytes))
+    paths = sheet_part_paths(source)
+    edits = {paths[sheet]: values for sheet, values in cell_values.items()}
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+            if info.filename in edits:
+                data = patch_sheet_cells(data.decode('utf-8'), edits[info.filename]).encode('utf-8')
+            elif info.filename == 'docProps/core.xml' and when is not None:
+                data = patch_core_dates(data.decode('utf-8'), when).encode('utf-8')
+            target.writestr(info.filename, data)
+
+    return out.getvalue()
+
+
+def package_sheet_names(xlsx_bytes):
+    """List the sheet names of a saved package in workbook order."""
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as zf:
+        return list(sheet_part_paths(zf))
+
+
+# ============================================================================
+# STREAMING ROW WRITER
+# ============================================================================
+
+def row_styles(xlsx_bytes, sheet_name, row):
+    """Return {column letter: style id} for the styled cells of one template row."""
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as zf:
+        sheet_xml = zf.read(sheet_part_paths(zf)[sheet_name]).decode('utf-8')
+
+    match = re.search(r'<row r="%d"[^>]*?(?:/>|>(.*?)</row>)' % row, sheet_xml, re.S)
+    styles = {}
+    if match and match.group(1):
+        for cell in re.finditer(r'<c r="([A-Z]+)\d+"([^>]*?)(?:/>|>)', match.group(1)):
+            style = re.search(r'\bs="(\d+)"', cell.group(2))
+            if style:
+                styles[cell.group(1)] = style.group(1)
+    return styles
+
+
+def _split_sheet_data(sheet_xml, start_row, end_row):
+    """Split a worksheet part around the streamed rows start_row..end_row.
+
+    Rows inside that range (e.g. a style prototype row) are dropped; rows
+    above it stay in the head and rows below it (e.g. a footnote) in the tail.
+    """
+    sheet_xml = sheet_xml.replace('<sheetData />', '<sheetData></sheetData>').replace('<sheetData/>', '<sheetData></sheetData>')
+    open_end = sheet_xml.index('<sheetData>') + len('<sheetData>')
+    close_start = sheet_xml.index('</sheetData>')
+
+    before, after = [], []
+    for row in re.finditer(r'<row r="(\d+)"[^>]*?(?:/>|>.*?</row>)', sheet_xml[open_end:close_start], re.S):
+        row_number = int(row.group(1))
+        if row_number < start_row:
+            before.append(row.group(0))
+        elif row_number > end_row:
+            after.append(row.group(0))
+    return sheet_xml[:open_end] + ''.join(before), ''.join(after) + sheet_xml[close_start:]
+
+
+SHARED_STRINGS_PART = 'xl/sharedStrings.xml'
+SHARED_STRINGS_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml'
+SHARED_STRINGS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings'
+
+
+class SharedStringTable:
+    """Shared string table filled while rows are generated.
+
+    Each distinct string is stored once in xl/sharedStrings.xml and cells
+    refer to it by index (t="s"), instead of repeating inline text per cell.
+    """
+
+    def __init__(self):
+        self.index = {}
+
+    def indexes(self, strings):
+        """Return the table index of each string, adding new ones."""
+        return [self.index.setdefault(text, len(self.index)) for text in strings]
+
+    def to_xml(self):
+        items = ''.join(f'<si><t xml:space="preserve">{escape(text)}</t></si>' for text in self.index)
+        return (f'<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                f'uniqueCount="{len(self.index)}">{items}</sst>')
+
+
+def _register_shared_strings(filename, data):
+    """Add the shared string table to the content types or workbook relationships."""
+    text = data.decode('utf-8')
+    if filename == '[Content_Types].xml' and '/xl/sharedStrings.xml' not in text:
+        override = f'<Override PartName="/{SHARED_STRINGS_PART}" ContentType="{SHARED_STRINGS_TYPE}"/>'
+        text = text.replace('</Types>', override + '</Types>')
+    elif filename == 'xl/_rels/workbook.xml.rels' and SHARED_STRINGS_REL not in text:
+        rel = f'<Relationship Id="rIdSharedStrings" Type="{SHARED_STRINGS_REL}" Target="sharedStrings.xml"/>'
+        text = text.replace('</Relationships>', rel + '</Relationships>')
+    return text.encode('utf-8')
+
+
+def write_package_with_rows(xlsx_bytes, output, sheet_rows, compresslevel=None, shared_strings=None):
+    """Copy a package to output, streaming generated rows into worksheets.
+
+    sheet_rows maps sheet names to (start_row, row_count, last_column_letter,
+    chunks), where chunks is an iterable of <row> XML strings. Existing rows
+    in the streamed range (at least start_row, e.g. a style prototype row)
+    are replaced. output is a path or a writable binary file object.
+
+    shared_strings is an optional SharedStringTable that string cells in the
+    chunks index into (t="s"); it is written after all chunks are consumed,
+    so it may be filled while the rows are generated.
+    """
+    source = zipfile.ZipFile(io.BytesIO(xlsx_bytes))
+    paths = sheet_part_paths(source)
+    edits = {paths[sheet]: spec for sheet, spec in sheet_rows.items()}
+    if shared_strings is not None and SHARED_STRINGS_PART in source.namelist():
+        raise ValueError("Package already has a shared string table")
+
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as target:
+        for info in source.infolist():
+            if info.filename not in edits:
+                data = source.read(info.filename)
+                if shared_strings is not None:
+                    data = _register_shared_strings(info.filename, data)
+                target.writestr(info.filename, data)
+                continue
+
+            start_row, row_count, last_col, chunks = edits[info.filename]
+            head, tail = _split_sheet_data(source.read(info.filename).decode('utf-8'), start_row,
+                                           start_row + max(row_count, 1) - 1)
+            last_row = max(start_row - 1, start_row + row_count - 1)
+            tail_rows = [int(r) for r in re.findall(r'<row r="(\d+)"', tail)]
+            last_row = max([last_row] + tail_rows)
+            head = re.sub(r'<dimension ref="[^"]*"', f'<dimension ref="A1:{last_col}{last_row}"', head, count=1)
+
+            # Data parts can pass 2 GB on very large exports
+            with target.open(info.filename, 'w', force_zip64=True) as part:
+                part.write(head.encode('utf-8'))
+                for chunk in chunks:
+                    part.write(chunk.encode('utf-8'))
+                part.write(tail.encode('utf-8'))
+
+        if shared_strings is not None:
+            target.writestr(SHARED_STRINGS_PART, shared_strings.to_xml())